@@ -13,6 +13,8 @@ Given generations and eval results, this script will compute the following:
 - Success rate (compiled and correctness)
 - Geometric mean of speedup for correct samples
 - Fast_p score for different speedup thresholds (we recommend and use this metric)
+- with roofline=True, % of speed-of-light of the baseline and the correct samples,
+  see kernelbench.roofline (the GPU is matched from the hardware name)
 
 Usage:
 ```
@@ -31,6 +33,9 @@ class AnalysisConfig(Config):
         self.hardware = REQUIRED  # hardware to evaluate
         self.baseline = REQUIRED  # baseline to compare against
 
+        # report % of speed-of-light, counts FLOPs of every problem of the level on CPU
+        self.roofline = False
+
     def __repr__(self):
         return f"AnalysisConfig({self.to_dict()})"
 
@@ -52,7 +57,85 @@ def patch(eval_results, dataset):
     return eval_results
 
 
-def analyze_greedy_eval(run_name, hardware, baseline, level):
+def analyze_roofline(eval_results, baseline_results, dataset, hardware, level):
+    """
+    % of speed-of-light of the baseline and of the correct samples per problem
+    """
+    from kernelbench.roofline import (
+        estimate_speed_of_light,
+        get_gpu_spec,
+        percent_of_speed_of_light,
+    )
+    from kernelbench.utils import read_file
+    import numpy as np
+
+    try:
+        get_gpu_spec(hardware)
+    except KeyError as e:
+        print(f"[Roofline] {e}")
+        return
+
+    rows = []
+    for pid, problem_path in enumerate(dataset, start=1):
+        problem_name = os.path.basename(problem_path)
+        try:
+            sol = estimate_speed_of_light(read_file(problem_path), hardware)
+        except Exception as e:
+            print(f"[Roofline] Skipping {problem_name}: {e}")
+            continue
+        baseline_time = (baseline_results[f"level{level}"].get(problem_name) or {}).get(
+            "mean"
+        )
+        entry = eval_results[str(pid)]
+        kernel_sol = (
+            percent_of_speed_of_light(sol["sol_time_ms"], entry["runtime"])
+            if entry["correctness"]
+            else None
+        )
+        rows.append(
+            [
+                problem_name,
+                sol["bound"],
+                sol["sol_time_ms"],
+                percent_of_speed_of_light(sol["sol_time_ms"], baseline_time),
+                kernel_sol,
+            ]
+        )
+
+    baseline_sol = [row[3] for row in rows if row[3] is not None]
+    kernel_sol = [row[4] for row in rows if row[4] is not None]
+    print("\nRoofline:")
+    if baseline_sol:
+        print(f"Median baseline % of speed-of-light: {np.median(baseline_sol):.1f}%")
+    if kernel_sol:
+        print(
+            f"Median % of speed-of-light for correct samples: {np.median(kernel_sol):.1f}%"
+        )
+
+    # problems where the baseline leaves the least headroom
+    near_roofline = sorted(
+        (row for row in rows if row[3] is not None and row[3] >= 50),
+        key=lambda row: -row[3],
+    )
+    if near_roofline:
+        print("\nBaselines at >= 50% of speed-of-light:")
+        print(
+            tabulate(
+                near_roofline,
+                headers=[
+                    "Problem",
+                    "Bound",
+                    "SOL (ms)",
+                    "Baseline %SOL",
+                    "Kernel %SOL",
+                ],
+                floatfmt=".3g",
+                tablefmt="grid",
+            )
+        )
+
+
+def analyze_greedy_eval(run_name, hardware, baseline, level, roofline=False):
     """
     Analyze the greedy eval results for a run of a particular level
     """
@@ -105,10 +188,10 @@ def analyze_greedy_eval(run_name, hardware, baseline, level):
     print(f"Correctness rate: {correct_count/total_count*100:.1f}%")
 
     # Calculate speedup metrics
-    from src.score import (
+    from kernelbench.score import (
         geometric_mean_speed_ratio_correct_only,
-        geometric_mean_speed_ratio_correct_and_faster_only,
-        fastp,
+        fastp_grid,
+        bootstrap_scores,
     )
     import numpy as np
 
@@ -132,28 +215,47 @@ def analyze_greedy_eval(run_name, hardware, baseline, level):
         is_correct, baseline_speed, actual_speed, n
     )
 
-    # list of speedup thresholds p
+    # list of speedup thresholds p, scored in one pass
     p_values = [0.0, 0.5, 0.8, 1.0, 1.5, 2.0]
+    fast_p_scores = fastp_grid(is_correct, baseline_speed, actual_speed, p_values, n=n)
+    ci = bootstrap_scores(is_correct, baseline_speed, actual_speed, p_values)
     results = [
-        [p, fastp(is_correct, baseline_speed, actual_speed, n, p)] for p in p_values
+        [p, score, f"[{low:.3f}, {high:.3f}]"]
+        for p, score, low, high in zip(
+            p_values, fast_p_scores, ci["fast_p"]["low"], ci["fast_p"]["high"]
+        )
     ]
 
     # Print the results
     print("\nSpeedup Metrics:")
-    print(f"Geometric mean of speedup for correct samples: {gmsr_correct:.4f}")
+    print(
+        f"Geometric mean of speedup for correct samples: {gmsr_correct:.4f} "
+        f"(95% CI [{ci['geo_mean_speedup']['low']:.4f}, {ci['geo_mean_speedup']['high']:.4f}])"
+    )
 
     # Print table
     print("\nFast_p Results:")
     print(
         tabulate(
-            results, headers=["Speedup Threshold (p)", "Fast_p Score"], tablefmt="grid"
+            results,
+            headers=["Speedup Threshold (p)", "Fast_p Score", "95% CI"],
+            tablefmt="grid",
         )
     )
 
+    if roofline:
+        analyze_roofline(eval_results, baseline_results, dataset, hardware, level)
+
 
 @pydra.main(base=AnalysisConfig)
 def main(config: AnalysisConfig):
-    analyze_greedy_eval(config.run_name, config.hardware, config.baseline, config.level)
+    analyze_greedy_eval(
+        config.run_name,
+        config.hardware,
+        config.baseline,
+        config.level,
+        roofline=config.roofline,
+    )
 
 
 if __name__ == "__main__":
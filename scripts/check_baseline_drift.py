@@ -0,0 +1,270 @@
+import json
+import math
+import os
+import random
+
+import pydra
+import torch
+from pydra import REQUIRED, Config
+
+from kernelbench.dataset import construct_problem_dataset_from_problem_dir
+from kernelbench.server_cache import get_hardware_name
+from kernelbench.utils import read_file
+from scripts.generate_baseline_time import (
+    KERNEL_BENCH_PATH,
+    TIMING_DIR,
+    measure_program_time,
+)
+
+"""
+Baseline drift check for the stored results/timing/<hardware>/*.json files
+
+Driver, clock and torch updates shift reference runtimes, so instead of re-baselining
+everything after each upgrade:
+- re-measure a stratified sample of the baseline's problems on the current machine,
+  a few per (level, runtime tercile) so fast and slow problems are both covered
+- compare each re-measurement to the stored stats with Welch's t-test, a problem has
+  drifted when the difference is significant and larger than min_relative_change
+  (100 trials make tiny but real differences significant)
+- with refresh=True, only the drifted entries are overwritten in the baseline file
+
+Usage:
+python3 -m scripts.check_baseline_drift hardware_name=L40S_matx3 file_name=baseline_time_torch.json
+"""
+
+
+def parse_baseline_file_name(file_name: str) -> tuple[bool, str | None, str | None]:
+    """
+    Timing config of a baseline file written by record_baseline_times
+    e.g. baseline_time_torch_compile_inductor_max-autotune.json
+    Returns (use_torch_compile, torch_compile_backend, torch_compile_options)
+    """
+    name = os.path.basename(file_name).removesuffix(".json")
+    if name == "baseline_time_torch":
+        return False, None, None
+    prefix = "baseline_time_torch_compile_"
+    assert name.startswith(prefix), f"Unknown baseline file name: {file_name}"
+    backend, _, mode = name[len(prefix) :].partition("_")
+    return True, backend, mode or None
+
+
+def stratified_sample(
+    baseline: dict,
+    num_per_stratum: int = 2,
+    num_runtime_strata: int = 3,
+    seed: int = 42,
+) -> list[tuple[str, str]]:
+    """
+    Sample (level, problem name) pairs from a baseline: problems of each level are split
+    into num_runtime_strata groups by stored mean runtime, num_per_stratum from each
+    """
+    rng = random.Random(seed)
+    sample = []
+    for level in sorted(baseline):
+        measured = sorted(
+            (stats["mean"], problem_name)
+            for problem_name, stats in baseline[level].items()
+            if stats and stats.get("mean") is not None
+        )
+        num_strata = max(1, min(num_runtime_strata, len(measured)))
+        for stratum in range(num_strata):
+            start = stratum * len(measured) // num_strata
+            end = (stratum + 1) * len(measured) // num_strata
+            problems = [problem_name for _, problem_name in measured[start:end]]
+            for problem_name in rng.sample(
+                problems, min(num_per_stratum, len(problems))
+            ):
+                sample.append((level, problem_name))
+    return sample
+
+
+def welch_t_test(stored: dict, measured: dict) -> tuple[float, float]:
+    """
+    Welch's t-test on two timing stats (mean, std, num_trials)
+    Returns (t statistic, two-sided p-value); the p-value uses the normal approximation
+    of the t distribution, accurate for the 30+ trials baselines are recorded with
+    """
+    var_stored = stored["std"] ** 2 / stored["num_trials"]
+    var_measured = measured["std"] ** 2 / measured["num_trials"]
+    std_error = math.sqrt(var_stored + var_measured)
+    diff = measured["mean"] - stored["mean"]
+    if std_error == 0:
+        t = 0.0 if diff == 0 else math.copysign(math.inf, diff)
+    else:
+        t = diff / std_error
+    return t, math.erfc(abs(t) / math.sqrt(2))
+
+
+def detect_drift(
+    stored: dict,
+    measured: dict,
+    alpha: float = 0.01,
+    min_relative_change: float = 0.05,
+) -> dict:
+    """
+    Compare a re-measurement to the stored stats of one problem
+    """
+    t, p_value = welch_t_test(stored, measured)
+    relative_change = (measured["mean"] - stored["mean"]) / stored["mean"]
+    return {
+        "stored_mean": stored["mean"],
+        "measured_mean": measured["mean"],
+        "relative_change": relative_change,
+        "t": t,
+        "p_value": p_value,
+        "drifted": p_value < alpha and abs(relative_change) >= min_relative_change,
+    }
+
+
+def check_baseline_drift(
+    baseline_path: str,
+    device: torch.device | str = "cuda:0",
+    kernel_bench_path: str = KERNEL_BENCH_PATH,
+    num_per_stratum: int = 2,
+    num_runtime_strata: int = 3,
+    num_trials: int = 100,
+    alpha: float = 0.01,
+    min_relative_change: float = 0.05,
+    refresh: bool = False,
+    seed: int = 42,
+) -> dict:
+    """
+    Re-measure a stratified sample of a baseline file and flag drifted problems
+    refresh: overwrite the drifted entries of the baseline file with the new stats
+
+    Returns {"baseline", "hardware", "problems": {level: {problem: drift}}, "drifted"}
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    use_torch_compile, torch_compile_backend, torch_compile_options = (
+        parse_baseline_file_name(baseline_path)
+    )
+
+    hardware = get_hardware_name(device)
+    stored_hardware = {
+        stats.get("hardware")
+        for problems in baseline.values()
+        for stats in problems.values()
+        if stats and stats.get("hardware")
+    }
+    if stored_hardware and hardware not in stored_hardware:
+        print(
+            f"[Drift] Warning: baseline was recorded on {sorted(stored_hardware)}, "
+            f"re-measuring on {hardware}"
+        )
+
+    report = {
+        "baseline": baseline_path,
+        "hardware": hardware,
+        "problems": {},
+        "drifted": [],
+    }
+    problem_paths = {}
+    for level, problem_name in stratified_sample(
+        baseline, num_per_stratum, num_runtime_strata, seed
+    ):
+        if level not in problem_paths:
+            dataset = construct_problem_dataset_from_problem_dir(
+                os.path.join(kernel_bench_path, level)
+            )
+            problem_paths[level] = {os.path.basename(path): path for path in dataset}
+        if problem_name not in problem_paths[level]:
+            print(f"[Drift] {level}/{problem_name} is not in {kernel_bench_path}")
+            continue
+
+        measured = measure_program_time(
+            ref_arch_name=problem_name,
+            ref_arch_src=read_file(problem_paths[level][problem_name]),
+            num_trials=num_trials,
+            use_torch_compile=use_torch_compile,
+            torch_compile_backend=torch_compile_backend,
+            torch_compile_options=torch_compile_options,
+            device=device,
+        )
+        if measured is None:
+            print(f"[Drift] Could not re-measure {level}/{problem_name}")
+            continue
+
+        drift = detect_drift(
+            baseline[level][problem_name], measured, alpha, min_relative_change
+        )
+        drift["measured"] = measured
+        report["problems"].setdefault(level, {})[problem_name] = drift
+        if drift["drifted"]:
+            report["drifted"].append(f"{level}/{problem_name}")
+        print(
+            f"[Drift] {level}/{problem_name}: {drift['stored_mean']} -> "
+            f"{drift['measured_mean']} ms ({drift['relative_change']:+.1%}, "
+            f"p={drift['p_value']:.2g}){' DRIFTED' if drift['drifted'] else ''}"
+        )
+
+    if refresh and report["drifted"]:
+        for level, problems in report["problems"].items():
+            for problem_name, drift in problems.items():
+                if drift["drifted"]:
+                    baseline[level][problem_name] = drift["measured"]
+        # write then rename, an interrupted refresh leaves the old file intact
+        tmp_path = baseline_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(baseline, f)
+        os.replace(tmp_path, baseline_path)
+        print(f"[Drift] Refreshed {len(report['drifted'])} entries of {baseline_path}")
+
+    return report
+
+
+class DriftCheckConfig(Config):
+    def __init__(self):
+        # directory under results/timing, e.g. L40S_matx3
+        self.hardware_name = REQUIRED
+        # baseline file in that directory, the timing config is parsed from its name
+        self.file_name = "baseline_time_torch.json"
+
+        self.timing_dir = TIMING_DIR
+        self.kernel_bench_path = KERNEL_BENCH_PATH
+        self.device = "cuda:0"
+
+        # Sampling: num_per_stratum problems per (level, runtime stratum)
+        self.num_per_stratum = 2
+        self.num_runtime_strata = 3
+        self.seed = 42
+        self.num_trials = 100
+
+        # Drift test
+        self.alpha = 0.01  # significance level of Welch's t-test
+        self.min_relative_change = 0.05  # ignore significant but small shifts
+
+        # overwrite the drifted entries of the baseline file with the new stats
+        self.refresh = False
+        # where to save the drift report, not saved if None
+        self.report_path = None
+
+
+@pydra.main(base=DriftCheckConfig)
+def main(config: DriftCheckConfig):
+    report = check_baseline_drift(
+        baseline_path=os.path.join(
+            config.timing_dir, config.hardware_name, config.file_name
+        ),
+        device=config.device,
+        kernel_bench_path=config.kernel_bench_path,
+        num_per_stratum=config.num_per_stratum,
+        num_runtime_strata=config.num_runtime_strata,
+        num_trials=config.num_trials,
+        alpha=config.alpha,
+        min_relative_change=config.min_relative_change,
+        refresh=config.refresh,
+        seed=config.seed,
+    )
+    num_checked = sum(len(problems) for problems in report["problems"].values())
+    print(
+        f"[Drift] {len(report['drifted'])} / {num_checked} sampled problems drifted: "
+        f"{report['drifted']}"
+    )
+    if config.report_path:
+        with open(config.report_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -176,6 +176,8 @@ def evaluate_single_sample(
     build_dir = os.path.join(
         configs.kernel_eval_build_dir, configs.run_name, f"{problem_id}", f"{sample_id}"
     )
+    # filled in by eval_kernel_against_ref, kept in metadata even if the eval crashes
+    phase_times_ms = {}
 
     try:
         eval_result = eval_kernel_against_ref(
@@ -187,6 +189,7 @@ def evaluate_single_sample(
             num_perf_trials=configs.num_perf_trials,
             build_dir=build_dir,
             device=device,
+            phase_times_ms=phase_times_ms,
         )
         return eval_result
     except Exception as e:
@@ -199,6 +202,7 @@ def evaluate_single_sample(
                 "cuda_error": f"CUDA Error: {str(e)}",
                 "hardware": torch.cuda.get_device_name(device=device),
                 "device": str(device),
+                "phase_times_ms": phase_times_ms,
             }  # log this for debugging as this usually signifies illegal memory access
             eval_result = KernelExecResult(
                 compiled=False, correctness=False, metadata=metadata
@@ -209,6 +213,7 @@ def evaluate_single_sample(
                 "other_error": f"error: {str(e)}",
                 "hardware": torch.cuda.get_device_name(device=device),
                 "device": str(device),
+                "phase_times_ms": phase_times_ms,
             }  # for debugging
             eval_result = KernelExecResult(
                 compiled=False, correctness=False, metadata=metadata
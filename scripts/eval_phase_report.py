@@ -0,0 +1,145 @@
+import json
+import os
+
+import numpy as np
+import pydra
+from pydra import Config
+
+from kernelbench.dataset import REPO_TOP_PATH
+
+"""
+Eval Phase Report
+
+Shows where the wall-clock time of a run's evals went, phase by phase, from the
+metadata["phase_times_ms"] eval_kernel_against_ref records in every eval result:
+load_ref (exec / import and reference init), compile (nvcc), init_custom (ModelNew
+init), correctness, perf, profile and cleanup
+
+Usage:
+```
+python3 scripts/eval_phase_report.py run_name=<run_name>
+python3 scripts/eval_phase_report.py eval_file_path=<path to eval_results.json>
+```
+"""
+
+# report order, phases not listed here (if any) come after
+PHASES = [
+    "clear_cache",
+    "load_ref",
+    "compile",
+    "init_custom",
+    "correctness",
+    "perf",
+    "profile",
+    "cleanup",
+]
+
+
+class PhaseReportConfig(Config):
+    def __init__(self):
+        self.run_name = None  # reads runs/<run_name>/eval_results.json
+        self.eval_file_path = None  # or any eval results file
+        self.runs_dir = os.path.join(REPO_TOP_PATH, "runs")
+        self.top_k = 5  # slowest evals to list
+
+    def __repr__(self):
+        return f"PhaseReportConfig({self.to_dict()})"
+
+
+def iter_eval_entries(eval_results: dict):
+    """
+    (key, entry) of every eval result, entries are keyed by problem id and may hold
+    one result or a list of samples
+    """
+    for key, value in eval_results.items():
+        entries = value if isinstance(value, list) else [value]
+        for entry in entries:
+            if isinstance(entry, dict):
+                yield key, entry
+
+
+def aggregate_phase_times(eval_results: dict, top_k: int = 5) -> dict:
+    """
+    Per phase: number of evals that reached it, total, mean, p50, p90 and max time
+    and share of the total eval time; plus the top_k slowest evals
+
+    Returns {"num_evals", "total_ms", "phases": {phase: stats}, "slowest": [...]}
+    """
+    phase_times = {}
+    eval_totals = []
+    for key, entry in iter_eval_entries(eval_results):
+        times = (entry.get("metadata") or {}).get("phase_times_ms") or {}
+        if not times:
+            continue
+        for phase, ms in times.items():
+            phase_times.setdefault(phase, []).append(ms)
+        slowest_phase = max(times, key=times.get)
+        eval_totals.append(
+            (sum(times.values()), key, entry.get("sample_id"), slowest_phase)
+        )
+
+    total_ms = sum(total for total, _, _, _ in eval_totals)
+    ordered = [phase for phase in PHASES if phase in phase_times]
+    ordered += sorted(phase for phase in phase_times if phase not in PHASES)
+    phases = {}
+    for phase in ordered:
+        times = np.array(phase_times[phase])
+        phases[phase] = {
+            "count": len(times),
+            "total_ms": float(times.sum()),
+            "mean_ms": float(times.mean()),
+            "p50_ms": float(np.percentile(times, 50)),
+            "p90_ms": float(np.percentile(times, 90)),
+            "max_ms": float(times.max()),
+            "share": float(times.sum() / total_ms) if total_ms else 0.0,
+        }
+    eval_totals.sort(reverse=True)
+    return {
+        "num_evals": len(eval_totals),
+        "total_ms": total_ms,
+        "phases": phases,
+        "slowest": [
+            {"problem": key, "sample_id": sample_id, "total_ms": total, "phase": phase}
+            for total, key, sample_id, phase in eval_totals[:top_k]
+        ],
+    }
+
+
+def format_phase_report(report: dict) -> str:
+    lines = [
+        f"Phase breakdown of {report['num_evals']} evals, "
+        f"{report['total_ms'] / 1000:.1f} s in total",
+        f"{'phase':<14}{'evals':>7}{'total (s)':>12}{'share':>8}"
+        f"{'mean (ms)':>12}{'p50 (ms)':>12}{'p90 (ms)':>12}{'max (ms)':>12}",
+    ]
+    for phase, stats in report["phases"].items():
+        lines.append(
+            f"{phase:<14}{stats['count']:>7}{stats['total_ms'] / 1000:>12.1f}"
+            f"{stats['share']:>8.1%}{stats['mean_ms']:>12.1f}{stats['p50_ms']:>12.1f}"
+            f"{stats['p90_ms']:>12.1f}{stats['max_ms']:>12.1f}"
+        )
+    if report["slowest"]:
+        lines.append("Slowest evals:")
+        for slow in report["slowest"]:
+            lines.append(
+                f"  problem {slow['problem']} sample {slow['sample_id']}: "
+                f"{slow['total_ms'] / 1000:.1f} s, mostly {slow['phase']}"
+            )
+    return "\n".join(lines)
+
+
+@pydra.main(base=PhaseReportConfig)
+def main(config: PhaseReportConfig):
+    eval_file_path = config.eval_file_path or os.path.join(
+        config.runs_dir, config.run_name, "eval_results.json"
+    )
+    assert os.path.exists(
+        eval_file_path
+    ), f"Eval file does not exist at {eval_file_path}"
+    with open(eval_file_path, "r") as f:
+        eval_results = json.load(f)
+    print(format_phase_report(aggregate_phase_times(eval_results, config.top_k)))
+
+
+if __name__ == "__main__":
+    main()
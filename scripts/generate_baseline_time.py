@@ -3,14 +3,23 @@ import numpy as np
 from kernelbench.eval import (
     load_original_model_and_inputs,
     time_execution_with_cuda_event,
+    time_execution_with_cpu_timer,
     get_timing_stats,
     set_seed,
 )
-from kernelbench.dataset import construct_problem_dataset_from_problem_dir
+from kernelbench.dataset import (
+    construct_problem_dataset_from_problem_dir,
+    get_code_hash,
+)
 from kernelbench.utils import read_file
+from kernelbench.torch_compile_cache import time_compilation
+from kernelbench.device_pool import (
+    JSONLCheckpoint,
+    get_default_devices,
+    map_on_devices,
+)
 import os
 import json
-from tqdm import tqdm
 
 """
 Generate baseline time for KernelBench
@@ -32,6 +41,16 @@ https://pytorch.org/docs/main/generated/torch.compile.html
 In addition to default Torch Compile backend, you can always use other or your custom backends
 https://pytorch.org/docs/stable/torch.compiler.html
 - torch.compile: backend="cudagraphs" (CUDA graphs with AOT Autograd)
+
+torch.compile configs also record compile_time_ms, the latency of the first (compiling)
+call, and keep compiled artifacts per (problem, backend, mode), see
+kernelbench.torch_compile_cache
+
+Recording is resumable and device parallel:
+- every measured problem is appended to <file_name>.checkpoint.jsonl as soon as it is done,
+  a restarted run skips the (problem hash, config) entries already in there
+- problems are fanned out over one worker process per visible GPU,
+  or over CPU workers when recording on CPU (devices=["cpu"] * n)
 """
 
 REPO_TOP_PATH = os.path.abspath(
@@ -84,25 +103,30 @@ def measure_program_time(
 ) -> dict:
     """
     Measure the time of a KernelBench reference architecture
+    device: a CUDA device, timed with CUDA events, or "cpu", timed with a wall clock
+
+    With torch.compile the first call, which compiles the model with the problem's
+    persistent compile cache, is timed separately as compile_time_ms
     """
+    device = torch.device(device)
+    on_cuda = device.type == "cuda"
     context = {}
     Model, get_init_inputs, get_inputs = load_original_model_and_inputs(
         ref_arch_src, context
     )
     try:
         with torch.no_grad():
-            torch.cuda.synchronize(device=device)
+            if on_cuda:
+                torch.cuda.synchronize(device=device)
             set_seed(42)
             inputs = get_inputs()
             set_seed(42)
             init_inputs = get_init_inputs()
             inputs = [
-                x.cuda(device=device) if isinstance(x, torch.Tensor) else x
-                for x in inputs
+                x.to(device) if isinstance(x, torch.Tensor) else x for x in inputs
             ]
             init_inputs = [
-                x.cuda(device=device) if isinstance(x, torch.Tensor) else x
-                for x in init_inputs
+                x.to(device) if isinstance(x, torch.Tensor) else x for x in init_inputs
             ]
 
             # Initialize PyTorch model, use this for eager mode execution
@@ -118,12 +142,35 @@ def measure_program_time(
             else:
                 print(f"Using PyTorch Eager Execution on {ref_arch_name}")
 
-            model = model.cuda(device=device)
-            torch.cuda.synchronize(device=device)
-            elapsed_times = time_execution_with_cuda_event(
-                model, *inputs, num_trials=num_trials, verbose=verbose, device=device
-            )
-            runtime_stats = get_timing_stats(elapsed_times, device=device)
+            model = model.to(device)
+            compile_time_ms = None
+            if use_torch_compile:
+                compile_time_ms = time_compilation(
+                    model,
+                    inputs,
+                    ref_arch_src,
+                    torch_compile_backend,
+                    torch_compile_options,
+                    device,
+                )
+            if on_cuda:
+                torch.cuda.synchronize(device=device)
+                elapsed_times = time_execution_with_cuda_event(
+                    model,
+                    *inputs,
+                    num_trials=num_trials,
+                    verbose=verbose,
+                    device=device,
+                )
+                runtime_stats = get_timing_stats(elapsed_times, device=device)
+            else:
+                elapsed_times = time_execution_with_cpu_timer(
+                    model, *inputs, num_trials=num_trials, verbose=verbose
+                )
+                runtime_stats = get_timing_stats(elapsed_times)
+                runtime_stats["device"] = "cpu"
+            if compile_time_ms is not None:
+                runtime_stats["compile_time_ms"] = float(f"{compile_time_ms:.4g}")
 
             if verbose:
                 print(f"{ref_arch_name} {runtime_stats}")
@@ -133,42 +180,115 @@ def measure_program_time(
         print(f"[Eval] Error in Measuring Performance: {e}")
 
 
+def baseline_config_key(
+    use_torch_compile: bool,
+    torch_compile_backend: str | None,
+    torch_compile_options: str | None,
+    num_trials: int,
+) -> str:
+    """
+    Identifies a timing configuration in checkpoints
+    """
+    mode = (
+        f"{torch_compile_backend}:{torch_compile_options}"
+        if use_torch_compile
+        else "eager"
+    )
+    return f"{mode}|trials={num_trials}"
+
+
+def _measure_baseline_task(task: dict, device: str, **measure_kwargs) -> dict:
+    return measure_program_time(
+        ref_arch_name=task["problem_name"],
+        ref_arch_src=task["ref_arch_src"],
+        device=device,
+        **measure_kwargs,
+    )
+
+
 def record_baseline_times(
     use_torch_compile: bool = False,
     torch_compile_backend: str = "inductor",
     torch_compile_options: str = "default",
     file_name: str = "baseline_time.json",
+    devices: list[str] | None = None,
+    levels: tuple[int, ...] = (1, 2, 3),
+    num_trials: int = 100,
+    kernel_bench_path: str = KERNEL_BENCH_PATH,
+    timing_dir: str = TIMING_DIR,
 ):
     """
     Generate baseline time for KernelBench,
     configure profiler options for PyTorch
     save to specified file
+
+    Each measured problem is checkpointed next to the output file and skipped when
+    the recording is restarted; problems are spread over devices, one worker each
+    (defaults to every visible GPU, or CPU workers without GPUs)
     """
-    device = torch.device("cuda:0")
-    json_results = {}
+    devices = devices or get_default_devices()
+    save_path = os.path.join(timing_dir, file_name)
+    checkpoint = JSONLCheckpoint(save_path + ".checkpoint.jsonl")
+    config = baseline_config_key(
+        use_torch_compile, torch_compile_backend, torch_compile_options, num_trials
+    )
+    measure_kwargs = dict(
+        num_trials=num_trials,
+        use_torch_compile=use_torch_compile,
+        torch_compile_backend=torch_compile_backend,
+        torch_compile_options=torch_compile_options,
+        verbose=False,  # do not print
+    )
 
-    for level in [1, 2, 3]:
-        PROBLEM_DIR = os.path.join(KERNEL_BENCH_PATH, "level" + str(level))
+    # every (level, problem) of the run, in dataset order
+    tasks = []
+    for level in levels:
+        PROBLEM_DIR = os.path.join(kernel_bench_path, "level" + str(level))
         dataset = construct_problem_dataset_from_problem_dir(PROBLEM_DIR)
-        json_results[f"level{level}"] = {}
-
-        num_problems = len(dataset)
-        for problem_id in tqdm(range(1, num_problems + 1)):
+        for problem_id in range(1, len(dataset) + 1):
             ref_arch_path, ref_arch_name, ref_arch_src = fetch_ref_arch_from_dataset(
                 dataset, problem_id
             )
-            runtime_stats = measure_program_time(
-                ref_arch_name=ref_arch_name,
-                ref_arch_src=ref_arch_src,
-                use_torch_compile=use_torch_compile,
-                torch_compile_backend=torch_compile_backend,
-                torch_compile_options=torch_compile_options,
-                device=device,
-                verbose=False,  # do not print
+            tasks.append(
+                {
+                    "level": level,
+                    "problem_name": ref_arch_name,
+                    "problem_hash": get_code_hash(ref_arch_src),
+                    "ref_arch_src": ref_arch_src,
+                }
             )
-            json_results[f"level{level}"][ref_arch_name] = runtime_stats
+    pending = [t for t in tasks if not checkpoint.is_done(t["problem_hash"], config)]
+    print(
+        f"[Baseline] {config}: {len(tasks) - len(pending)} / {len(tasks)} problems already measured, "
+        f"{len(pending)} to go on {devices}"
+    )
+
+    def record(task: dict, stats: dict | None):
+        if stats is None:
+            # failed measurements are not checkpointed, they are retried on restart
+            return
+        checkpoint.record(
+            {
+                "level": task["level"],
+                "problem_name": task["problem_name"],
+                "problem_hash": task["problem_hash"],
+                "config": config,
+                "stats": stats,
+            }
+        )
+
+    for task, _, stats in map_on_devices(
+        _measure_baseline_task, pending, devices, **measure_kwargs
+    ):
+        record(task, stats)
+
+    json_results = {f"level{level}": {} for level in levels}
+    for task in tasks:
+        entry = checkpoint.entries.get((task["problem_hash"], config))
+        json_results[f"level{task['level']}"][task["problem_name"]] = (
+            entry["stats"] if entry else None
+        )
 
-    save_path = os.path.join(TIMING_DIR, file_name)
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
 
     with open(save_path, "w") as f:
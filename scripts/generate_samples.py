@@ -9,14 +9,26 @@ from datasets import load_dataset
 from kernelbench.dataset import construct_kernelbench_dataset
 from kernelbench.prompt_constructor import (
     prompt_generate_custom_cuda_from_prompt_template,
+    prompt_parts_custom_cuda_from_prompt_template,
+    PromptParts,
+)
+from kernelbench.utils import read_file, maybe_multithread, extract_first_code
+from kernelbench.llm_utils import (
+    create_inference_server_from_presets,
+    ResponseCache,
+    SERVER_PRESETS,
+    PROMPT_CACHE_STATS,
+)
+from kernelbench.async_generation import (
+    AsyncGenerationEngine,
+    RateLimitConfig,
+    PROVIDER_RATE_LIMITS,
 )
-from kernelbench.utils import read_file, maybe_multithread
-from kernelbench.llm_utils import create_inference_server_from_presets
 
 """
 Batch Generate Samples for Particular Level
 
-Assume 1 sample per problem here
+num_samples > 1 generates several samples per problem (e.g. for pass@k)
 """
 
 REPO_TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -47,11 +59,37 @@ class GenerationConfig(Config):
         self.num_workers = 1
         self.api_query_interval = 0.0
 
+        # Asyncio generation engine (replaces the thread pool above when enabled)
+        # rate limits default to PROVIDER_RATE_LIMITS[server_type] when left as None
+        self.use_async_engine = False
+        self.requests_per_minute = None
+        self.tokens_per_minute = None
+        self.max_concurrency = None
+
+        # Persistent LLM response cache, keyed by prompt and sampling parameters
+        # "read_write" queries and stores misses, "replay" never queries the provider
+        self.response_cache_path = (
+            None  # e.g. os.path.join(runs_dir, "response_cache.db")
+        )
+        self.response_cache_mode = "read_write"
+        self.response_cache_max_size_mb = 1024
+
+        # Stream completions and stop once a complete ```python block with ModelNew arrived
+        # saves the output tokens and latency of whatever the model writes after the code
+        self.stream_until_code_block = False
+
+        # Put the static instructions and examples in a stable prefix, ahead of the problem,
+        # so providers serve it from their prompt cache (marked with cache_control for Anthropic)
+        self.cache_friendly_prompt = False
+
         # Inference config
         self.server_type = "deepseek"
         self.model_name = "deepseek-coder"
         self.max_tokens = 4096
         self.temperature = 0.0
+        # self-hosted servers (sglang), None uses the SERVER_PRESETS entry
+        self.server_address = None
+        self.server_port = None
 
         # Logging
         # Top Directory to Store Runs
@@ -60,9 +98,9 @@ class GenerationConfig(Config):
         self.verbose = False
         self.store_type = "local"  # TODO: add Database Integration
 
-        # Future support
-        # Migrate Monkeys code base to KernelBench
-        # self.num_samples = 0 # for sampling multiple samples per problem
+        # samples per problem (e.g. for pass@k), requested as n completions of one call
+        # on servers that support it, otherwise as concurrent single-completion calls
+        self.num_samples = 1
 
         self.log_prompt = False
 
@@ -80,13 +118,13 @@ class WorkArgs:
     sample_id: int
 
 
-def generate_sample_single(
-    work: WorkArgs,
-    config: GenerationConfig,
-    dataset,
-    inference_server: callable,
-    run_dir: str,
-) -> bool:
+def construct_sample_prompt(
+    work: WorkArgs, config: GenerationConfig, dataset, run_dir: str
+) -> str | PromptParts:
+    """
+    Fetch the problem for a work item and construct its prompt
+    Returns PromptParts (static prefix, problem suffix) with config.cache_friendly_prompt
+    """
     # 1. Fetch Problem
     if config.dataset_src == "huggingface":
         curr_problem_row = dataset.filter(
@@ -109,28 +147,55 @@ def generate_sample_single(
     problem_number = int(problem_name.split("_")[0])
     assert (
         problem_number == work.problem_id
-    ), f"Problem number in filename ({problem_number}) does not match config problem_id ({config.problem_id})"
+    ), f"Problem number in filename ({problem_number}) does not match config problem_id ({work.problem_id})"
 
     # Construct Prompt
-    custom_cuda_prompt = prompt_generate_custom_cuda_from_prompt_template(ref_arch_src)
+    if config.cache_friendly_prompt:
+        custom_cuda_prompt = prompt_parts_custom_cuda_from_prompt_template(ref_arch_src)
+    else:
+        custom_cuda_prompt = prompt_generate_custom_cuda_from_prompt_template(
+            ref_arch_src
+        )
     if config.log_prompt:
         prompt_path = os.path.join(
             run_dir,
             f"level_{config.level}_problem_{work.problem_id}_sample_{work.sample_id}_prompt.txt",
         )
         with open(prompt_path, "w") as f:
-            f.write(custom_cuda_prompt)
+            f.write(
+                custom_cuda_prompt.join()
+                if isinstance(custom_cuda_prompt, PromptParts)
+                else custom_cuda_prompt
+            )
 
-    # Query server with constructed prompt
-    custom_cuda = inference_server(custom_cuda_prompt)
-    custom_cuda = extract_first_code(custom_cuda, ["python", "cpp"])
+    return custom_cuda_prompt
+
+
+def query_inference_server(
+    inference_server: callable, prompt: str | PromptParts, **query_kwargs
+):
+    """
+    Send PromptParts as a cacheable prefix plus the problem, plain prompts as is
+    """
+    if isinstance(prompt, PromptParts):
+        return inference_server(
+            prompt.problem_suffix, prompt_prefix=prompt.static_prefix, **query_kwargs
+        )
+    return inference_server(prompt, **query_kwargs)
+
+
+def store_sample_response(
+    work: WorkArgs, config: GenerationConfig, response: str, run_dir: str
+) -> bool:
+    """
+    Extract the generated kernel from a model response and store it to the run directory
+    """
+    custom_cuda = extract_first_code(response, ["python", "cpp"])
     # check LLM is able to generate custom CUDA code
     assert custom_cuda is not None, "Custom CUDA code generation failed"
 
     if config.verbose:
-        print(
-            f"Generated sample {work.sample_id} for problem {problem_number}: {problem_name}"
-        )
+        print(f"Generated sample {work.sample_id} for problem {work.problem_id}")
 
     # Store to local file
     kernel_path = os.path.join(
@@ -143,6 +208,138 @@ def generate_sample_single(
     return True
 
 
+def generate_sample_single(
+    work: WorkArgs,
+    config: GenerationConfig,
+    dataset,
+    inference_server: callable,
+    run_dir: str,
+) -> bool:
+    custom_cuda_prompt = construct_sample_prompt(work, config, dataset, run_dir)
+
+    # Query server with constructed prompt
+    response = query_inference_server(
+        inference_server, custom_cuda_prompt, sample_id=work.sample_id
+    )
+    return store_sample_response(work, config, response, run_dir)
+
+
+def generate_problem_samples(
+    works: list[WorkArgs],
+    config: GenerationConfig,
+    dataset,
+    inference_server: callable,
+    run_dir: str,
+) -> list[bool]:
+    """
+    Generate all missing samples of one problem from a single prompt
+    """
+    custom_cuda_prompt = construct_sample_prompt(works[0], config, dataset, run_dir)
+
+    responses = query_inference_server(
+        inference_server,
+        custom_cuda_prompt,
+        sample_ids=[work.sample_id for work in works],
+        max_workers=config.num_workers,
+    )
+
+    generation_results = []
+    for work, response in zip(works, responses):
+        try:
+            generation_results.append(
+                store_sample_response(work, config, response, run_dir)
+            )
+        except Exception as e:
+            print(f"Error generating sample {work.problem_id} {work.sample_id}: {e}")
+    return generation_results
+
+
+def get_server_location(config: GenerationConfig) -> dict:
+    """
+    server_address / server_port set in the config, the ones left unset keep the preset
+    """
+    return {
+        key: getattr(config, key)
+        for key in ["server_address", "server_port"]
+        if getattr(config, key) is not None
+    }
+
+
+def generate_samples_async(
+    problems_to_run: list[WorkArgs],
+    config: GenerationConfig,
+    dataset,
+    run_dir: str,
+    response_cache: ResponseCache | None = None,
+) -> list[bool]:
+    """
+    Generate all samples with the asyncio engine under provider rate limits
+    The samples of a problem share its prompt, so the engine asks for them in one
+    request with n=... on servers that support it
+    """
+    rate_limits = PROVIDER_RATE_LIMITS.get(config.server_type, RateLimitConfig())
+    rate_limits = RateLimitConfig(
+        requests_per_minute=config.requests_per_minute
+        or rate_limits.requests_per_minute,
+        tokens_per_minute=config.tokens_per_minute or rate_limits.tokens_per_minute,
+        initial_concurrency=rate_limits.initial_concurrency,
+        min_concurrency=rate_limits.min_concurrency,
+        max_concurrency=config.max_concurrency or rate_limits.max_concurrency,
+    )
+    # same server the sync path (query_server with SERVER_PRESETS) would query
+    preset = SERVER_PRESETS.get(config.server_type, {})
+    location = {
+        "server_address": preset.get("server_address", "localhost"),
+        "server_port": preset.get("server_port", 30000),
+        **get_server_location(config),
+    }
+    engine = AsyncGenerationEngine(
+        server_type=config.server_type,
+        model_name=config.model_name,
+        rate_limits=rate_limits,
+        temperature=config.temperature,
+        max_tokens=config.max_tokens,
+        verbose=config.verbose,
+        response_cache=response_cache,
+        stream_until_code_block=config.stream_until_code_block,
+        **location,
+    )
+
+    works, prompts, prompt_prefixes = [], [], []
+    for work in problems_to_run:
+        try:
+            prompt = construct_sample_prompt(work, config, dataset, run_dir)
+            # same split as query_inference_server, the prefix is marked cacheable
+            if isinstance(prompt, PromptParts):
+                prompts.append(prompt.problem_suffix)
+                prompt_prefixes.append(prompt.static_prefix)
+            else:
+                prompts.append(prompt)
+                prompt_prefixes.append(None)
+            works.append(work)
+        except Exception as e:
+            print(f"Error generating sample {work.problem_id} {work.sample_id}: {e}")
+    generation_results = []
+
+    def _store(index: int, response: str):
+        # store each kernel as soon as it lands so evaluation can start on it
+        work = works[index]
+        try:
+            generation_results.append(
+                store_sample_response(work, config, response, run_dir)
+            )
+        except Exception as e:
+            print(f"Error generating sample {work.problem_id} {work.sample_id}: {e}")
+
+    engine.generate_batch(
+        prompts,
+        [work.sample_id for work in works],
+        on_response=_store,
+        prompt_prefixes=prompt_prefixes,
+    )
+    return generation_results
+
+
 def generate_sample_launcher(
     work: WorkArgs,
     config: GenerationConfig,
@@ -157,6 +354,22 @@ def generate_sample_launcher(
         return None
 
 
+def generate_problem_samples_launcher(
+    works: list[WorkArgs],
+    config: GenerationConfig,
+    dataset,
+    inference_server: callable,
+    run_dir: str,
+):
+    try:
+        return generate_problem_samples(
+            works, config, dataset, inference_server, run_dir
+        )
+    except Exception as e:
+        print(f"Error generating samples for problem {works[0].problem_id}: {e}")
+        return None
+
+
 def check_kernel_exists(
     run_dir: str, level: int, problem_id: int, sample_id: int
 ) -> bool:
@@ -195,7 +408,7 @@ def main(config: GenerationConfig):
         problem_id_range = range(config.subset[0], config.subset[1])
 
     print(
-        f"Generating on 1 sample each for level {config.level} problems: {problem_id_range}"
+        f"Generating on {config.num_samples} sample(s) each for level {config.level} problems: {problem_id_range}"
     )
 
     # set up run directory
@@ -211,34 +424,71 @@ def main(config: GenerationConfig):
     for problem_id in range(
         problem_id_range.start, problem_id_range.stop + 1
     ):  # end index is inclusive
-        # assume sample id is 0 for now
-        if not check_kernel_exists(run_dir, config.level, problem_id, sample_id=0):
-            problems_to_run.append(
-                WorkArgs(problem_id=int(problem_id), sample_id=0)  # fix to 0 for now
-            )
+        for sample_id in range(config.num_samples):
+            if not check_kernel_exists(run_dir, config.level, problem_id, sample_id):
+                problems_to_run.append(
+                    WorkArgs(problem_id=int(problem_id), sample_id=sample_id)
+                )
+
+    response_cache = None
+    if config.response_cache_path is not None:
+        response_cache = ResponseCache(
+            config.response_cache_path,
+            mode=config.response_cache_mode,
+            max_size_mb=config.response_cache_max_size_mb,
+        )
 
-    # Create inference function with config parameters
-    # We provide some presets in utils but you can also pass in your own, see query_server for more details
-    inference_server = create_inference_server_from_presets(
-        server_type=config.server_type,
-        model_name=config.model_name,
-        temperature=config.temperature,
-        max_tokens=config.max_tokens,
-        verbose=config.verbose,
-    )
+    if config.use_async_engine:
+        generation_results = generate_samples_async(
+            problems_to_run, config, curr_level_dataset, run_dir, response_cache
+        )
+    else:
+        # Create inference function with config parameters
+        # We provide some presets in utils but you can also pass in your own, see query_server for more details
+        inference_server = create_inference_server_from_presets(
+            server_type=config.server_type,
+            model_name=config.model_name,
+            temperature=config.temperature,
+            max_tokens=config.max_tokens,
+            verbose=config.verbose,
+            response_cache=response_cache,
+            stream_until_code_block=config.stream_until_code_block,
+            **get_server_location(config),
+        )
 
-    # Launch workers
-    generation_results = maybe_multithread(
-        generate_sample_launcher,
-        problems_to_run,
-        config.num_workers,
-        time_interval=config.api_query_interval,
-        # extra args
-        config=config,
-        dataset=curr_level_dataset,
-        inference_server=inference_server,
-        run_dir=run_dir,
-    )
+        if config.num_samples == 1:
+            # Launch workers
+            generation_results = maybe_multithread(
+                generate_sample_launcher,
+                problems_to_run,
+                config.num_workers,
+                time_interval=config.api_query_interval,
+                # extra args
+                config=config,
+                dataset=curr_level_dataset,
+                inference_server=inference_server,
+                run_dir=run_dir,
+            )
+        else:
+            # one request per problem for all of its missing samples
+            works_by_problem = {}
+            for work in problems_to_run:
+                works_by_problem.setdefault(work.problem_id, []).append(work)
+            problem_results = maybe_multithread(
+                generate_problem_samples_launcher,
+                list(works_by_problem.values()),
+                config.num_workers,
+                time_interval=config.api_query_interval,
+                # extra args
+                config=config,
+                dataset=curr_level_dataset,
+                inference_server=inference_server,
+                run_dir=run_dir,
+            )
+            generation_results = [r for results in problem_results for r in results]
+
+    if PROMPT_CACHE_STATS.num_requests > 0:
+        print(f"[PromptCache] {PROMPT_CACHE_STATS.summary()}")
 
     num_generated_samples = len(generation_results)
     total_problems = len(problems_to_run)
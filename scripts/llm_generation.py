@@ -1,4 +1,5 @@
 import asyncio
+import json
 import weave
 from weave.trace.context import call_context
 import requests
@@ -13,6 +14,7 @@ from kernelbench.utils import read_file, extract_python_code
 from kernelbench.prompt_constructor import (
     prompt_generate_prompt_with_hardware_info_from_template,
 )
+from kernelbench.tracing import trace_op, configure_tracing
 from io import BytesIO
 
 
@@ -36,6 +38,8 @@ class ScriptArgs:
     )
     debug: bool = False
     N: int = 5
+    # fraction of predictions whose prompt / generation / benchmark calls are traced
+    trace_sample_rate: float = 1.0
 
 
 args = sp.parse(ScriptArgs)
@@ -63,7 +67,7 @@ class LLMCuda(weave.Model):
     temperature: float = 0.5
     max_tokens: int = 2000
 
-    @weave.op
+    @trace_op
     def prepare_prompt(self, filename: str, gpu_name: str):
         ref_arch_src = read_file(filename)
         prompt = prompt_generate_prompt_with_hardware_info_from_template(
@@ -71,7 +75,7 @@ class LLMCuda(weave.Model):
         )
         return prompt
 
-    @weave.op
+    @trace_op
     async def generate_with_llm(self, prompt) -> LLMResponse:
         response = await acompletion(
             model=self.model,
@@ -97,11 +101,12 @@ class LLMCuda(weave.Model):
 
 
 weave.init("claude_cuda")
+configure_tracing(sample_rate=args.trace_sample_rate, backend="weave")
 
 claude = LLMCuda()
 
 
-@weave.op
+@trace_op
 def call_benchmark_server(
     ref_pytorch_code,
     optimized_code,
@@ -144,6 +149,43 @@ def call_benchmark_server(
         return {"error": "Invalid JSON response", "content": str(response.content)}
 
 
+def call_benchmark_server_batch(
+    ref_pytorch_code,
+    optimized_codes,
+    benchmark_server_url=args.benchmark_server_url,
+    benchmark_server_params=BENCHMARK_SERVER_PARAMS,
+):
+    """
+    Benchmark many kernels against one reference with a single request
+    Yields (kernel index, result) as the server finishes each kernel
+    """
+    files = [("ref_file", ("ref_file.py", BytesIO(ref_pytorch_code.encode("utf-8"))))]
+    files += [
+        ("kernel_files", (f"kernel_file_{i}.py", BytesIO(code.encode("utf-8"))))
+        for i, code in enumerate(optimized_codes)
+    ]
+
+    with requests.post(
+        benchmark_server_url + "/batch",
+        files=files,
+        data=benchmark_server_params,
+        stream=True,
+    ) as response:
+        if response.status_code != 200:
+            error = {
+                "error": f"Server error: {response.status_code}",
+                "content": str(response.content),
+            }
+            for index in range(len(optimized_codes)):
+                yield index, error
+            return
+        for line in response.iter_lines():
+            if not line:
+                continue
+            line = json.loads(line)
+            yield line["index"], line.get("result") or {"error": line["error"]}
+
+
 @weave.op
 def score_kernel(output: LLMResponse, ref_code: str) -> dict:
     extracted_code = extract_python_code(output.generated_code)
@@ -3,6 +3,7 @@ import shutil
 import importlib.util
 import sys
 import tempfile
+import time
 
 import torch
 import numpy as np
@@ -10,7 +11,12 @@ import pydra
 from pydra import REQUIRED, Config
 from datasets import load_dataset
 
-from kernelbench.eval import eval_kernel_against_ref, KernelExecResult
+from kernelbench.eval import (
+    eval_kernel_against_ref,
+    KernelExecResult,
+    PreparedReference,
+    ProgressCallback,
+)
 from kernelbench.utils import read_file, set_gpu_arch
 
 """
@@ -75,23 +81,37 @@ class ScriptConfig(Config):
 
 
 def evaluate_single_sample_src(
-    ref_arch_src: str, kernel_src: str, configs: dict, device: torch.device
+    ref_arch_src: str,
+    kernel_src: str,
+    configs: dict,
+    device: torch.device,
+    reference: PreparedReference = None,
+    progress_callback: ProgressCallback = None,
 ) -> KernelExecResult:
     """
     Evaluate a single sample source code against a reference source code
+    reference: optional prepare_reference output shared across samples of one reference
+    progress_callback: optional (event, data) callback, see eval_kernel_against_ref
+    configs may also set profile, profile_top_n and profile_trace (Chrome traces are
+    written to <build_dir>/profile)
     """
 
     kernel_hash = str(hash(kernel_src))
     build_dir = os.path.join(configs["build_dir_prefix"], "test_build", kernel_hash)
+    # filled in by eval_kernel_against_ref, kept in metadata even if the eval crashes
+    phase_times_ms = {}
 
     if configs["clear_cache"]:  # fresh kernel build
         print(f"[INFO] Clearing cache for build directory: {build_dir}")
+        phase_start = time.perf_counter()
         shutil.rmtree(build_dir, ignore_errors=True)
+        phase_times_ms["clear_cache"] = (time.perf_counter() - phase_start) * 1000
 
     num_correct_trials = configs["num_correct_trials"]
     num_perf_trials = configs["num_perf_trials"]
     verbose = configs["verbose"]
     measure_performance = configs["measure_performance"]
+    profile = configs.get("profile", False)
     try:
         eval_result = eval_kernel_against_ref(
             original_model_src=ref_arch_src,
@@ -102,6 +122,16 @@ def evaluate_single_sample_src(
             num_perf_trials=num_perf_trials,
             build_dir=build_dir,
             device=device,
+            reference=reference,
+            progress_callback=progress_callback,
+            profile=profile,
+            profile_top_n=configs.get("profile_top_n", 10),
+            profile_trace_dir=(
+                os.path.join(build_dir, "profile")
+                if profile and configs.get("profile_trace", False)
+                else None
+            ),
+            phase_times_ms=phase_times_ms,
         )
         return eval_result
     except Exception as e:
@@ -112,6 +142,7 @@ def evaluate_single_sample_src(
                 "cuda_error": f"CUDA Error: {str(e)}",
                 "hardware": torch.cuda.get_device_name(device=device),
                 "device": str(device),
+                "phase_times_ms": phase_times_ms,
             }
             eval_result = KernelExecResult(
                 compiled=False, correctness=False, metadata=metadata
@@ -122,6 +153,7 @@ def evaluate_single_sample_src(
                 "other_error": f"error: {str(e)}",
                 "hardware": torch.cuda.get_device_name(device=device),
                 "device": str(device),
+                "phase_times_ms": phase_times_ms,
             }
             eval_result = KernelExecResult(
                 compiled=False, correctness=False, metadata=metadata
@@ -1,18 +1,75 @@
+import asyncio
+import json
 import os
-import shutil
-import tempfile
-from typing import Optional, Dict, Any, List
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, List
 
 import fastapi
 import uvicorn
 import torch
-from fastapi import UploadFile, File, HTTPException, status
+from fastapi import UploadFile, File, Form, HTTPException, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 # Import the relevant modules directly
 from scripts.run_and_check import evaluate_single_sample_src
 from scripts.generate_baseline_time import measure_program_time
-from kernelbench.utils import read_file, set_gpu_arch
+from kernelbench.eval import prepare_reference
+from kernelbench.utils import set_gpu_arch
+from kernelbench.job_queue import JobQueue, QueueFullError
+from kernelbench.server_metrics import CONTENT_TYPE, BenchmarkServerMetrics
+from kernelbench.roofline import estimate_speed_of_light, percent_of_speed_of_light
+from kernelbench.server_cache import (
+    BaselineCache,
+    TTLCache,
+    get_hardware_name,
+    result_cache_key,
+)
+
+"""
+Benchmark server: evaluate a candidate kernel against a reference and time both
+
+Evaluations are blocking GPU work, so requests are queued and run by one worker
+thread per GPU instead of on the event loop:
+- POST /jobs submits a benchmark and returns its job id (429 when the queue is full)
+- GET /jobs/{job_id} polls its status, GET /jobs/{job_id}/result fetches the result
+- POST /benchmark submits and waits for the result, as before
+- results of identical (reference, kernel, trials, hardware) submissions are memoized
+  and returned without queuing, flagged with cached=true
+- POST /benchmark/stream runs the same job but answers with server-sent events: phase
+  transitions, compile status, each correctness trial, kernel and reference timing
+  percentiles, then the result; clients can hang up early on a failure
+- GET /metrics exposes Prometheus metrics: per-phase latency histograms, outcomes per
+  error class, queue depth, cache hit rates and GPU utilization
+- POST /benchmark/batch evaluates many kernels against one reference, loading the
+  reference, generating its inputs and outputs and timing it once, and streams one
+  NDJSON line per kernel as it completes
+
+Usage:
+python scripts/server_run_and_check.py
+KERNELBENCH_SERVER_DEVICES=cuda:0,cuda:1 KERNELBENCH_SERVER_MAX_QUEUE=128 python scripts/server_run_and_check.py
+"""
+
+# comma separated devices with one worker each, defaults to every visible GPU
+SERVER_DEVICES_ENV = "KERNELBENCH_SERVER_DEVICES"
+SERVER_MAX_QUEUE_ENV = "KERNELBENCH_SERVER_MAX_QUEUE"
+
+# Reference timings are measured once per (reference, hardware, torch version,
+# compile mode, trials) and reused until they expire or are evicted
+BASELINE_CACHE = BaselineCache(
+    max_entries=int(os.environ.get("KERNELBENCH_BASELINE_CACHE_SIZE", 1024)),
+    ttl_s=float(os.environ.get("KERNELBENCH_BASELINE_CACHE_TTL_S", 24 * 3600)),
+)
+
+# Prometheus metrics of this server process, served on GET /metrics
+METRICS = BenchmarkServerMetrics()
+
+# Complete results per result_cache_key, so resubmitted kernels are not evaluated again
+RESULT_CACHE = TTLCache(
+    max_entries=int(os.environ.get("KERNELBENCH_RESULT_CACHE_SIZE", 4096)),
+    ttl_s=float(os.environ.get("KERNELBENCH_RESULT_CACHE_TTL_S", 24 * 3600)),
+)
 
 
 # Define the response model
@@ -21,113 +78,195 @@ class BenchmarkResult(BaseModel):
     correctness: bool
     ref_exec_eager_time_ms: Optional[float] = None
     ref_exec_compile_time_ms: Optional[float] = None
+    # latency of compiling the reference with torch.compile (first call)
+    ref_torch_compile_latency_ms: Optional[float] = None
     kernel_exec_time_ms: Optional[float] = None
     speedup_vs_eager: Optional[float] = None
     speedup_vs_compile: Optional[float] = None
+    # roofline lower bound on the runtime of the problem on this GPU, see roofline
+    speed_of_light_ms: Optional[float] = None
+    ref_eager_percent_of_sol: Optional[float] = None
+    kernel_percent_of_sol: Optional[float] = None
     metadata: Dict[str, Any]
     error: Optional[str] = None
+    baseline_cached: bool = False  # reference timings served from the baseline cache
+    cached: bool = False  # whole result served from the result cache
 
 
-app = fastapi.FastAPI()
-
-
-@app.post("/benchmark", response_model=BenchmarkResult)
-async def run_benchmark(
-    ref_file: UploadFile = File(...),
-    kernel_file: UploadFile = File(...),
-    gpu_arch: List[str] = ["Ada"],
-    num_correct_trials: int = 5,
-    num_perf_trials: int = 100,
-    verbose: bool = False,
-):
-    # Create temporary files for the uploaded code
-    with (
-        tempfile.NamedTemporaryFile(delete=False, suffix=".py", mode="wb") as ref_tmp,
-        tempfile.NamedTemporaryFile(
-            delete=False, suffix=".py", mode="wb"
-        ) as kernel_tmp,
-    ):
-        try:
-            # Save uploaded file contents to temporary files
-            shutil.copyfileobj(ref_file.file, ref_tmp)
-            shutil.copyfileobj(kernel_file.file, kernel_tmp)
+@dataclass
+class BenchmarkRequest:
+    ref_arch_src: str
+    kernel_src: str
+    gpu_arch: List[str]
+    num_correct_trials: int = 5
+    num_perf_trials: int = 100
+    verbose: bool = False
+    # called from the worker thread with (event, data) as the evaluation progresses
+    on_progress: Optional[Callable[[str, dict], None]] = None
 
-            # Ensure files are flushed and closed before script access
-            ref_path = ref_tmp.name
-            kernel_path = kernel_tmp.name
-        finally:
-            ref_file.file.close()
-            kernel_file.file.close()
 
-    try:
-        # Read the contents of the files
-        ref_arch_src = read_file(ref_path)
-        kernel_src = read_file(kernel_path)
-
-        # Set up GPU architecture
-        set_gpu_arch(gpu_arch)
-
-        # Default device
-        device = torch.device("cuda:0")
-
-        # Prepare configs
-        configs = {
-            "num_correct_trials": num_correct_trials,
-            "num_perf_trials": num_perf_trials,
-            "verbose": verbose,
-            "measure_performance": True,
-            "build_dir_prefix": "server_builds",
-            "clear_cache": False,
-        }
+@dataclass
+class BenchmarkBatchRequest:
+    ref_arch_src: str
+    kernel_srcs: List[str]
+    gpu_arch: List[str]
+    num_correct_trials: int = 5
+    num_perf_trials: int = 100
+    verbose: bool = False
+    # called from the worker thread with (kernel index, result) as each kernel completes
+    on_result: Optional[Callable[[int, BenchmarkResult], None]] = None
 
-        # Evaluate kernel against reference
-        kernel_eval_result = evaluate_single_sample_src(
-            ref_arch_src=ref_arch_src,
-            kernel_src=kernel_src,
-            configs=configs,
-            device=device,
-        )
 
-        # Measure reference times
-        ref_time_eager_result = measure_program_time(
-            ref_arch_name="Reference Program",
-            ref_arch_src=ref_arch_src,
-            num_trials=num_perf_trials,
-            use_torch_compile=False,
-            device=device,
-        )
+def _timed(phase: str, fn: Callable[[], Any]) -> Callable[[], Any]:
+    def timed_fn():
+        with METRICS.time_phase(phase):
+            return fn()
 
-        ref_time_compile_result = measure_program_time(
-            ref_arch_name="Reference Program",
-            ref_arch_src=ref_arch_src,
-            num_trials=num_perf_trials,
-            use_torch_compile=True,
-            torch_compile_backend="inductor",
-            torch_compile_options="default",
-            device=device,
+    return timed_fn
+
+
+def _observe_result(result: BenchmarkResult) -> BenchmarkResult:
+    METRICS.observe_eval(
+        result.compiled, result.correctness, result.metadata, result.error
+    )
+    return result
+
+
+def _should_cache_result(result: BenchmarkResult | None) -> bool:
+    # errors may be transient (e.g. build lock contention), let them be retried
+    return result is not None and result.error is None
+
+
+def _mark_cached(result: BenchmarkResult) -> BenchmarkResult:
+    return result.model_copy(update={"cached": True})
+
+
+def _eval_configs(num_correct_trials: int, num_perf_trials: int, verbose: bool) -> dict:
+    return {
+        "num_correct_trials": num_correct_trials,
+        "num_perf_trials": num_perf_trials,
+        "verbose": verbose,
+        "measure_performance": True,
+        "build_dir_prefix": "server_builds",
+        "clear_cache": False,
+    }
+
+
+def measure_reference_times(
+    ref_arch_src: str, num_perf_trials: int, device: torch.device
+) -> tuple[dict | None, dict | None, bool]:
+    """
+    Eager and torch.compile reference timings, measured or reused from the baseline cache
+    Returns (eager stats, compile stats, whether both came from the cache)
+    """
+    hardware = get_hardware_name(device)
+    ref_time_eager_result, eager_cached = BASELINE_CACHE.get_or_measure(
+        _timed(
+            "ref_eager_timing",
+            lambda: measure_program_time(
+                ref_arch_name="Reference Program",
+                ref_arch_src=ref_arch_src,
+                num_trials=num_perf_trials,
+                use_torch_compile=False,
+                device=device,
+            ),
+        ),
+        ref_arch_src,
+        hardware,
+        num_perf_trials,
+    )
+
+    ref_time_compile_result, compile_cached = BASELINE_CACHE.get_or_measure(
+        _timed(
+            "ref_compile_timing",
+            lambda: measure_program_time(
+                ref_arch_name="Reference Program",
+                ref_arch_src=ref_arch_src,
+                num_trials=num_perf_trials,
+                use_torch_compile=True,
+                torch_compile_backend="inductor",
+                torch_compile_options="default",
+                device=device,
+            ),
+        ),
+        ref_arch_src,
+        hardware,
+        num_perf_trials,
+        use_torch_compile=True,
+        torch_compile_backend="inductor",
+        torch_compile_options="default",
+    )
+    if not compile_cached and (ref_time_compile_result or {}).get("compile_time_ms"):
+        METRICS.observe_phase(
+            "ref_torch_compile", ref_time_compile_result["compile_time_ms"] / 1000
         )
+    return (
+        ref_time_eager_result,
+        ref_time_compile_result,
+        eager_cached and compile_cached,
+    )
+
+
+def estimate_reference_speed_of_light(
+    ref_arch_src: str, device: torch.device
+) -> dict | None:
+    """
+    Roofline estimate of the reference on device's GPU, None off GPU or for GPUs
+    without specs
+    Counting FLOPs runs the reference, so the estimate is cached next to its timings
+    """
+    if torch.device(device).type != "cuda":
+        return None
+    hardware = get_hardware_name(device)
+
+    def estimate() -> dict:
+        try:
+            return estimate_speed_of_light(ref_arch_src, hardware)
+        except Exception as e:
+            # cached as well, the next submission would fail the same way
+            print(f"[Roofline] No speed-of-light estimate: {e}")
+            return {}
 
-        # Extract values
-        kernel_exec_time = kernel_eval_result.runtime
-        ref_exec_eager_time = ref_time_eager_result.get("mean", None)
-        ref_exec_compile_time = ref_time_compile_result.get("mean", None)
+    speed_of_light, _ = BASELINE_CACHE.get_or_estimate(
+        _timed("speed_of_light", estimate), ref_arch_src, hardware
+    )
+    return speed_of_light or None
 
-        # Calculate speedups
-        speedup_vs_eager = None
-        speedup_vs_compile = None
 
-        if kernel_eval_result.correctness and kernel_exec_time and ref_exec_eager_time:
-            speedup_vs_eager = ref_exec_eager_time / kernel_exec_time
+def make_benchmark_result(
+    kernel_eval_result,
+    ref_time_eager_result: dict | None,
+    ref_time_compile_result: dict | None,
+    baseline_cached: bool,
+    speed_of_light: dict | None = None,
+) -> BenchmarkResult:
+    """
+    Combine the kernel evaluation and the reference timings into speedups
+    speed_of_light: roofline estimate of the problem, to report % of speed-of-light
+    """
+    # Extract values
+    kernel_exec_time = kernel_eval_result.runtime
+    ref_exec_eager_time = (ref_time_eager_result or {}).get("mean", None)
+    ref_exec_compile_time = (ref_time_compile_result or {}).get("mean", None)
 
-        if (
-            kernel_eval_result.correctness
-            and kernel_exec_time
-            and ref_exec_compile_time
-        ):
-            speedup_vs_compile = ref_exec_compile_time / kernel_exec_time
+    # Calculate speedups
+    speedup_vs_eager = None
+    speedup_vs_compile = None
 
-        # Prepare output summary
-        raw_output = f"""
+    if kernel_eval_result.correctness and kernel_exec_time and ref_exec_eager_time:
+        speedup_vs_eager = ref_exec_eager_time / kernel_exec_time
+
+    if kernel_eval_result.correctness and kernel_exec_time and ref_exec_compile_time:
+        speedup_vs_compile = ref_exec_compile_time / kernel_exec_time
+
+    sol_time = (speed_of_light or {}).get("sol_time_ms")
+    ref_percent_of_sol = percent_of_speed_of_light(sol_time, ref_exec_eager_time)
+    kernel_percent_of_sol = None
+    if kernel_eval_result.correctness:
+        kernel_percent_of_sol = percent_of_speed_of_light(sol_time, kernel_exec_time)
+
+    # Prepare output summary
+    raw_output = f"""
 ==============================
 [Eval] Kernel eval result: {kernel_eval_result}
 ------------------------------
@@ -136,43 +275,528 @@ async def run_benchmark(
 [Timing] Custom Kernel exec time: {kernel_exec_time} ms
 ------------------------------
 """
-        if kernel_eval_result.correctness:
-            raw_output += f"""
+    if kernel_eval_result.correctness:
+        raw_output += f"""
 [Speedup] Speedup over eager: {speedup_vs_eager:.2f}x
 [Speedup] Speedup over torch.compile: {speedup_vs_compile:.2f}x
 """
-        else:
-            raw_output += (
-                "[Speedup] Speedup Not Available as Kernel did not pass correctness"
+        if kernel_percent_of_sol is not None:
+            raw_output += f"[Roofline] Custom Kernel at {kernel_percent_of_sol:.1f}% of speed-of-light ({sol_time:.4g} ms)\n"
+    else:
+        raw_output += (
+            "[Speedup] Speedup Not Available as Kernel did not pass correctness"
+        )
+
+    raw_output += "=============================="
+
+    # Prepare the response
+    response = BenchmarkResult(
+        compiled=kernel_eval_result.compiled,
+        correctness=kernel_eval_result.correctness,
+        ref_exec_eager_time_ms=ref_exec_eager_time,
+        ref_exec_compile_time_ms=ref_exec_compile_time,
+        ref_torch_compile_latency_ms=(ref_time_compile_result or {}).get(
+            "compile_time_ms"
+        ),
+        kernel_exec_time_ms=kernel_exec_time,
+        speedup_vs_eager=speedup_vs_eager,
+        speedup_vs_compile=speedup_vs_compile,
+        speed_of_light_ms=sol_time,
+        ref_eager_percent_of_sol=ref_percent_of_sol,
+        kernel_percent_of_sol=kernel_percent_of_sol,
+        metadata=kernel_eval_result.metadata or {},
+        baseline_cached=baseline_cached,
+    )
+    print(raw_output)
+    return response
+
+
+def run_benchmark_job(request: BenchmarkRequest, device: str) -> BenchmarkResult:
+    """
+    Evaluate the kernel and time the reference on device, blocking
+    """
+    # Set up GPU architecture
+    set_gpu_arch(request.gpu_arch)
+
+    # Device owned by the worker running this job
+    device = torch.device(device)
+
+    def report(event: str, **data):
+        if request.on_progress is not None:
+            request.on_progress(event, data)
+
+    def benchmark() -> BenchmarkResult:
+        # Evaluate kernel against reference
+        kernel_eval_result = evaluate_single_sample_src(
+            ref_arch_src=request.ref_arch_src,
+            kernel_src=request.kernel_src,
+            configs=_eval_configs(
+                request.num_correct_trials, request.num_perf_trials, request.verbose
+            ),
+            device=device,
+            progress_callback=request.on_progress,
+        )
+
+        # Measure reference times, or reuse them from an earlier submission
+        report("phase", phase="reference_timing")
+        eager_stats, compile_stats, baseline_cached = measure_reference_times(
+            request.ref_arch_src, request.num_perf_trials, device
+        )
+        report(
+            "reference_timing",
+            eager=eager_stats,
+            compile=compile_stats,
+            cached=baseline_cached,
+        )
+        return _observe_result(
+            make_benchmark_result(
+                kernel_eval_result,
+                eager_stats,
+                compile_stats,
+                baseline_cached,
+                estimate_reference_speed_of_light(request.ref_arch_src, device),
             )
+        )
 
-        raw_output += "=============================="
+    report("phase", phase="started", device=str(device))
+
+    key = result_cache_key(
+        request.ref_arch_src,
+        request.kernel_src,
+        get_hardware_name(device),
+        request.num_correct_trials,
+        request.num_perf_trials,
+        request.gpu_arch,
+    )
+    result, cached = RESULT_CACHE.get_or_compute(
+        key, benchmark, should_cache=_should_cache_result
+    )
+    return _mark_cached(result) if cached else result
+
+
+def run_benchmark_batch_job(
+    request: BenchmarkBatchRequest, device: str
+) -> List[BenchmarkResult]:
+    """
+    Evaluate every kernel against one reference on device, blocking
+
+    The reference is loaded, its correctness and timing inputs generated and its
+    outputs computed once, then shared by all kernels; each kernel's result is
+    reported through request.on_result as soon as it is available.
+    Memoized kernels are answered from the result cache; the reference is only
+    prepared if at least one kernel has to be evaluated
+    """
+    set_gpu_arch(request.gpu_arch)
+    device = torch.device(device)
+    hardware = get_hardware_name(device)
+    configs = _eval_configs(
+        request.num_correct_trials, request.num_perf_trials, request.verbose
+    )
+    shared = {}
+
+    def benchmark(kernel_src: str) -> BenchmarkResult:
+        if not shared:
+            # a failing reference fails the whole job
+            with METRICS.time_phase("prepare_reference"):
+                shared["reference"] = prepare_reference(
+                    request.ref_arch_src,
+                    num_correct_trials=request.num_correct_trials,
+                    verbose=request.verbose,
+                    device=device,
+                )
+            shared["reference_times"] = measure_reference_times(
+                request.ref_arch_src, request.num_perf_trials, device
+            )
+            shared["speed_of_light"] = estimate_reference_speed_of_light(
+                request.ref_arch_src, device
+            )
+        try:
+            kernel_eval_result = evaluate_single_sample_src(
+                ref_arch_src=request.ref_arch_src,
+                kernel_src=kernel_src,
+                configs=configs,
+                device=device,
+                reference=shared["reference"],
+            )
+            result = make_benchmark_result(
+                kernel_eval_result,
+                *shared["reference_times"],
+                speed_of_light=shared["speed_of_light"],
+            )
+        except Exception as e:
+            # one broken kernel must not take down the rest of the batch
+            result = BenchmarkResult(
+                compiled=False, correctness=False, metadata={}, error=str(e)
+            )
+        return _observe_result(result)
 
-        # Prepare the response
-        response = BenchmarkResult(
-            compiled=kernel_eval_result.compiled,
-            correctness=kernel_eval_result.correctness,
-            ref_exec_eager_time_ms=ref_exec_eager_time,
-            ref_exec_compile_time_ms=ref_exec_compile_time,
-            kernel_exec_time_ms=kernel_exec_time,
-            speedup_vs_eager=speedup_vs_eager,
-            speedup_vs_compile=speedup_vs_compile,
-            metadata=kernel_eval_result.metadata or {},
+    results = []
+    for index, kernel_src in enumerate(request.kernel_srcs):
+        key = result_cache_key(
+            request.ref_arch_src,
+            kernel_src,
+            hardware,
+            request.num_correct_trials,
+            request.num_perf_trials,
+            request.gpu_arch,
         )
-        print(raw_output)
-        return response
+        result, cached = RESULT_CACHE.get_or_compute(
+            key,
+            lambda: benchmark(kernel_src),
+            should_cache=_should_cache_result,
+        )
+        if cached:
+            result = _mark_cached(result)
+        results.append(result)
+        if request.on_result is not None:
+            request.on_result(index, result)
+    return results
+
 
+def get_default_devices() -> list[str]:
+    if os.environ.get(SERVER_DEVICES_ENV):
+        return os.environ[SERVER_DEVICES_ENV].split(",")
+    return [f"cuda:{i}" for i in range(torch.cuda.device_count())] or ["cuda:0"]
+
+
+async def _read_benchmark_request(
+    ref_file: UploadFile,
+    kernel_file: UploadFile,
+    gpu_arch: List[str],
+    num_correct_trials: int,
+    num_perf_trials: int,
+    verbose: bool,
+) -> BenchmarkRequest:
+    try:
+        ref_arch_src = (await ref_file.read()).decode("utf-8")
+        kernel_src = (await kernel_file.read()).decode("utf-8")
     except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An error occurred during benchmarking: {str(e)}",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to read uploaded files: {str(e)}",
         )
     finally:
-        # Clean up temporary files
-        if "ref_path" in locals() and os.path.exists(ref_path):
-            os.remove(ref_path)
-        if "kernel_path" in locals() and os.path.exists(kernel_path):
-            os.remove(kernel_path)
+        await ref_file.close()
+        await kernel_file.close()
+    return BenchmarkRequest(
+        ref_arch_src=ref_arch_src,
+        kernel_src=kernel_src,
+        gpu_arch=gpu_arch,
+        num_correct_trials=num_correct_trials,
+        num_perf_trials=num_perf_trials,
+        verbose=verbose,
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def create_app(
+    run_job: Callable[[BenchmarkRequest, str], BenchmarkResult] = run_benchmark_job,
+    devices: list[str] | None = None,
+    max_queue_size: int | None = None,
+    run_batch_job: Callable[
+        [BenchmarkBatchRequest, str], List[BenchmarkResult]
+    ] = run_benchmark_batch_job,
+) -> fastapi.FastAPI:
+    """
+    Benchmark app whose jobs run on one worker thread per device
+    run_job, run_batch_job and devices can be swapped, e.g. for CPU workers in tests
+    """
+
+    def _run(request, device: str):
+        if isinstance(request, BenchmarkBatchRequest):
+            return run_batch_job(request, device)
+        return run_job(request, device)
+
+    job_queue = JobQueue(
+        _run,
+        devices or get_default_devices(),
+        max_queue_size=max_queue_size or int(os.environ.get(SERVER_MAX_QUEUE_ENV, 64)),
+        on_finished=METRICS.observe_job,
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: fastapi.FastAPI):
+        try:
+            hardware_names = {get_hardware_name(d) for d in job_queue.devices}
+        except Exception:
+            hardware_names = set()
+        # memoized results can skip the queue only when every worker has the same hardware
+        app.state.hardware = hardware_names.pop() if len(hardware_names) == 1 else None
+        job_queue.start()
+        yield
+        job_queue.shutdown(wait=False)
+
+    app = fastapi.FastAPI(lifespan=lifespan)
+    app.state.job_queue = job_queue
+    app.state.hardware = None
+
+    def _lookup_result(request: BenchmarkRequest) -> BenchmarkResult | None:
+        if app.state.hardware is None:
+            return None
+        key = result_cache_key(
+            request.ref_arch_src,
+            request.kernel_src,
+            app.state.hardware,
+            request.num_correct_trials,
+            request.num_perf_trials,
+            request.gpu_arch,
+        )
+        result = RESULT_CACHE.get(key, count=True)
+        return _mark_cached(result) if result is not None else None
+
+    def _submit(request: BenchmarkRequest):
+        try:
+            return job_queue.submit(request)
+        except QueueFullError as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+                headers={"Retry-After": "5"},
+            )
+
+    @app.post("/benchmark", response_model=BenchmarkResult)
+    async def run_benchmark(
+        ref_file: UploadFile = File(...),
+        kernel_file: UploadFile = File(...),
+        gpu_arch: List[str] = Form(["Ada"]),
+        num_correct_trials: int = Form(5),
+        num_perf_trials: int = Form(100),
+        verbose: bool = Form(False),
+    ):
+        request = await _read_benchmark_request(
+            ref_file,
+            kernel_file,
+            gpu_arch,
+            num_correct_trials,
+            num_perf_trials,
+            verbose,
+        )
+        METRICS.requests.inc(endpoint="/benchmark")
+        cached_result = _lookup_result(request)
+        if cached_result is not None:
+            return cached_result
+        job = _submit(request)
+        try:
+            # the event loop stays free while a worker runs the job
+            return await asyncio.wrap_future(job.future)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred during benchmarking: {str(e)}",
+            )
+
+    @app.post("/benchmark/batch")
+    async def run_benchmark_batch(
+        ref_file: UploadFile = File(...),
+        kernel_files: List[UploadFile] = File(...),
+        gpu_arch: List[str] = Form(["Ada"]),
+        num_correct_trials: int = Form(5),
+        num_perf_trials: int = Form(100),
+        verbose: bool = Form(False),
+    ):
+        try:
+            ref_arch_src = (await ref_file.read()).decode("utf-8")
+            kernel_srcs = [(await f.read()).decode("utf-8") for f in kernel_files]
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to read uploaded files: {str(e)}",
+            )
+        finally:
+            for f in [ref_file, *kernel_files]:
+                await f.close()
+
+        METRICS.requests.inc(endpoint="/benchmark/batch")
+
+        # the worker thread hands each result over to the event loop as it completes
+        loop = asyncio.get_running_loop()
+        completed: asyncio.Queue = asyncio.Queue()
+        request = BenchmarkBatchRequest(
+            ref_arch_src=ref_arch_src,
+            kernel_srcs=kernel_srcs,
+            gpu_arch=gpu_arch,
+            num_correct_trials=num_correct_trials,
+            num_perf_trials=num_perf_trials,
+            verbose=verbose,
+            on_result=lambda index, result: loop.call_soon_threadsafe(
+                completed.put_nowait, (index, result)
+            ),
+        )
+        job = _submit(request)
+        # end of stream marker, queued after every result of the job
+        job.future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(completed.put_nowait, None)
+        )
+
+        async def stream_results():
+            reported = set()
+            while (item := await completed.get()) is not None:
+                index, result = item
+                reported.add(index)
+                line = {"index": index, "result": result.model_dump()}
+                # metadata may hold exceptions, e.g. the compilation error
+                yield json.dumps(line, default=str) + "\n"
+            if job.status == "failed":
+                # the shared reference failed, every remaining kernel fails with it
+                for index in range(len(kernel_srcs)):
+                    if index not in reported:
+                        line = {"index": index, "error": job.error}
+                        yield json.dumps(line) + "\n"
+
+        return StreamingResponse(
+            stream_results(),
+            media_type="application/x-ndjson",
+            headers={"X-Job-Id": job.job_id},
+        )
+
+    @app.post("/benchmark/stream")
+    async def run_benchmark_stream(
+        ref_file: UploadFile = File(...),
+        kernel_file: UploadFile = File(...),
+        gpu_arch: List[str] = Form(["Ada"]),
+        num_correct_trials: int = Form(5),
+        num_perf_trials: int = Form(100),
+        verbose: bool = Form(False),
+    ):
+        request = await _read_benchmark_request(
+            ref_file,
+            kernel_file,
+            gpu_arch,
+            num_correct_trials,
+            num_perf_trials,
+            verbose,
+        )
+        METRICS.requests.inc(endpoint="/benchmark/stream")
+
+        # the worker thread hands each event over to the event loop
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        cached_result = _lookup_result(request)
+        if cached_result is not None:
+            job = job_queue.add_finished(request, cached_result)
+        else:
+            request.on_progress = lambda event, data: loop.call_soon_threadsafe(
+                events.put_nowait, (event, data)
+            )
+            job = _submit(request)
+        # end of stream marker, queued after every event of the job
+        job.future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(events.put_nowait, None)
+        )
+
+        async def stream_events():
+            try:
+                yield _sse("queued", job.to_dict())
+                while (item := await events.get()) is not None:
+                    yield _sse(*item)
+                if job.status == "succeeded":
+                    yield _sse("result", job.result.model_dump())
+                else:
+                    yield _sse("error", {"status": job.status, "error": job.error})
+            finally:
+                # the client hung up: drop the job if no worker has started it
+                job_queue.cancel(job.job_id)
+
+        return StreamingResponse(
+            stream_events(),
+            media_type="text/event-stream",
+            headers={"X-Job-Id": job.job_id, "Cache-Control": "no-cache"},
+        )
+
+    @app.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+    async def submit_job(
+        ref_file: UploadFile = File(...),
+        kernel_file: UploadFile = File(...),
+        gpu_arch: List[str] = Form(["Ada"]),
+        num_correct_trials: int = Form(5),
+        num_perf_trials: int = Form(100),
+        verbose: bool = Form(False),
+    ):
+        request = await _read_benchmark_request(
+            ref_file,
+            kernel_file,
+            gpu_arch,
+            num_correct_trials,
+            num_perf_trials,
+            verbose,
+        )
+        METRICS.requests.inc(endpoint="/jobs")
+        cached_result = _lookup_result(request)
+        if cached_result is not None:
+            return job_queue.add_finished(request, cached_result).to_dict()
+        return _submit(request).to_dict()
+
+    def _get_job(job_id: str):
+        job = job_queue.get(job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job {job_id}"
+            )
+        return job
+
+    @app.get("/jobs/{job_id}")
+    async def get_job(job_id: str):
+        return _get_job(job_id).to_dict()
+
+    @app.get(
+        "/jobs/{job_id}/result",
+        response_model=BenchmarkResult | List[BenchmarkResult],
+    )
+    async def get_job_result(job_id: str):
+        job = _get_job(job_id)
+        if not job.done:
+            # not ready yet, poll again later
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED, content=job.to_dict()
+            )
+        if job.status == "cancelled":
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE, detail=f"Job {job_id} was cancelled"
+            )
+        if job.status == "failed":
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred during benchmarking: {job.error}",
+            )
+        return job.result
+
+    @app.get("/status")
+    async def server_status():
+        return {
+            "status": "online",
+            "devices": job_queue.devices,
+            "queue_depth": job_queue.queue_depth,
+            "max_queue_size": job_queue.max_queue_size,
+            "running_jobs": job_queue.num_running,
+            "baseline_cache": {
+                "entries": len(BASELINE_CACHE),
+                "hits": BASELINE_CACHE.hits,
+                "misses": BASELINE_CACHE.misses,
+            },
+            "result_cache": {
+                "entries": len(RESULT_CACHE),
+                "hits": RESULT_CACHE.hits,
+                "misses": RESULT_CACHE.misses,
+            },
+        }
+
+    @app.get("/metrics")
+    async def metrics():
+        content = METRICS.render(
+            queue_depth=job_queue.queue_depth,
+            running_jobs=job_queue.num_running,
+            caches={"baseline": BASELINE_CACHE, "result": RESULT_CACHE},
+            devices=job_queue.devices,
+        )
+        return Response(content=content, media_type=CONTENT_TYPE)
+
+    return app
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
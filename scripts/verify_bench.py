@@ -3,7 +3,15 @@ This script tests the correctness of models in KernelBench by generating random
 and random initialization. It compares the output of the original model against itself.
 It ensures that the test is well-formed and there are no sources of non-determinism in the test.
 
-Usage: python test_bench.py
+verify_bench checks every problem of levels 1-4 in parallel, one worker process per
+device (every visible GPU, or CPU workers without GPUs):
+- for each seed, two models built from the same seed and inputs must agree, and
+  repeated forward passes of one model must return the same output
+- passes are cached by (problem hash, check config, device type, torch version) in an
+  append-only JSONL file, so after editing the suite only changed problems are re-run;
+  a pass is recorded under the device type of the worker that ran the check
+
+Usage: python -m scripts.verify_bench [levels=[1,2]] [devices=["cpu","cpu"]]
 """
 
 import os
@@ -11,8 +19,22 @@ import importlib
 import random
 import importlib.util
 
+import pydra
 import torch
 import numpy as np
+from pydra import Config
+
+from kernelbench.dataset import (
+    construct_problem_dataset_from_problem_dir,
+    get_code_hash,
+)
+from kernelbench.device_pool import (
+    JSONLCheckpoint,
+    get_default_devices,
+    map_on_devices,
+)
+from kernelbench.eval import load_original_model_and_inputs
+from kernelbench.utils import read_file
 
 """
 Test all the reference architectures compiles
@@ -27,6 +49,10 @@ REPO_TOP_PATH = os.path.abspath(
 )
 KERNEL_BENCH_PATH = os.path.join(REPO_TOP_PATH, "KernelBench")
 
+DEFAULT_VERIFY_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "kernelbench", "verify_bench.jsonl"
+)
+
 
 def set_seed(seed):
     torch.manual_seed(seed)
@@ -100,7 +126,210 @@ def run_all(directory):
         print(f"Failed tests: {fail_tests}")
 
 
+def _outputs_match(output, other, atol: float, rtol: float) -> bool:
+    if isinstance(output, (list, tuple)):
+        return (
+            isinstance(other, (list, tuple))
+            and len(output) == len(other)
+            and all(_outputs_match(o, p, atol, rtol) for o, p in zip(output, other))
+        )
+    if isinstance(output, torch.Tensor):
+        return (
+            isinstance(other, torch.Tensor)
+            and output.shape == other.shape
+            and torch.allclose(output, other, atol=atol, rtol=rtol)
+        )
+    return output == other
+
+
+def check_self_consistency(
+    ref_arch_src: str,
+    device: torch.device | str,
+    seeds: tuple[int, ...] = (1012, 42),
+    num_repeats: int = 2,
+    atol: float = 1e-02,
+    rtol: float = 1e-02,
+) -> tuple[bool, str | None]:
+    """
+    Check a reference is deterministic on device: for each seed, a second model built
+    from the same seed agrees with the first, and num_repeats forward passes of the
+    first model return the same output
+    Returns (passed, reason of the failure)
+    """
+    device = torch.device(device)
+    context = {}
+    loaded = load_original_model_and_inputs(ref_arch_src, context)
+    if loaded is None or None in loaded:
+        return False, "could not load Model, get_inputs and get_init_inputs"
+    Model, get_init_inputs, get_inputs = loaded
+
+    def to_device(values):
+        return [x.to(device) if isinstance(x, torch.Tensor) else x for x in values]
+
+    with torch.no_grad():
+        for seed in seeds:
+            set_seed(seed)
+            inputs = to_device(get_inputs())
+            set_seed(seed)
+            init_inputs = to_device(get_init_inputs())
+            set_seed(seed)
+            model = Model(*init_inputs).to(device)
+            set_seed(seed)
+            model_new = Model(*init_inputs).to(device)
+
+            output = model(*inputs)
+            if not _outputs_match(output, model_new(*inputs), atol, rtol):
+                return False, f"two models built with seed {seed} disagree"
+            for repeat in range(1, num_repeats):
+                if not _outputs_match(output, model(*inputs), atol, rtol):
+                    return False, f"forward pass {repeat + 1} with seed {seed} differs"
+    return True, None
+
+
+def verify_config_key(
+    device: torch.device | str,
+    seeds: tuple[int, ...],
+    num_repeats: int,
+    atol: float,
+    rtol: float,
+) -> str:
+    """
+    Identifies a verification setup in the pass cache, results depend on the backend
+    """
+    return "|".join(
+        [
+            torch.device(device).type,
+            torch.__version__,
+            f"seeds={','.join(map(str, seeds))}",
+            f"repeats={num_repeats}",
+            f"atol={atol}",
+            f"rtol={rtol}",
+        ]
+    )
+
+
+def _verify_task(task: dict, device: str, **check_kwargs) -> tuple[bool, str | None]:
+    try:
+        return check_self_consistency(task["ref_arch_src"], device, **check_kwargs)
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}"
+
+
+def verify_bench(
+    levels: tuple[int, ...] = (1, 2, 3, 4),
+    devices: list[str] | None = None,
+    cache_path: str | None = DEFAULT_VERIFY_CACHE_PATH,
+    seeds: tuple[int, ...] = (1012, 42),
+    num_repeats: int = 2,
+    atol: float = 1e-02,
+    rtol: float = 1e-02,
+    kernel_bench_path: str = KERNEL_BENCH_PATH,
+) -> dict:
+    """
+    Check every problem of levels for self-consistency, problems are spread over
+    devices (defaults to every visible GPU, or CPU workers without GPUs)
+    cache_path: JSONL of passed (problem hash, config), None to re-verify everything;
+    a problem is skipped when it passed on any device type in devices
+
+    Returns {"passed": [...], "failed": {problem: reason}, "num_cached": n},
+    problems named "level<n>/<file name>"
+    """
+    devices = devices or get_default_devices()
+    # one config per device type, passes depend on the backend that ran them
+    configs = {
+        device: verify_config_key(device, seeds, num_repeats, atol, rtol)
+        for device in devices
+    }
+    cache = JSONLCheckpoint(cache_path) if cache_path else None
+    check_kwargs = dict(seeds=seeds, num_repeats=num_repeats, atol=atol, rtol=rtol)
+
+    tasks = []
+    for level in levels:
+        dataset = construct_problem_dataset_from_problem_dir(
+            os.path.join(kernel_bench_path, f"level{level}")
+        )
+        for path in dataset:
+            ref_arch_src = read_file(path)
+            tasks.append(
+                {
+                    "level": level,
+                    "problem_name": os.path.basename(path),
+                    "problem_hash": get_code_hash(ref_arch_src),
+                    "ref_arch_src": ref_arch_src,
+                }
+            )
+    pending = [
+        task
+        for task in tasks
+        if cache is None
+        or not any(
+            cache.is_done(task["problem_hash"], config) for config in configs.values()
+        )
+    ]
+    print(
+        f"[Verify] {len(tasks) - len(pending)} / {len(tasks)} problems passed before, "
+        f"{len(pending)} to check on {devices}"
+    )
+
+    report = {
+        "passed": [],
+        "failed": {},
+        "num_cached": len(tasks) - len(pending),
+    }
+
+    def record(task: dict, device: str, passed: bool, reason: str | None):
+        name = f"level{task['level']}/{task['problem_name']}"
+        if not passed:
+            report["failed"][name] = reason
+            return
+        report["passed"].append(name)
+        if cache is not None:
+            # only passes are cached, failures are re-checked on the next run
+            cache.record(
+                {
+                    "level": task["level"],
+                    "problem_name": task["problem_name"],
+                    "problem_hash": task["problem_hash"],
+                    "config": configs[device],
+                }
+            )
+
+    for task, device, (passed, reason) in map_on_devices(
+        _verify_task, pending, devices, **check_kwargs
+    ):
+        record(task, device, passed, reason)
+
+    passed = len(report["passed"]) + report["num_cached"]
+    print(f"[Verify] {passed}/{len(tasks)} passed")
+    if report["failed"]:
+        print(f"[Verify] Failed: {report['failed']}")
+    return report
+
+
+class VerifyConfig(Config):
+    def __init__(self):
+        self.levels = [1, 2, 3, 4]
+        # one worker per entry, e.g. ["cuda:0", "cuda:1"] or ["cpu"] * 4
+        # None: every visible GPU, or CPU workers without GPUs
+        self.devices = None
+        self.cache_path = DEFAULT_VERIFY_CACHE_PATH  # None to re-verify everything
+        self.seeds = [1012, 42]
+        self.num_repeats = 2
+
+    def __repr__(self):
+        return f"VerifyConfig({self.to_dict()})"
+
+
+@pydra.main(base=VerifyConfig)
+def main(config: VerifyConfig):
+    verify_bench(
+        levels=config.levels,
+        devices=config.devices,
+        cache_path=config.cache_path,
+        seeds=config.seeds,
+        num_repeats=config.num_repeats,
+    )
+
+
 if __name__ == "__main__":
-    run_all(KERNEL_BENCH_PATH + "/level1")
-    run_all(KERNEL_BENCH_PATH + "/level2")
-    run_all(KERNEL_BENCH_PATH + "/level3")
+    main()
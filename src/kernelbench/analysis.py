@@ -19,6 +19,70 @@ def pass_at_k(n, c, k):
     return 1.0 - np.prod(1.0 - k / np.arange(n - c + 1, n + 1))
 
 
+def _log_factorial_table(n: int) -> np.ndarray:
+    """
+    log(m!) for m in [0, n], so binomial ratios can be formed by table lookups
+    """
+    return np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, n + 1)))])
+
+
+def pass_at_k_batched(
+    n: np.ndarray | int, c: np.ndarray, k: np.ndarray | list[int]
+) -> np.ndarray:
+    """
+    Vectorized version of pass_at_k over many problems and many k at once
+    Same unbiased estimator, 1 - C(n-c, k) / C(n, k), evaluated in log space
+    :param n: total number of samples (scalar or per problem)
+    :param c: number of correct samples per problem, shape (problems,)
+    :param k: k values, shape (K,)
+    :return: pass@k of shape (problems, K); NaN where k > n
+    """
+    c = np.asarray(c, dtype=np.int64)
+    n = np.broadcast_to(np.asarray(n, dtype=np.int64), c.shape)
+    k = np.asarray(k, dtype=np.int64)
+
+    # broadcast problems against k: (problems, 1) x (K,) -> (problems, K)
+    n_, c_, k_ = n[..., np.newaxis], c[..., np.newaxis], k
+    log_fact = _log_factorial_table(int(n.max(initial=0)))
+
+    has_failure_left = n_ - c_ >= k_  # otherwise every draw of k hits a correct one
+    # clip indices so the lookups stay in range where the result is masked out anyway
+    log_ratio = (
+        log_fact[n_ - c_]
+        - log_fact[np.clip(n_ - c_ - k_, 0, None)]
+        - log_fact[n_]
+        + log_fact[np.clip(n_ - k_, 0, None)]
+    )
+    pass_k = np.where(has_failure_left, 1.0 - np.exp(log_ratio), 1.0)
+    return np.where(k_ <= n_, pass_k, np.nan)
+
+
+def pass_at_k_matrix(is_correct: np.ndarray, k: np.ndarray | list[int]) -> np.ndarray:
+    """
+    pass@k for every problem and every k from a (problems x samples) correctness matrix
+    :return: array of shape (problems, K), average over axis 0 for the level score
+    """
+    is_correct = np.asarray(is_correct, dtype=bool)
+    num_samples = is_correct.shape[-1]
+    return pass_at_k_batched(num_samples, is_correct.sum(axis=-1), k)
+
+
+def fast_p_at_k_matrix(
+    is_correct: np.ndarray,
+    speedup: np.ndarray,
+    p: float,
+    k: np.ndarray | list[int],
+) -> np.ndarray:
+    """
+    fast_p@k: chance that at least one of k samples is correct and has speedup > p
+    is_correct, speedup: (problems x samples) matrices
+    :return: array of shape (problems, K)
+    """
+    is_correct = np.asarray(is_correct, dtype=bool)
+    speedup = np.nan_to_num(np.asarray(speedup, dtype=np.float64), nan=0.0)
+    return pass_at_k_matrix(is_correct & (speedup > p), k)
+
+
 def get_token_count(text: str, tokenizer: AutoTokenizer) -> int:
     assert isinstance(text, str), "can only tokenize strings but got {}".format(
         type(text)
@@ -0,0 +1,607 @@
+########################
+# Asyncio Generation Engine
+########################
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import anthropic
+import openai
+from openai import AsyncOpenAI
+
+from kernelbench import llm_utils
+
+"""
+Asyncio-based generation engine for querying LLM providers at scale
+
+Instead of a thread pool with a fixed sleep between submissions (utils.maybe_multithread),
+every request goes through
+- a token bucket for requests per minute (RPM)
+- a token bucket for tokens per minute (TPM), reserving prompt + max output tokens
+- an AIMD concurrency limiter: additive increase on success,
+  multiplicative decrease when the provider answers 429 (rate limited)
+
+Servers in NATIVE_ASYNC_SERVERS are queried with their native async clients, sending the
+same request llm_utils.query_server would (endpoint, model, sampling parameters); other
+providers and reasoning models fall back to llm_utils.query_server on a worker thread
+(still rate limited). Either way responses share the response cache with sync runs
+Prompts are laid out as in llm_utils.query_server: a prompt_prefix is sent to Anthropic as
+a cache_control block and joined in front of the prompt for everyone else, prompts too
+long for DeepSeek are rejected before they are sent
+"""
+
+# servers whose query_server request is mirrored on a native async client
+NATIVE_ASYNC_SERVERS = ["sglang", "deepseek", "openai", "sambanova", "anthropic"]
+
+
+@dataclass
+class RateLimitConfig:
+    requests_per_minute: float | None = None  # None means unlimited
+    tokens_per_minute: float | None = None  # None means unlimited
+    initial_concurrency: int = 4
+    min_concurrency: int = 1
+    max_concurrency: int = 64
+
+
+# Conservative per-provider defaults, override with your own account tier
+PROVIDER_RATE_LIMITS = {
+    "openai": RateLimitConfig(requests_per_minute=500, tokens_per_minute=200_000),
+    "anthropic": RateLimitConfig(requests_per_minute=50, tokens_per_minute=80_000),
+    "deepseek": RateLimitConfig(requests_per_minute=60),
+    "together": RateLimitConfig(requests_per_minute=600),
+    "fireworks": RateLimitConfig(requests_per_minute=600),
+    "sambanova": RateLimitConfig(requests_per_minute=30),
+    "google": RateLimitConfig(requests_per_minute=60),
+    "sglang": RateLimitConfig(initial_concurrency=32, max_concurrency=256),
+}
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at rate_per_minute, holding at most capacity
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        assert rate_per_minute > 0, "rate_per_minute must be positive"
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.last_refill) * self.rate_per_second
+        )
+        self.last_refill = now
+
+    async def acquire(self, amount: float = 1.0):
+        # a single request larger than the bucket could never be served otherwise
+        amount = min(amount, self.capacity)
+        # the lock keeps waiters first-come first-served
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate_per_second)
+
+    def refund(self, amount: float):
+        """Return over-reserved tokens, e.g. when the completion was shorter than max_tokens"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + max(amount, 0.0))
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit that grows by ~1 per window of successes and is cut
+    multiplicatively when the provider rate limits us
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        decrease_factor: float = 0.5,
+        cooldown_s: float = 1.0,
+    ):
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        # many in-flight requests see the same 429 burst, only back off once per cooldown
+        self.cooldown_s = cooldown_s
+        self.last_decrease = float("-inf")
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        # additive increase: +1 after a full window of successful requests
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def on_rate_limited(self):
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown_s:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """
+    True for HTTP 429 from any provider SDK
+    """
+    return getattr(e, "status_code", None) == 429 or isinstance(
+        e, (openai.RateLimitError, anthropic.RateLimitError)
+    )
+
+
+def _retry_after_seconds(e: Exception) -> float | None:
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    try:
+        return float(retry_after) if retry_after is not None else None
+    except ValueError:
+        return None
+
+
+class AsyncGenerationEngine:
+    """
+    Query one provider for many prompts concurrently under RPM / TPM / AIMD limits
+
+    Usage:
+        engine = AsyncGenerationEngine("openai", model_name="gpt-4o", max_tokens=4096)
+        responses = engine.generate_batch(prompts)  # None for prompts that failed
+    """
+
+    def __init__(
+        self,
+        server_type: str,
+        model_name: str = "default",
+        rate_limits: RateLimitConfig | None = None,
+        system_prompt: str = "You are a helpful assistant",
+        temperature: float = 0.0,
+        top_p: float = 1.0,
+        top_k: int = 50,
+        max_tokens: int = 4096,
+        server_address: str = "localhost",
+        server_port: int = 30000,
+        base_url: str | None = None,  # override for OpenAI-compatible endpoints
+        api_key: str | None = None,
+        max_attempts: int = 8,
+        verbose: bool = False,
+        response_cache: llm_utils.ResponseCache | None = None,
+        stream_until_code_block: bool = False,
+        **query_kwargs,  # passed through to llm_utils.query_server on the fallback path
+    ):
+        self.server_type = server_type
+        self.model_name = model_name
+        self.rate_limits = rate_limits or PROVIDER_RATE_LIMITS.get(
+            server_type, RateLimitConfig()
+        )
+        self.system_prompt = system_prompt
+        self.temperature = temperature
+        self.top_p = top_p
+        self.top_k = top_k
+        self.max_tokens = max_tokens
+        self.server_address = server_address
+        self.server_port = server_port
+        self.max_attempts = max_attempts
+        self.verbose = verbose
+        self.response_cache = response_cache
+        self.stream_until_code_block = stream_until_code_block
+        self.query_kwargs = query_kwargs
+        # reasoning requests (o1 / o3, Claude thinking, deepseek-reasoner) drop sampling
+        # parameters and use other endpoints, query_server knows how to send them
+        self.native = server_type in NATIVE_ASYNC_SERVERS and not query_kwargs.get(
+            "is_reasoning_model", False
+        )
+        # query_server always asks a local sglang server for its "default" model
+        self.request_model = "default" if server_type == "sglang" else model_name
+
+        if base_url is None and server_type in llm_utils.OPENAI_COMPATIBLE_SERVERS:
+            base_url, default_key = llm_utils.get_openai_compatible_endpoint(
+                server_type, server_address, server_port
+            )
+            api_key = api_key or default_key
+        self.base_url = base_url
+        self.api_key = api_key
+
+        # loop-bound state, created in agenerate_batch
+        self._client = None
+        self._request_bucket = None
+        self._token_bucket = None
+        self._limiter = None
+
+    def _user_content(self, prompt: str, prompt_prefix: str | None) -> str | list[dict]:
+        if prompt_prefix is None:
+            return prompt
+        if self.server_type == "anthropic":
+            return [
+                {
+                    "type": "text",
+                    "text": prompt_prefix,
+                    "cache_control": {"type": "ephemeral"},
+                },
+                {"type": "text", "text": prompt},
+            ]
+        return prompt_prefix + prompt
+
+    def estimate_tokens(self, prompt: str, num_completions: int = 1) -> int:
+        """
+        Rough token estimate (~4 characters per token) plus the output budget
+        """
+        return len(prompt) // 4 + self.max_tokens * num_completions
+
+    def uses_multi_completion(self) -> bool:
+        """
+        Whether all samples of a prompt are asked for in one request with n=...,
+        same rule as llm_utils.query_server_samples
+        """
+        return (
+            self.native
+            and not self.stream_until_code_block
+            and self.server_type in llm_utils.MULTI_COMPLETION_SERVERS
+        )
+
+    def _setup(self):
+        limits = self.rate_limits
+        self._request_bucket = (
+            TokenBucket(limits.requests_per_minute)
+            if limits.requests_per_minute
+            else None
+        )
+        self._token_bucket = (
+            TokenBucket(limits.tokens_per_minute) if limits.tokens_per_minute else None
+        )
+        self._limiter = AIMDLimiter(
+            limits.initial_concurrency, limits.min_concurrency, limits.max_concurrency
+        )
+        # retries are handled here so 429s feed back into the AIMD limiter
+        if not self.native:
+            self._client = None
+        elif self.server_type == "anthropic":
+            self._client = anthropic.AsyncAnthropic(
+                api_key=self.api_key or llm_utils.ANTHROPIC_KEY, max_retries=0
+            )
+        else:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key or "EMPTY", base_url=self.base_url, max_retries=0
+            )
+
+    def _uses_completions_endpoint(self, user_content) -> bool:
+        return self.server_type in llm_utils.COMPLETION_SERVERS and isinstance(
+            user_content, str
+        )
+
+    async def _query_once(
+        self, prompt: str, prompt_prefix: str | None = None, num_completions: int = 1
+    ) -> tuple[list[str], int | None]:
+        """
+        Single provider call, returns (texts, total tokens used if reported)
+        num_completions > 1 only for uses_multi_completion()
+        """
+        if not self.native:
+            # run the sync path on a worker thread
+            text = await asyncio.to_thread(
+                llm_utils.query_server,
+                prompt,
+                system_prompt=self.system_prompt,
+                temperature=self.temperature,
+                top_p=self.top_p,
+                top_k=self.top_k,
+                max_tokens=self.max_tokens,
+                server_type=self.server_type,
+                model_name=self.model_name,
+                server_address=self.server_address,
+                server_port=self.server_port,
+                stream_until_code_block=self.stream_until_code_block,
+                prompt_prefix=prompt_prefix,
+                **self.query_kwargs,
+            )
+            return [text], None
+        if self.stream_until_code_block:
+            return [await self._stream_once(prompt, prompt_prefix)], None
+
+        user_content = self._user_content(prompt, prompt_prefix)
+        if self.server_type == "anthropic":
+            response = await self._client.messages.create(
+                model=self.request_model,
+                system=self.system_prompt,
+                messages=[{"role": "user", "content": user_content}],
+                temperature=self.temperature,
+                top_p=self.top_p,
+                top_k=self.top_k,
+                max_tokens=self.max_tokens,
+            )
+            text = "".join(
+                block.text for block in response.content if hasattr(block, "text")
+            )
+            usage = response.usage
+            llm_utils.PROMPT_CACHE_STATS.record(usage)
+            return [text], usage.input_tokens + usage.output_tokens
+
+        # n only when several samples are asked for, sambanova does not accept it
+        n_args = {"n": num_completions} if num_completions > 1 else {}
+        if self._uses_completions_endpoint(user_content):
+            response = await self._client.completions.create(
+                model=self.request_model,
+                prompt=user_content,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                top_p=self.top_p,
+                **n_args,
+            )
+            texts = [choice.text for choice in response.choices]
+        else:
+            response = await self._client.chat.completions.create(
+                model=self.request_model,
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": user_content},
+                ],
+                temperature=self.temperature,
+                top_p=self.top_p,
+                max_tokens=self.max_tokens,
+                **n_args,
+            )
+            texts = [choice.message.content for choice in response.choices]
+        usage = getattr(response, "usage", None)
+        llm_utils.PROMPT_CACHE_STATS.record(usage)
+        return texts, getattr(usage, "total_tokens", None)
+
+    async def _stream_once(self, prompt: str, prompt_prefix: str | None = None) -> str:
+        """
+        Streamed provider call that stops once a complete ```python block with ModelNew arrived
+        """
+        detector = llm_utils.CodeBlockStreamDetector()
+        user_content = self._user_content(prompt, prompt_prefix)
+        if self.server_type == "anthropic":
+            async with self._client.messages.stream(
+                model=self.request_model,
+                system=self.system_prompt,
+                messages=[{"role": "user", "content": user_content}],
+                temperature=self.temperature,
+                top_p=self.top_p,
+                max_tokens=self.max_tokens,
+            ) as stream:
+                async for delta in stream.text_stream:
+                    if detector.feed(delta):
+                        break
+            return detector.text
+
+        completion_style = self._uses_completions_endpoint(user_content)
+        if completion_style:
+            stream = await self._client.completions.create(
+                model=self.request_model,
+                prompt=user_content,
+                temperature=self.temperature,
+                top_p=self.top_p,
+                max_tokens=self.max_tokens,
+                stream=True,
+            )
+        else:
+            stream = await self._client.chat.completions.create(
+                model=self.request_model,
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": user_content},
+                ],
+                temperature=self.temperature,
+                top_p=self.top_p,
+                max_tokens=self.max_tokens,
+                stream=True,
+            )
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if detector.feed(
+                    choice.text if completion_style else choice.delta.content
+                ):
+                    break
+        finally:
+            # closing the HTTP response aborts the generation server side
+            await stream.close()
+        return detector.text
+
+    def cache_key(
+        self, prompt: str, sample_id: int = 0, prompt_prefix: str | None = None
+    ) -> str:
+        """
+        Same key as the equivalent llm_utils.query_server call, the request sent is the
+        same, so sync and async runs share a response cache
+        """
+        return llm_utils.query_cache_key(
+            prompt=prompt,
+            system_prompt=self.system_prompt,
+            temperature=self.temperature,
+            top_p=self.top_p,
+            top_k=self.top_k,
+            max_tokens=self.max_tokens,
+            server_type=self.server_type,
+            model_name=self.model_name,
+            server_address=self.server_address,
+            server_port=self.server_port,
+            sample_id=sample_id,
+            stream_until_code_block=self.stream_until_code_block,
+            prompt_prefix=prompt_prefix,
+            **self.query_kwargs,
+        )
+
+    async def _query_with_limits(
+        self, prompt: str, prompt_prefix: str | None = None, num_completions: int = 1
+    ) -> list[str]:
+        """
+        One request, waiting for rate limits and retrying on 429 with backoff
+        """
+        full_prompt = prompt if prompt_prefix is None else prompt_prefix + prompt
+        if self.server_type == "deepseek" and not await asyncio.to_thread(
+            llm_utils.is_safe_to_send_to_deepseek, full_prompt
+        ):
+            raise RuntimeError("Prompt is too long for DeepSeek")
+
+        estimated_tokens = self.estimate_tokens(full_prompt, num_completions)
+        for attempt in range(self.max_attempts):
+            if self._request_bucket is not None:
+                await self._request_bucket.acquire(1)
+            if self._token_bucket is not None:
+                await self._token_bucket.acquire(estimated_tokens)
+
+            try:
+                async with self._limiter:
+                    texts, used_tokens = await self._query_once(
+                        prompt, prompt_prefix, num_completions
+                    )
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_attempts - 1:
+                    raise
+                self._limiter.on_rate_limited()
+                delay = _retry_after_seconds(e) or min(
+                    60.0, (2**attempt) * (0.5 + random.random())
+                )
+                if self.verbose:
+                    print(
+                        f"[AsyncGeneration] Rate limited by {self.server_type}, "
+                        f"concurrency -> {int(self._limiter.limit)}, retry in {delay:.2f}s"
+                    )
+                await asyncio.sleep(delay)
+                continue
+
+            self._limiter.on_success()
+            if self._token_bucket is not None and used_tokens is not None:
+                self._token_bucket.refund(estimated_tokens - used_tokens)
+            return texts
+
+    async def agenerate_samples(
+        self, prompt: str, sample_ids: list[int], prompt_prefix: str | None = None
+    ) -> list[str]:
+        """
+        One response per sample id for the same prompt, aligned with sample_ids
+        Missing samples are asked for in one request with n=... when
+        uses_multi_completion(), otherwise with concurrent single requests
+        Each sample is cached under its own sample_id, as in query_server_samples
+        """
+        responses = [None] * len(sample_ids)
+        cache_keys = []
+        if self.response_cache is not None:
+            cache_keys = [
+                self.cache_key(prompt, sample_id, prompt_prefix)
+                for sample_id in sample_ids
+            ]
+            responses = [self.response_cache.get(key) for key in cache_keys]
+        missing = [
+            index for index, response in enumerate(responses) if response is None
+        ]
+        if not missing:
+            return responses
+
+        if self.uses_multi_completion():
+            outputs = await self._query_with_limits(prompt, prompt_prefix, len(missing))
+            assert len(outputs) == len(
+                missing
+            ), f"Asked {self.server_type} for {len(missing)} completions, got {len(outputs)}"
+        else:
+            outputs = [
+                texts[0]
+                for texts in await asyncio.gather(
+                    *[self._query_with_limits(prompt, prompt_prefix) for _ in missing]
+                )
+            ]
+        for index, output in zip(missing, outputs):
+            responses[index] = output
+            if self.response_cache is not None:
+                self.response_cache.put(cache_keys[index], output)
+        return responses
+
+    async def agenerate(
+        self, prompt: str, sample_id: int = 0, prompt_prefix: str | None = None
+    ) -> str:
+        """
+        Query one prompt, waiting for rate limits and retrying on 429 with backoff
+        Cached responses are returned without touching the rate limits
+        prompt_prefix: static text shared across prompts, see llm_utils.query_server
+        """
+        responses = await self.agenerate_samples(prompt, [sample_id], prompt_prefix)
+        return responses[0]
+
+    async def agenerate_batch(
+        self,
+        prompts: list[str],
+        sample_ids: list[int] | None = None,
+        on_response: Callable[[int, str], None] | None = None,
+        prompt_prefixes: list[str | None] | None = None,
+    ) -> list[str | None]:
+        """
+        Query all prompts concurrently, None for prompts that failed
+        With uses_multi_completion(), repeated (prompt, prefix) pairs are one request with n=...
+        sample_ids: distinguishes repeated samples of the same prompt in the response cache
+        on_response: called with (prompt index, response) as soon as each response lands,
+                     e.g. to hand a kernel to evaluation before the whole batch is done
+        prompt_prefixes: cacheable static prefix of each prompt (PromptParts.static_prefix)
+        """
+        self._setup()
+        sample_ids = sample_ids or [0] * len(prompts)
+        prompt_prefixes = prompt_prefixes or [None] * len(prompts)
+
+        groups = {}
+        for index, (prompt, prompt_prefix) in enumerate(zip(prompts, prompt_prefixes)):
+            group_key = (
+                (prompt, prompt_prefix) if self.uses_multi_completion() else index
+            )
+            groups.setdefault(group_key, []).append(index)
+        responses = [None] * len(prompts)
+
+        async def _generate_group(indices: list[int]):
+            try:
+                group_responses = await self.agenerate_samples(
+                    prompts[indices[0]],
+                    [sample_ids[index] for index in indices],
+                    prompt_prefixes[indices[0]],
+                )
+            except Exception as e:
+                print(f"[AsyncGeneration] Error querying {self.server_type}: {e}")
+                return
+            for index, response in zip(indices, group_responses):
+                responses[index] = response
+                if on_response is not None:
+                    on_response(index, response)
+
+        try:
+            await asyncio.gather(
+                *[_generate_group(indices) for indices in groups.values()]
+            )
+        finally:
+            if self._client is not None:
+                await self._client.close()
+        return responses
+
+    def generate_batch(
+        self,
+        prompts: list[str],
+        sample_ids: list[int] | None = None,
+        on_response: Callable[[int, str], None] | None = None,
+        prompt_prefixes: list[str | None] | None = None,
+    ) -> list[str | None]:
+        return asyncio.run(
+            self.agenerate_batch(prompts, sample_ids, on_response, prompt_prefixes)
+        )
@@ -0,0 +1,209 @@
+########################
+# Indexed Baseline Store
+########################
+
+import json
+import os
+import threading
+
+from kernelbench.dataset import (
+    KERNEL_BENCH_PATH,
+    REPO_TOP_PATH,
+    construct_problem_dataset_from_problem_dir,
+    get_code_hash,
+)
+from kernelbench.utils import read_file
+
+"""
+One lookup API over every baseline timing file under results/timing
+
+    store = get_baseline_store()
+    store.get("H100_together", "inductor_default", 1, "1_Square_matrix_multiplication_.py")
+    store.get("L40S_matx3", "eager", "level2", get_code_hash(ref_arch_src))
+
+Layouts:
+- <hardware>/baseline_time_torch.json                          -> mode "eager"
+- <hardware>/baseline_time_torch_compile_<backend>_<mode>.json -> mode "<backend>_<mode>"
+  (or just "<backend>", e.g. "cudagraphs")
+- old/baseline_time_<run>.json, old/baseline_time_torch_compile_<run>.json
+  -> hardware "old/<run>", modes "eager" and "inductor_default"
+
+Everything is lazy: the directory is scanned on first use, a file is parsed and
+indexed by (level, problem name) the first time its (hardware, mode) is queried,
+the problem hash -> name index is built from KernelBench the first time a hash is
+looked up. Lookups are then plain dict accesses
+"""
+
+TIMING_DIR = os.path.join(REPO_TOP_PATH, "results", "timing")
+
+EAGER_MODE = "eager"
+
+
+def parse_baseline_path(relative_path: str) -> tuple[str, str] | None:
+    """
+    (hardware, mode) of a baseline file, relative to the timing directory
+    None for files that are not baselines
+    """
+    hardware, file_name = os.path.split(relative_path)
+    if not hardware or not file_name.endswith(".json"):
+        return None
+    name = file_name.removesuffix(".json")
+    if hardware == "old":
+        # old/baseline_time_<run>.json, compile runs used the default inductor mode
+        if name.startswith("baseline_time_torch_compile_"):
+            run = name.removeprefix("baseline_time_torch_compile_")
+            return f"old/{run}", "inductor_default"
+        if name.startswith("baseline_time_"):
+            return f"old/{name.removeprefix('baseline_time_')}", EAGER_MODE
+        return None
+    if name == "baseline_time_torch":
+        return hardware, EAGER_MODE
+    if name.startswith("baseline_time_torch_compile_"):
+        return hardware, name.removeprefix("baseline_time_torch_compile_")
+    return None
+
+
+def _level_key(level: int | str) -> str:
+    level = str(level)
+    return level if level.startswith("level") else f"level{level}"
+
+
+class BaselineStore:
+    """
+    timing_dir: directory of <hardware>/baseline_time_*.json files
+    kernel_bench_path: problems the hash lookups are resolved against
+    """
+
+    def __init__(
+        self, timing_dir: str = TIMING_DIR, kernel_bench_path: str = KERNEL_BENCH_PATH
+    ):
+        self.timing_dir = timing_dir
+        self.kernel_bench_path = kernel_bench_path
+        self._lock = threading.Lock()
+        self._paths: dict[tuple[str, str], str] | None = None
+        # (hardware, mode) -> {(level, problem name): stats}
+        self._baselines: dict[tuple[str, str], dict[tuple[str, str], dict]] = {}
+        # level -> {problem hash: problem name}
+        self._problem_names: dict[str, dict[str, str]] = {}
+
+    def _index_paths(self) -> dict[tuple[str, str], str]:
+        if self._paths is None:
+            with self._lock:
+                if self._paths is None:
+                    paths = {}
+                    for dir_path, _, file_names in os.walk(self.timing_dir):
+                        for file_name in sorted(file_names):
+                            path = os.path.join(dir_path, file_name)
+                            key = parse_baseline_path(
+                                os.path.relpath(path, self.timing_dir)
+                            )
+                            if key is not None:
+                                paths[key] = path
+                    self._paths = paths
+        return self._paths
+
+    def _baseline(self, hardware: str, mode: str) -> dict[tuple[str, str], dict]:
+        key = (hardware, mode)
+        baseline = self._baselines.get(key)
+        if baseline is None:
+            path = self._index_paths().get(key)
+            if path is None:
+                raise KeyError(
+                    f"No baseline for hardware {hardware} in mode {mode}, "
+                    f"available: {sorted(self._index_paths())}"
+                )
+            with self._lock:
+                baseline = self._baselines.get(key)
+                if baseline is None:
+                    with open(path, "r") as f:
+                        baseline_json = json.load(f)
+                    baseline = {
+                        (level, problem_name): stats
+                        for level, problems in baseline_json.items()
+                        for problem_name, stats in problems.items()
+                    }
+                    self._baselines[key] = baseline
+        return baseline
+
+    def _problem_name_from_hash(self, level: str, problem_hash: str) -> str | None:
+        names = self._problem_names.get(level)
+        if names is None:
+            problem_dir = os.path.join(self.kernel_bench_path, level)
+            names = {}
+            if os.path.isdir(problem_dir):
+                for path in construct_problem_dataset_from_problem_dir(problem_dir):
+                    names[get_code_hash(read_file(path))] = os.path.basename(path)
+            with self._lock:
+                self._problem_names[level] = names
+        return names.get(problem_hash)
+
+    def get(
+        self, hardware: str, mode: str, level: int | str, problem: str
+    ) -> dict | None:
+        """
+        Timing stats of a problem, None if the baseline has no timing for it
+        level: 1 or "level1"
+        problem: file name (e.g. "1_Square_matrix_multiplication_.py") or code hash
+        Raises KeyError when there is no baseline for (hardware, mode)
+        """
+        level = _level_key(level)
+        baseline = self._baseline(hardware, mode)
+        stats = baseline.get((level, problem))
+        if stats is None and not problem.endswith(".py"):
+            problem_name = self._problem_name_from_hash(level, problem)
+            if problem_name is not None:
+                stats = baseline.get((level, problem_name))
+        return stats
+
+    def hardware(self) -> list[str]:
+        return sorted({hardware for hardware, _ in self._index_paths()})
+
+    def modes(self, hardware: str) -> list[str]:
+        return sorted(mode for hw, mode in self._index_paths() if hw == hardware)
+
+    def path(self, hardware: str, mode: str) -> str | None:
+        return self._index_paths().get((hardware, mode))
+
+    def invalidate(self):
+        """
+        Forget everything loaded, e.g. after baseline files were rewritten
+        """
+        with self._lock:
+            self._paths = None
+            self._baselines.clear()
+            self._problem_names.clear()
+
+
+_DEFAULT_STORE: BaselineStore | None = None
+
+
+def get_baseline_store() -> BaselineStore:
+    """
+    Process-wide store over results/timing and the KernelBench problems
+    """
+    global _DEFAULT_STORE
+    if _DEFAULT_STORE is None:
+        _DEFAULT_STORE = BaselineStore()
+    return _DEFAULT_STORE
+
+
+# path -> (modification time, parsed baseline json), for baseline files outside a store
+_BASELINE_FILES: dict[str, tuple[int, dict]] = {}
+_BASELINE_FILES_LOCK = threading.Lock()
+
+
+def load_baseline_file(path: str) -> dict:
+    """
+    Parsed baseline json, re-read only when the file changed
+    """
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    with _BASELINE_FILES_LOCK:
+        cached = _BASELINE_FILES.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    with open(path, "r") as f:
+        baseline_json = json.load(f)
+    with _BASELINE_FILES_LOCK:
+        _BASELINE_FILES[path] = (mtime, baseline_json)
+    return baseline_json
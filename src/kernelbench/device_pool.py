@@ -0,0 +1,119 @@
+########################
+# Device Worker Pool
+########################
+
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterator
+
+import torch
+from tqdm import tqdm
+
+"""
+Shared plumbing of the suite-wide scripts (baseline recording, suite verification):
+- map_on_devices fans tasks out over one spawned worker process per device,
+  each worker pinned to its device for its whole life
+- JSONLCheckpoint is the append-only log of finished (problem hash, config) entries
+  that lets an interrupted or repeated run skip work that is already done
+"""
+
+
+def get_default_devices() -> list[str]:
+    """
+    One worker per visible GPU, or a few CPU workers without GPUs
+    """
+    if torch.cuda.is_available():
+        return [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+    return ["cpu"] * max(1, min(4, (os.cpu_count() or 1) // 2))
+
+
+# device of the current worker process, set by _init_device_worker
+_WORKER_DEVICE = None
+
+
+def _init_device_worker(device_queue, num_cpu_threads: int):
+    global _WORKER_DEVICE
+    _WORKER_DEVICE = device_queue.get()
+    if torch.device(_WORKER_DEVICE).type == "cpu":
+        # CPU workers share the cores instead of oversubscribing them
+        torch.set_num_threads(num_cpu_threads)
+
+
+def _run_on_worker_device(fn: Callable, task, fn_kwargs: dict) -> tuple:
+    return task, _WORKER_DEVICE, fn(task, _WORKER_DEVICE, **fn_kwargs)
+
+
+def map_on_devices(
+    fn: Callable, tasks: list, devices: list[str], **fn_kwargs
+) -> Iterator[tuple]:
+    """
+    Run fn(task, device, **fn_kwargs) for every task, one worker per entry of devices
+    (e.g. ["cuda:0", "cuda:1"] or ["cpu"] * 4), a single device runs in this process
+    fn must be a module-level function when there are several devices
+
+    Yields (task, device it ran on, result) as tasks complete
+    """
+    if len(devices) == 1:
+        for task in tqdm(tasks):
+            yield task, devices[0], fn(task, devices[0], **fn_kwargs)
+        return
+    if not tasks:
+        return
+
+    # spawn: CUDA cannot be re-initialized in forked workers
+    ctx = mp.get_context("spawn")
+    device_queue = ctx.Queue()
+    for device in devices:
+        device_queue.put(device)
+    num_cpu_threads = max(1, (os.cpu_count() or 1) // len(devices))
+    with ProcessPoolExecutor(
+        max_workers=len(devices),
+        mp_context=ctx,
+        initializer=_init_device_worker,
+        initargs=(device_queue, num_cpu_threads),
+    ) as executor:
+        futures = [
+            executor.submit(_run_on_worker_device, fn, task, fn_kwargs)
+            for task in tasks
+        ]
+        try:
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                yield future.result()
+        except BrokenProcessPool as e:
+            # e.g. a worker died on a CUDA fault, rerun to resume from the checkpoint
+            print(f"[DevicePool] Worker crashed, rerun to resume: {e}")
+            raise
+
+
+class JSONLCheckpoint:
+    """
+    Append-only JSONL log of finished problems, one line per problem with at least
+    {"problem_hash", "config"}, e.g. plus "level", "problem_name" and "stats"
+    A line cut short by a crash is ignored on load
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict[tuple[str, str], dict] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.entries[(entry["problem_hash"], entry["config"])] = entry
+
+    def is_done(self, problem_hash: str, config: str) -> bool:
+        return (problem_hash, config) in self.entries
+
+    def record(self, entry: dict):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries[(entry["problem_hash"], entry["config"])] = entry
@@ -3,15 +3,24 @@ Helpers for Evaluations
 """
 
 from contextlib import redirect_stdout, redirect_stderr
+from dataclasses import dataclass
 from io import StringIO
 import json
 import numpy as np
 import os
 import shutil
 import subprocess
+import time
 import torch
 import torch.nn as nn
 from pydantic import BaseModel
+from typing import Callable
+
+from kernelbench.baseline_store import load_baseline_file
+from kernelbench.profiling import profile_model
+
+# progress_callback(event, data) of an eval, e.g. to stream progress to a client
+ProgressCallback = Callable[[str, dict], None]
 
 
 def set_seed(seed: int):
@@ -30,6 +39,8 @@ class KernelExecResult(BaseModel):
     metadata: dict = {}
     runtime: float = -1.0  # in us, only recorded if we decide to measure performance
     runtime_stats: dict = {}  # only recorded if we decide to measure performance
+    # torch.profiler top-N breakdown per model ("reference", "custom"), only if profiled
+    profile: dict = {}
 
 
 def load_original_model_and_inputs(
@@ -59,6 +70,113 @@ def load_original_model_and_inputs(
     return (Model, get_init_inputs_fn, get_inputs_fn)
 
 
+@dataclass
+class PreparedReference:
+    """
+    Reference model, inputs and outputs shared by every candidate evaluated against it
+
+    correctness_trials: (inputs, reference output) per correctness trial
+    perf_inputs: inputs used to time the candidates
+    """
+
+    original_model_src: str
+    seed_num: int
+    num_correct_trials: int
+    device: torch.device
+    context: dict
+    init_inputs: list
+    original_model: nn.Module
+    get_inputs: callable
+    correctness_trials: list[tuple[list, torch.Tensor]]
+    perf_inputs: list
+
+
+def get_correctness_trial_seeds(seed: int, num_correct_trials: int) -> list[int]:
+    """
+    Generate num_correct_trials seeds deterministically from the initial seed
+    """
+    torch.manual_seed(seed)
+    return [torch.randint(0, 2**32 - 1, (1,)).item() for _ in range(num_correct_trials)]
+
+
+def _to_device(inputs: list, device: torch.device) -> list:
+    return [x.cuda(device=device) if isinstance(x, torch.Tensor) else x for x in inputs]
+
+
+def _clone_inputs(inputs: list) -> list:
+    # candidates may modify their inputs in place, never hand out the shared tensors
+    return [x.clone() if isinstance(x, torch.Tensor) else x for x in inputs]
+
+
+def prepare_reference(
+    original_model_src: str,
+    seed_num: int = 42,
+    num_correct_trials: int = 1,
+    verbose: bool = False,
+    device: torch.device = (
+        torch.cuda.current_device() if torch.cuda.is_available() else None
+    ),
+) -> PreparedReference:
+    """
+    Load the reference model, generate the correctness and timing inputs and run the
+    reference on them once, so a batch of candidates can be checked against it
+    without re-loading the reference or re-generating inputs per candidate
+    """
+    assert torch.cuda.is_available(), "CUDA is not available, cannot run Eval"
+    torch.cuda.set_device(device)
+
+    context = {}
+    if verbose:
+        print(f"[Eval] Preparing Reference on device: {device}")
+    Model, get_init_inputs, get_inputs = load_original_model_and_inputs(
+        original_model_src, context
+    )
+    set_seed(seed_num)  # set seed for reproducible input
+    init_inputs = _to_device(get_init_inputs(), device)
+
+    with torch.no_grad():
+        set_seed(seed_num)  # set seed for reproducible weights
+        original_model = Model(*init_inputs)
+        assert hasattr(original_model, "forward")
+
+        correctness_trials = []
+        for trial_seed in get_correctness_trial_seeds(seed_num, num_correct_trials):
+            set_seed(trial_seed)
+            inputs = _to_device(get_inputs(), device)
+            set_seed(trial_seed)
+            model = original_model.cuda(device=device)
+            output = model(*inputs)
+            torch.cuda.synchronize(device=device)
+            correctness_trials.append((inputs, output))
+
+    set_seed(seed_num)
+    perf_inputs = _to_device(get_inputs(), device)
+    if verbose:
+        print(f"[Eval] Reference Prepared with {num_correct_trials} correctness trials")
+
+    return PreparedReference(
+        original_model_src=original_model_src,
+        seed_num=seed_num,
+        num_correct_trials=num_correct_trials,
+        device=device,
+        context=context,
+        init_inputs=init_inputs,
+        original_model=original_model,
+        get_inputs=get_inputs,
+        correctness_trials=correctness_trials,
+        perf_inputs=perf_inputs,
+    )
+
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def _report(progress_callback: ProgressCallback | None, event: str, **data):
+    if progress_callback is not None:
+        progress_callback(event, data)
+
+
 def load_custom_model(
     model_custom_src: str, context: dict, build_directory: str = None
 ) -> nn.Module:
@@ -116,6 +234,12 @@ def graceful_eval_cleanup(curr_context: dict, device: torch.device):
     # _cleanup_cuda_extensions() # SIMON NOTE: is this necessary?
 
 
+def _timed_eval_cleanup(curr_context: dict, device: torch.device, phase_times_ms: dict):
+    phase_start = time.perf_counter()
+    graceful_eval_cleanup(curr_context, device)
+    phase_times_ms["cleanup"] = _elapsed_ms(phase_start)
+
+
 def build_compile_cache_legacy(
     custom_model_src: str,
     verbose: bool = False,
@@ -250,6 +374,12 @@ def eval_kernel_against_ref(
     device: torch.device = (
         torch.cuda.current_device() if torch.cuda.is_available() else None
     ),  # have to run on GPU
+    reference: PreparedReference = None,
+    progress_callback: ProgressCallback = None,
+    profile: bool = False,
+    profile_top_n: int = 10,
+    profile_trace_dir: os.PathLike = None,
+    phase_times_ms: dict = None,
 ) -> KernelExecResult:
     """
     Evaluate the custom kernel against the original model
@@ -257,6 +387,14 @@ def eval_kernel_against_ref(
     num_correct_trials: number of trials to initialize different random inputs; correctness pass only if all trials pass
     num_perf_trials: run the evalutation many times to take the average
     device: GPU (cuda) device to run the evalutation on
+    reference: output of prepare_reference, reused instead of loading and running the original model again
+    progress_callback: called with (event, data) at each phase transition and correctness trial
+    profile: run torch.profiler on the original and custom model once correct, the top
+        profile_top_n kernels of each are stored in KernelExecResult.profile
+    profile_trace_dir: also export reference_trace.json and custom_trace.json there
+    phase_times_ms: dict to record the wall-clock time of each phase in (load_ref,
+        compile, init_custom, correctness, perf, profile, cleanup), also returned as
+        metadata["phase_times_ms"]; pass one in to keep the phases done before a crash
     """
     # TODO: check device is busy
     assert torch.cuda.is_available(), "CUDA is not available, cannot run Eval"
@@ -270,41 +408,65 @@ def eval_kernel_against_ref(
     # set CUDA device
     torch.cuda.set_device(device)
 
-    context = {}
+    # wall-clock time of each eval phase, e.g. for the benchmark server metrics
+    phase_times_ms = phase_times_ms if phase_times_ms is not None else {}
+    phase_start = time.perf_counter()
+    if reference is not None:
+        assert (
+            reference.seed_num == seed_num
+            and reference.num_correct_trials == num_correct_trials
+        ), "Prepared reference was generated with a different seed or trial count"
+        context = dict(reference.context)
+        init_inputs = reference.init_inputs
+        original_model = reference.original_model
+        get_inputs = reference.get_inputs
+        if verbose:
+            print(f"[Eval] Start Evalulation! on device: {device}")
+            print("[Eval] Reusing Prepared Original Model")
+    else:
+        context = {}
 
-    if verbose:
-        print(f"[Eval] Start Evalulation! on device: {device}")
-        print("[Eval] Loading Original Model")
+        if verbose:
+            print(f"[Eval] Start Evalulation! on device: {device}")
+            print("[Eval] Loading Original Model")
 
-    Model, get_init_inputs, get_inputs = load_original_model_and_inputs(
-        original_model_src, context
-    )
-    set_seed(seed_num)  # set seed for reproducible input
-    init_inputs = get_init_inputs()
-    init_inputs = [
-        x.cuda(device=device) if isinstance(x, torch.Tensor) else x for x in init_inputs
-    ]
+        Model, get_init_inputs, get_inputs = load_original_model_and_inputs(
+            original_model_src, context
+        )
+        set_seed(seed_num)  # set seed for reproducible input
+        init_inputs = get_init_inputs()
+        init_inputs = [
+            x.cuda(device=device) if isinstance(x, torch.Tensor) else x
+            for x in init_inputs
+        ]
 
-    with torch.no_grad():
-        set_seed(seed_num)  # set seed for reproducible weights
-        original_model = Model(*init_inputs)
-        assert hasattr(original_model, "forward")
-        if verbose:
-            print("[Eval] Original Model Loaded")
+        with torch.no_grad():
+            set_seed(seed_num)  # set seed for reproducible weights
+            original_model = Model(*init_inputs)
+            assert hasattr(original_model, "forward")
+            if verbose:
+                print("[Eval] Original Model Loaded")
+    phase_times_ms["load_ref"] = _elapsed_ms(phase_start)
     if verbose:
         print("[Eval] Loading and Compiling New Model with Custom CUDA Kernel")
 
     metadata = {}  # for storing result metadata
     metadata["hardware"] = torch.cuda.get_device_name(device=device)
     metadata["device"] = str(device)  # for debugging
+    metadata["phase_times_ms"] = phase_times_ms
 
     # this is where compilation happens
+    _report(progress_callback, "phase", phase="compile")
+    phase_start = time.perf_counter()
     try:
         os.environ["TORCH_USE_CUDA_DSA"] = "1"  # compile with device side assertion
         # add hash for later to distinguish between multi-turn kernels
         ModelNew = load_custom_model(custom_model_src, context, build_dir)
         torch.cuda.synchronize(device=device)  # not sure if this is too much
+        phase_times_ms["compile"] = _elapsed_ms(phase_start)
     except Exception as e:
+        phase_times_ms["compile"] = _elapsed_ms(phase_start)
+        _report(progress_callback, "compiled", compiled=False, error=str(e))
         print(
             f"Failed to compile custom CUDA kernel: Record as compilation failure. \nError: {e}"
         )
@@ -316,30 +478,39 @@ def eval_kernel_against_ref(
             print(
                 f"[Eval] Lock file error during compilation, Please retry. Error: {e}"
             )
-            graceful_eval_cleanup(context, device)
+            _timed_eval_cleanup(context, device, phase_times_ms)
             return None
         else:
             metadata["compilation_error"] = e
-            graceful_eval_cleanup(context, device)
+            _timed_eval_cleanup(context, device, phase_times_ms)
             return KernelExecResult(
                 compiled=False, metadata=metadata
             )  # skip further steps
 
     # at this point we passed compilation
+    _report(
+        progress_callback,
+        "compiled",
+        compiled=True,
+        compile_time_ms=phase_times_ms["compile"],
+    )
+    phase_start = time.perf_counter()
     try:
         with torch.no_grad():
             set_seed(seed_num)  # set seed for reproducible weights
             custom_model = ModelNew(*init_inputs)
             assert hasattr(custom_model, "forward")
             torch.cuda.synchronize(device=device)
+        phase_times_ms["init_custom"] = _elapsed_ms(phase_start)
         if verbose:
             print("[Eval] New Model with Custom CUDA Kernel Loaded")
     except RuntimeError as e:
+        phase_times_ms["init_custom"] = _elapsed_ms(phase_start)
         print(
             f"Failed to load custom CUDA kernel; Compiled but not able to run, count as runtime error. \nError: {e}"
         )
         # TODO: add metadata for runtime error e.g. error in launching kernel, illegal memory access, ...
-        graceful_eval_cleanup(context, device)
+        _timed_eval_cleanup(context, device, phase_times_ms)
         metadata["runtime_error"] = e
         return KernelExecResult(
             compiled=True, correctness=False, metadata=metadata
@@ -350,6 +521,8 @@ def eval_kernel_against_ref(
     # Check Correctness
     if verbose:
         print("[Eval] Checking Correctness")
+    _report(progress_callback, "phase", phase="correctness")
+    phase_start = time.perf_counter()
     try:
         kernel_exec_result = run_and_check_correctness(
             original_model,
@@ -360,6 +533,10 @@ def eval_kernel_against_ref(
             verbose=verbose,
             seed=seed_num,
             device=device,
+            reference_trials=(
+                reference.correctness_trials if reference is not None else None
+            ),
+            progress_callback=progress_callback,
         )
     except Exception as e:
         # TODO: add metadata for runtime error e.g. error in launching kernel, illegal memory access, ...
@@ -367,6 +544,13 @@ def eval_kernel_against_ref(
         kernel_exec_result = KernelExecResult(
             compiled=True, correctness=False, metadata=metadata
         )
+    phase_times_ms["correctness"] = _elapsed_ms(phase_start)
+    _report(
+        progress_callback,
+        "correctness",
+        correctness=kernel_exec_result.correctness,
+        trials=metadata.get("correctness_trials"),
+    )
 
     # Measure Performance [Optional] | conditioned on compilation + correctness + no exception so far
     if measure_performance:
@@ -375,13 +559,18 @@ def eval_kernel_against_ref(
                 if verbose:
                     print("[Eval] Measuring Performance as Sample is Correct")
 
+                _report(progress_callback, "phase", phase="perf")
+                phase_start = time.perf_counter()
                 torch.cuda.synchronize(device=device)
-                set_seed(seed_num)
-                inputs = get_inputs()
-                inputs = [
-                    x.cuda(device=device) if isinstance(x, torch.Tensor) else x
-                    for x in inputs
-                ]
+                if reference is not None:
+                    inputs = _clone_inputs(reference.perf_inputs)
+                else:
+                    set_seed(seed_num)
+                    inputs = get_inputs()
+                    inputs = [
+                        x.cuda(device=device) if isinstance(x, torch.Tensor) else x
+                        for x in inputs
+                    ]
                 model_new = custom_model.cuda(device=device)
                 torch.cuda.synchronize(device=device)
 
@@ -398,33 +587,82 @@ def eval_kernel_against_ref(
                     print(f"[Eval] Performance Stats: {runtime_stats}")
                 kernel_exec_result.runtime = runtime_stats["mean"]
                 kernel_exec_result.runtime_stats = runtime_stats
+                phase_times_ms["perf"] = _elapsed_ms(phase_start)
+                _report(progress_callback, "kernel_timing", **runtime_stats)
         except Exception as e:
             if verbose:
                 print(f"[Eval] Error in Measuring Performance: {e}")
             kernel_exec_result.metadata["error_during_performance"] = e
 
-    graceful_eval_cleanup(context, device)
+    # Profile [Optional] | conditioned on correctness, like performance
+    if profile and kernel_exec_result and kernel_exec_result.correctness:
+        _report(progress_callback, "phase", phase="profile")
+        phase_start = time.perf_counter()
+        try:
+            set_seed(seed_num)
+            inputs = [
+                x.cuda(device=device) if isinstance(x, torch.Tensor) else x
+                for x in get_inputs()
+            ]
+            for name, model in [
+                ("reference", original_model),
+                ("custom", custom_model),
+            ]:
+                kernel_exec_result.profile[name] = profile_model(
+                    model.cuda(device=device),
+                    inputs,
+                    device,
+                    top_n=profile_top_n,
+                    trace_path=(
+                        os.path.join(profile_trace_dir, f"{name}_trace.json")
+                        if profile_trace_dir
+                        else None
+                    ),
+                )
+            if verbose:
+                print(f"[Eval] Profile: {kernel_exec_result.profile}")
+        except Exception as e:
+            if verbose:
+                print(f"[Eval] Error in Profiling: {e}")
+            kernel_exec_result.metadata["error_during_profiling"] = e
+        phase_times_ms["profile"] = _elapsed_ms(phase_start)
+
+    _timed_eval_cleanup(context, device, phase_times_ms)
     return kernel_exec_result
 
 
 def evaluate_single_sample_src(
-    ref_arch_src: str, kernel_src: str, configs: dict, device: torch.device
+    ref_arch_src: str,
+    kernel_src: str,
+    configs: dict,
+    device: torch.device,
+    reference: PreparedReference = None,
+    progress_callback: ProgressCallback = None,
 ) -> KernelExecResult:
     """
     Evaluate a single sample source code against a reference source code
+    reference: optional prepare_reference output shared across samples of one reference
+    progress_callback: optional (event, data) callback, see eval_kernel_against_ref
+    configs may also set profile, profile_top_n and profile_trace (Chrome traces are
+    written to <build_dir>/profile)
     """
 
     kernel_hash = str(hash(kernel_src))
     build_dir = os.path.join(configs["build_dir_prefix"], "test_build", kernel_hash)
+    # filled in by eval_kernel_against_ref, kept in metadata even if the eval crashes
+    phase_times_ms = {}
 
     if configs["clear_cache"]:  # fresh kernel build
         print(f"[INFO] Clearing cache for build directory: {build_dir}")
+        phase_start = time.perf_counter()
         shutil.rmtree(build_dir, ignore_errors=True)
+        phase_times_ms["clear_cache"] = (time.perf_counter() - phase_start) * 1000
 
     num_correct_trials = configs["num_correct_trials"]
     num_perf_trials = configs["num_perf_trials"]
     verbose = configs["verbose"]
     measure_performance = configs["measure_performance"]
+    profile = configs.get("profile", False)
     try:
         eval_result = eval_kernel_against_ref(
             original_model_src=ref_arch_src,
@@ -435,6 +673,16 @@ def evaluate_single_sample_src(
             num_perf_trials=num_perf_trials,
             build_dir=build_dir,
             device=device,
+            reference=reference,
+            progress_callback=progress_callback,
+            profile=profile,
+            profile_top_n=configs.get("profile_top_n", 10),
+            profile_trace_dir=(
+                os.path.join(build_dir, "profile")
+                if profile and configs.get("profile_trace", False)
+                else None
+            ),
+            phase_times_ms=phase_times_ms,
         )
         return eval_result
     except Exception as e:
@@ -445,6 +693,7 @@ def evaluate_single_sample_src(
                 "cuda_error": f"CUDA Error: {str(e)}",
                 "hardware": torch.cuda.get_device_name(device=device),
                 "device": str(device),
+                "phase_times_ms": phase_times_ms,
             }
             eval_result = KernelExecResult(
                 compiled=False, correctness=False, metadata=metadata
@@ -455,6 +704,7 @@ def evaluate_single_sample_src(
                 "other_error": f"error: {str(e)}",
                 "hardware": torch.cuda.get_device_name(device=device),
                 "device": str(device),
+                "phase_times_ms": phase_times_ms,
             }
             eval_result = KernelExecResult(
                 compiled=False, correctness=False, metadata=metadata
@@ -545,6 +795,38 @@ def time_execution_with_cuda_event(
     return elapsed_times
 
 
+def time_execution_with_cpu_timer(
+    kernel_fn: callable,
+    *args,
+    num_warmup: int = 3,
+    num_trials: int = 10,
+    verbose: bool = True,
+) -> list[float]:
+    """
+    Time a function on CPU over multiple trials with time.perf_counter,
+    the counterpart of time_execution_with_cuda_event for GPU-less runs
+
+    Returns:
+        List of elapsed times in milliseconds
+    """
+    # Warm ups
+    for _ in range(num_warmup):
+        kernel_fn(*args)
+
+    print(f"[Profiling] Using device: cpu, warm up {num_warmup}, trials {num_trials}")
+    elapsed_times = []
+
+    for trial in range(num_trials):
+        start = time.perf_counter()
+        kernel_fn(*args)
+        elapsed_time_ms = (time.perf_counter() - start) * 1000
+        if verbose:
+            print(f"Trial {trial + 1}: {elapsed_time_ms:.3g} ms")
+        elapsed_times.append(elapsed_time_ms)
+
+    return elapsed_times
+
+
 def run_and_check_correctness(
     original_model_instance: nn.Module,
     new_model_instance: nn.Module,
@@ -554,6 +836,8 @@ def run_and_check_correctness(
     verbose=False,
     seed=42,
     device=None,
+    reference_trials: list[tuple[list, torch.Tensor]] = None,
+    progress_callback: ProgressCallback = None,
 ) -> KernelExecResult:
     """
     run the model and check correctness,
@@ -561,14 +845,14 @@ def run_and_check_correctness(
     this is all on GPU, requiring cuda device and transfer .cuda()
 
     num_correct_trials: run the evalutation multiple times with (ideally) different random inputs to ensure correctness
+    reference_trials: precomputed (inputs, reference output) per trial, see prepare_reference;
+        the original model is then not run again
+    progress_callback: called with ("correctness_trial", {trial, passed, ...}) after each trial
     """
     pass_count = 0
 
     # Generate num_correct_trials seeds deterministically from the initial seed
-    torch.manual_seed(seed)
-    correctness_trial_seeds = [
-        torch.randint(0, 2**32 - 1, (1,)).item() for _ in range(num_correct_trials)
-    ]
+    correctness_trial_seeds = get_correctness_trial_seeds(seed, num_correct_trials)
 
     with torch.no_grad():
 
@@ -578,22 +862,27 @@ def run_and_check_correctness(
             if verbose:
                 print(f"[Eval] Generating Random Input with seed {trial_seed}")
 
-            set_seed(trial_seed)
-            inputs = get_inputs_fn()
-            inputs = [
-                x.cuda(device=device) if isinstance(x, torch.Tensor) else x
-                for x in inputs
-            ]
+            if reference_trials is not None:
+                inputs, output = reference_trials[trial]
+                inputs = _clone_inputs(inputs)
+            else:
+                set_seed(trial_seed)
+                inputs = get_inputs_fn()
+                inputs = [
+                    x.cuda(device=device) if isinstance(x, torch.Tensor) else x
+                    for x in inputs
+                ]
 
-            set_seed(trial_seed)
-            model = original_model_instance.cuda(device=device)
+                set_seed(trial_seed)
+                model = original_model_instance.cuda(device=device)
 
             set_seed(trial_seed)
             model_new = new_model_instance.cuda(device=device)
 
-            output = model(*inputs)
-            torch.cuda.synchronize(device=device)
-            # ensure all GPU operations are completed before checking results
+            if reference_trials is None:
+                output = model(*inputs)
+                torch.cuda.synchronize(device=device)
+                # ensure all GPU operations are completed before checking results
 
             try:
                 output_new = model_new(*inputs)
@@ -608,6 +897,13 @@ def run_and_check_correctness(
                         print(
                             f"[FAIL] trial {trial}: Output shape mismatch: Expected {output.shape}, got {output_new.shape}"
                         )
+                    _report(
+                        progress_callback,
+                        "correctness_trial",
+                        trial=trial,
+                        passed=False,
+                        error="Output shape mismatch",
+                    )
                     return KernelExecResult(
                         compiled=True, correctness=False, metadata=metadata
                     )
@@ -623,10 +919,20 @@ def run_and_check_correctness(
                     metadata["correctness_issue"] = "Output mismatch"
                     if verbose:
                         print(f"[FAIL] trial {trial}: Output mismatch")
+                    _report(
+                        progress_callback,
+                        "correctness_trial",
+                        trial=trial,
+                        passed=False,
+                        max_difference=max_diff,
+                    )
                 else:  # pass
                     pass_count += 1
                     if verbose:
                         print(f"[PASS] trial {trial}: New Model matches Model")
+                    _report(
+                        progress_callback, "correctness_trial", trial=trial, passed=True
+                    )
 
             except Exception as e:
                 print("[Error] Exception happens during correctness check")
@@ -635,6 +941,13 @@ def run_and_check_correctness(
                 metadata = register_and_format_exception(
                     "runtime_error", e, metadata, truncate=True
                 )
+                _report(
+                    progress_callback,
+                    "correctness_trial",
+                    trial=trial,
+                    passed=False,
+                    error=metadata["runtime_error"],
+                )
                 return KernelExecResult(
                     compiled=True, correctness=False, metadata=metadata
                 )
@@ -722,14 +1035,15 @@ def fetch_baseline_time(
 ) -> dict:
     """
     Fetch the baseline time from the time
+    The file is parsed once and reused until it changes, for lookups by
+    (hardware, mode, level, problem) across results/timing see baseline_store
     """
     if not os.path.exists(baseline_time_filepath):
         raise FileNotFoundError(
             f"Baseline time file not found at {baseline_time_filepath}"
         )
 
-    with open(baseline_time_filepath, "r") as f:
-        baseline_json = json.load(f)
+    baseline_json = load_baseline_file(baseline_time_filepath)
 
     problem_name = dataset[problem_id].split("/")[-1]
     baseline_time = baseline_json[level_name].get(problem_name, None)
@@ -743,7 +1057,7 @@ def get_timing_stats(elapsed_times: list[float], device: torch.device = None) ->
         elapsed_times: List of elapsed times in milliseconds
         device: CUDA device, record device info
     Returns:
-        Dict containing mean, std, min, max and num_trials
+        Dict containing mean, std, min, max, p50, p90, p99 and num_trials
         all timing are in ms
     """
 
@@ -752,6 +1066,9 @@ def get_timing_stats(elapsed_times: list[float], device: torch.device = None) ->
         "std": float(f"{np.std(elapsed_times):.3g}"),
         "min": float(f"{np.min(elapsed_times):.3g}"),
         "max": float(f"{np.max(elapsed_times):.3g}"),
+        "p50": float(f"{np.percentile(elapsed_times, 50):.3g}"),
+        "p90": float(f"{np.percentile(elapsed_times, 90):.3g}"),
+        "p99": float(f"{np.percentile(elapsed_times, 99):.3g}"),
         "num_trials": len(elapsed_times),
     }
 
@@ -0,0 +1,243 @@
+########################
+# Device-bound Job Queue
+########################
+
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+"""
+Bounded job queue drained by one worker thread per device
+
+Used by the benchmark server so blocking GPU evaluations never run on the event loop:
+- submit() enqueues a job and returns immediately, raising QueueFullError when
+  max_queue_size jobs are already waiting (the server answers 429)
+- each worker owns one device (e.g. "cuda:0", or "cpu" for tests) and runs
+  run_job(payload, device) for one job at a time
+- jobs can be polled by id, or awaited through their concurrent.futures.Future
+- jobs still waiting can be cancelled, e.g. when the client waiting on them went away
+- shutdown(wait=False) cancels the waiting jobs and returns without blocking,
+  shutdown(wait=True) lets the workers finish them first
+"""
+
+
+class QueueFullError(Exception):
+    """Raised by submit when the queue is at capacity"""
+
+
+@dataclass
+class Job:
+    job_id: str
+    payload: Any
+    status: str = "queued"  # queued -> running -> succeeded / failed, or cancelled
+    device: str | None = None
+    result: Any = None
+    error: str | None = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    future: Future = field(default_factory=Future, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ["succeeded", "failed", "cancelled"]
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "device": self.device,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    run_job: blocking callable (payload, device) -> result, run on a worker thread
+    devices: one worker per entry, repeat a device to run several jobs on it concurrently
+    max_queue_size: jobs waiting to start, beyond which submit raises QueueFullError
+    max_finished_jobs: finished jobs kept for polling, oldest are forgotten first
+    on_finished: called with each job run by a worker once it is done, e.g. for metrics
+    """
+
+    def __init__(
+        self,
+        run_job: Callable[[Any, str], Any],
+        devices: list[str],
+        max_queue_size: int = 64,
+        max_finished_jobs: int = 1024,
+        on_finished: Callable[[Job], None] | None = None,
+    ):
+        assert devices, "JobQueue needs at least one device"
+        self.run_job = run_job
+        self.devices = devices
+        self.max_queue_size = max_queue_size
+        self.max_finished_jobs = max_finished_jobs
+        self.on_finished = on_finished
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._jobs: dict[str, Job] = {}
+        self._finished: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers: list[threading.Thread] = []
+        self._num_running = 0
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._workers:
+            return
+        for index, device in enumerate(self.devices):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                args=(device,),
+                name=f"job-worker-{index}-{device}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def shutdown(self, wait: bool = True):
+        """
+        wait: let the workers finish every pending job and join them; otherwise the
+        pending jobs are cancelled and this returns right away (running jobs still finish)
+        """
+        if not wait:
+            self._stopping.set()
+            self._cancel_pending()
+        for _ in self._workers:
+            if wait:
+                # queued after the pending jobs, blocks while the queue is full
+                self._queue.put(None)
+            else:
+                try:
+                    self._queue.put_nowait(None)
+                except queue.Full:
+                    # refilled concurrently, workers cancel what they get while stopping
+                    break
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        self._workers = []
+
+    def submit(self, payload: Any) -> Job:
+        if self._stopping.is_set():
+            raise QueueFullError("Job queue is shutting down")
+        job = Job(job_id=uuid.uuid4().hex, payload=payload)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.job_id]
+            raise QueueFullError(
+                f"Job queue is full ({self.max_queue_size} jobs waiting)"
+            )
+        return job
+
+    def add_finished(self, payload: Any, result: Any) -> Job:
+        """
+        Record a job whose result is already known (e.g. memoized), without queuing it
+        """
+        now = time.time()
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            payload=payload,
+            status="succeeded",
+            result=result,
+            started_at=now,
+            finished_at=now,
+        )
+        job.future.set_result(result)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._remember_finished(job.job_id)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that no worker has started yet, running jobs are left to finish
+        Returns whether the job was cancelled
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "queued":
+                return False
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            self._remember_finished(job_id)
+        # the worker drops it when it comes up in the queue
+        job.future.cancel()
+        return True
+
+    def _cancel_pending(self):
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                self.cancel(job.job_id)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def num_running(self) -> int:
+        return self._num_running
+
+    def _worker_loop(self, device: str):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if self._stopping.is_set():
+                self.cancel(job.job_id)
+                continue
+            with self._lock:
+                if job.status == "cancelled":
+                    continue
+                job.status = "running"
+                job.device = device
+                job.started_at = time.time()
+                self._num_running += 1
+            try:
+                job.result = self.run_job(job.payload, device)
+                job.status = "succeeded"
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                with self._lock:
+                    self._num_running -= 1
+                    self._remember_finished(job.job_id)
+            if self.on_finished is not None:
+                try:
+                    self.on_finished(job)
+                except Exception as e:
+                    print(f"[JobQueue] on_finished failed for job {job.job_id}: {e}")
+
+            if job.status == "succeeded":
+                job.future.set_result(job.result)
+            else:
+                job.future.set_exception(RuntimeError(job.error))
+
+    def _remember_finished(self, job_id: str):
+        self._finished[job_id] = None
+        while len(self._finished) > self.max_finished_jobs:
+            expired_id, _ = self._finished.popitem(last=False)
+            self._jobs.pop(expired_id, None)
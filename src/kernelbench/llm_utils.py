@@ -2,7 +2,14 @@
 # API LLM Utils Functions
 ########################
 
+import hashlib
+import inspect
+import json
 import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # API clients
 from together import Together
@@ -36,6 +43,12 @@ FIREWORKS_API_KEY = os.environ.get("FIREWORKS_API_KEY")
 def load_deepseek_tokenizer():
     # TODO: Should we update this for new deepseek? Same tokenizer?
     # return AutoTokenizer.from_pretrained("deepseek-ai/DeepSeek-Coder-V2-Instruct-0724")
+    # air-gapped hosts: point KERNELBENCH_TOKENIZER_PATH at a local copy of the tokenizer
+    local_tokenizer_path = os.environ.get("KERNELBENCH_TOKENIZER_PATH")
+    if local_tokenizer_path:
+        return AutoTokenizer.from_pretrained(
+            local_tokenizer_path, local_files_only=True, trust_remote_code=True
+        )
     return AutoTokenizer.from_pretrained(
         "deepseek-ai/DeepSeek-V2", trust_remote_code=True
     )
@@ -58,6 +71,413 @@ def is_safe_to_send_to_deepseek(prompt):
         return len(tokenizer.apply_chat_template(prompt)) < TOO_LONG_FOR_DEEPSEEK
 
 
+# providers that speak the OpenAI chat completions protocol
+OPENAI_COMPATIBLE_SERVERS = ["sglang", "deepseek", "fireworks", "sambanova", "openai"]
+# served locally and queried as model "default", the server location picks the model
+SELF_HOSTED_SERVERS = ["sglang"]
+
+
+def get_openai_compatible_endpoint(
+    server_type: str, server_address: str = "localhost", server_port: int = 30000
+) -> tuple[str, str | None]:
+    """
+    Return (base_url, api_key) for an OpenAI-compatible provider
+    """
+    match server_type:
+        case "sglang":
+            return f"http://{server_address}:{server_port}/v1", SGLANG_KEY
+        case "deepseek":
+            return "https://api.deepseek.com", DEEPSEEK_KEY
+        case "fireworks":
+            return "https://api.fireworks.ai/inference/v1", FIREWORKS_API_KEY
+        case "sambanova":
+            return "https://api.sambanova.ai/v1", SAMBANOVA_API_KEY
+        case "openai":
+            return (
+                os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+                OPENAI_KEY,
+            )
+        case _:
+            raise NotImplementedError(
+                f"{server_type} is not an OpenAI-compatible server"
+            )
+
+
+########################################################
+# Client Registry
+########################################################
+
+# process-wide clients keyed by (server_type, base_url, api_key)
+# each client owns an HTTP connection pool, reusing it keeps connections alive
+# across queries instead of paying a TLS handshake per request
+_CLIENT_REGISTRY: dict[tuple[str, str | None, str | None], object] = {}
+_CLIENT_REGISTRY_LOCK = threading.Lock()
+
+
+def _build_client(
+    server_type: str, base_url: str | None, api_key: str | None, **client_kwargs
+):
+    match server_type:
+        case "anthropic":
+            return anthropic.Anthropic(api_key=api_key, **client_kwargs)
+        case "together":
+            return Together(api_key=api_key, **client_kwargs)
+        case _:  # all other providers speak the OpenAI protocol
+            return OpenAI(api_key=api_key, base_url=base_url, **client_kwargs)
+
+
+def get_client(
+    server_type: str,
+    base_url: str | None = None,
+    api_key: str | None = None,
+    **client_kwargs,
+):
+    """
+    Get (or lazily create) the shared client for a provider endpoint
+    client_kwargs (timeout, max_retries, ...) only apply when the client is first created
+    Clients are thread-safe, so one instance is shared by all worker threads
+    """
+    key = (server_type, base_url, api_key)
+    client = _CLIENT_REGISTRY.get(key)
+    if client is None:
+        with _CLIENT_REGISTRY_LOCK:
+            client = _CLIENT_REGISTRY.get(key)
+            if client is None:
+                client = _build_client(server_type, base_url, api_key, **client_kwargs)
+                _CLIENT_REGISTRY[key] = client
+    return client
+
+
+def clear_client_registry():
+    """
+    Close and drop all pooled clients, e.g. after rotating API keys or forking
+    """
+    with _CLIENT_REGISTRY_LOCK:
+        for client in _CLIENT_REGISTRY.values():
+            if hasattr(client, "close"):
+                try:
+                    client.close()
+                except Exception as e:
+                    print(f"[WARNING] Failed to close client {client}: {e}")
+        _CLIENT_REGISTRY.clear()
+
+
+########################################################
+# Prompt Cache Accounting
+########################################################
+
+
+def get_cached_prompt_tokens(usage) -> tuple[int, int, int]:
+    """
+    (prompt tokens, prompt tokens read from the provider prefix cache,
+    prompt tokens written to it) from a response usage object of any provider
+    """
+    if usage is None:
+        return 0, 0, 0
+    # Anthropic: input_tokens excludes the cached part
+    if hasattr(usage, "input_tokens"):
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        return usage.input_tokens + cache_read + cache_write, cache_read, cache_write
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    # DeepSeek reports hits at the top level
+    cache_read = getattr(usage, "prompt_cache_hit_tokens", None)
+    if cache_read is None:
+        # OpenAI (and SGLang with --enable-cache-report)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cache_read = getattr(details, "cached_tokens", None) or 0
+    return prompt_tokens, cache_read, 0
+
+
+class PromptCacheStats:
+    """
+    Thread-safe running totals of prompt tokens served from provider prefix caches
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.num_requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.cache_write_tokens = 0
+
+    def record(self, usage):
+        prompt_tokens, cached_tokens, cache_write_tokens = get_cached_prompt_tokens(
+            usage
+        )
+        with self._lock:
+            self.num_requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.cache_write_tokens += cache_write_tokens
+
+    @property
+    def hit_rate(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.num_requests} requests, {self.cached_tokens}/{self.prompt_tokens} "
+            f"prompt tokens from cache ({self.hit_rate:.1%}), "
+            f"{self.cache_write_tokens} written to cache"
+        )
+
+
+# process-wide totals, updated by query_server and the async generation engine
+PROMPT_CACHE_STATS = PromptCacheStats()
+
+
+########################################################
+# Response Cache
+########################################################
+
+
+class ResponseCacheMiss(KeyError):
+    """Raised in replay mode when a query has no cached response"""
+
+
+class ResponseCache:
+    """
+    Disk-backed (sqlite) cache of LLM responses, keyed by a hash of the provider,
+    model, full prompt and sampling parameters, including the sample index so
+    pass@k samples of the same prompt stay distinct
+
+    mode:
+    - "read_write": serve hits, query and store misses
+    - "replay": read-only, serve hits and raise ResponseCacheMiss on misses,
+                so reruns never touch the provider and are fully reproducible
+    max_size_mb: least recently used entries are evicted beyond this size
+    """
+
+    def __init__(
+        self,
+        cache_path: str,
+        mode: str = "read_write",
+        max_size_mb: float | None = 1024,
+    ):
+        assert mode in ["read_write", "replay"], f"Invalid cache mode: {mode}"
+        self.cache_path = cache_path
+        self.mode = mode
+        self.max_size_bytes = max_size_mb * 1024 * 1024 if max_size_mb else None
+        self._lock = threading.Lock()
+
+        if mode == "replay":
+            if not os.path.exists(cache_path):
+                raise FileNotFoundError(f"No response cache to replay at {cache_path}")
+            self._conn = sqlite3.connect(
+                f"file:{cache_path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT, size INTEGER, last_access REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(**query_args) -> str:
+        """
+        Stable hash of everything that determines a response
+        """
+        serialized = json.dumps(query_args, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | list[str] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                if self.mode == "replay":
+                    raise ResponseCacheMiss(f"No cached response for key {key}")
+                return None
+            if self.mode == "read_write":
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, response: str | list[str]):
+        if self.mode == "replay":
+            return
+        serialized = json.dumps(response)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, serialized, len(serialized.encode("utf-8")), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # drop least recently used entries until the cache fits in max_size_bytes
+        if self.max_size_bytes is None:
+            return
+        (total_size,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total_size <= self.max_size_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total_size <= self.max_size_bytes:
+                break
+            evicted.append((key,))
+            total_size -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+########################################################
+# Streaming with Early Stop
+########################################################
+
+# servers whose streaming deltas we parse in query_server
+STREAMING_SERVERS = OPENAI_COMPATIBLE_SERVERS + ["together", "anthropic"]
+# servers that get string prompts as is on the completions endpoint, no chat template
+COMPLETION_SERVERS = ["sglang"]
+
+
+class CodeBlockStreamDetector:
+    """
+    Accumulate a streamed completion and detect when a complete fenced code block
+    of one of code_language_types containing required_symbol has arrived,
+    e.g. ```python ... class ModelNew ... ```
+    """
+
+    def __init__(
+        self,
+        code_language_types: tuple[str, ...] = ("python",),
+        required_symbol: str = "ModelNew",
+    ):
+        self.code_language_types = code_language_types
+        self.required_symbol = required_symbol
+        self.text = ""
+        self.code = None
+
+    def feed(self, delta: str | None) -> bool:
+        """
+        Append a streamed delta, True once the code block is complete
+        """
+        if not delta:
+            return False
+        self.text += delta
+        # a closing fence can only complete a block when a backtick arrived
+        if "`" in delta:
+            self.code = find_complete_code_block(
+                self.text, self.code_language_types, self.required_symbol
+            )
+        return self.code is not None
+
+
+def find_complete_code_block(
+    text: str,
+    code_language_types: tuple[str, ...] = ("python",),
+    required_symbol: str = "ModelNew",
+) -> str | None:
+    """
+    First closed fenced code block of one of code_language_types containing required_symbol
+    Returns None while the block is still open (or has not started)
+    """
+    for code_match in re.finditer(r"```([\w+-]*)[^\n]*\n(.*?)```", text, re.DOTALL):
+        language, code = code_match.group(1), code_match.group(2)
+        if language in code_language_types and required_symbol in code:
+            return code.strip()
+    return None
+
+
+def _stream_until_code_block(
+    client,
+    server_type: str,
+    model: str,
+    prompt: str | list[dict],
+    system_prompt: str,
+    temperature: float,
+    top_p: float,
+    max_tokens: int,
+    detector: CodeBlockStreamDetector,
+) -> str:
+    """
+    Stream one completion and stop the request as soon as the detector fires
+    Returns the text generated so far, which contains the complete code block
+    """
+    if isinstance(prompt, str):
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+    else:
+        messages = prompt
+
+    if server_type == "anthropic":
+        with client.messages.stream(
+            model=model,
+            system=system_prompt,
+            messages=[m for m in messages if m["role"] != "system"],
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+        ) as stream:
+            # leaving the context manager closes the connection, ending generation
+            for delta in stream.text_stream:
+                if detector.feed(delta):
+                    break
+        return detector.text
+
+    completion_style = server_type in COMPLETION_SERVERS and isinstance(prompt, str)
+    if completion_style:
+        # same endpoint as the non-streaming query, so early stop only changes when it stops
+        stream = client.completions.create(
+            model=model,
+            prompt=prompt,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+    else:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if detector.feed(choice.text if completion_style else choice.delta.content):
+                break
+    finally:
+        # closing the HTTP response aborts the generation server side
+        if hasattr(stream, "close"):
+            stream.close()
+    return detector.text
+
+
 def query_server(
     prompt: str | list[dict],  # string if normal prompt, list of dicts if chat prompt,
     system_prompt: str = "You are a helpful assistant",  # only used for chat prompts
@@ -74,6 +494,13 @@ def query_server(
     is_reasoning_model: bool = False,  # indiactor of using reasoning models
     budget_tokens: int = 0,  # for claude thinking
     reasoning_effort: str = None,  # only for o1 and o3 / more reasoning models in the future
+    # response caching
+    response_cache: ResponseCache = None,
+    sample_id: int = 0,  # distinguishes repeated samples of the same prompt in the cache
+    # streaming: stop as soon as a complete ```python block with ModelNew arrived
+    stream_until_code_block: bool = False,
+    # static text shared across prompts, sent first and marked cacheable (see PromptParts)
+    prompt_prefix: str | None = None,
 ):
     """
     Query various sort of LLM inference API providers
@@ -86,19 +513,50 @@ def query_server(
     - Gemini / Google AI Studio
     - Fireworks (OpenAI compatbility)
     - SGLang (Local Server)
+
+    With a response_cache, identical queries (same prompt, sampling parameters
+    and sample_id) are served from disk instead of the provider
+
+    With stream_until_code_block, the completion is streamed and the request is
+    stopped once the first complete ```python block containing ModelNew closes,
+    instead of paying for whatever the model writes after it
+
+    With a prompt_prefix, the prompt is prompt_prefix + prompt. Anthropic gets the prefix
+    as its own content block with cache_control, other providers cache identical
+    prefixes automatically. Cache hits are tallied in PROMPT_CACHE_STATS
     """
+    if response_cache is not None:
+        query_args = dict(locals())
+        query_args.pop("response_cache")
+        cache_key = query_cache_key(**query_args)
+        cached_response = response_cache.get(cache_key)
+        if cached_response is not None:
+            return cached_response
+        query_args.pop("sample_id")
+        response = query_server(**query_args)
+        response_cache.put(cache_key, response)
+        return response
+
     # Select model and client based on arguments
     match server_type:
         case "sglang":
-            url = f"http://{server_address}:{server_port}"
-            client = OpenAI(
-                api_key=SGLANG_KEY, base_url=f"{url}/v1", timeout=None, max_retries=0
+            base_url, api_key = get_openai_compatible_endpoint(
+                server_type, server_address, server_port
+            )
+            client = get_client(
+                server_type,
+                base_url=base_url,
+                api_key=api_key,
+                timeout=None,
+                max_retries=0,
             )
             model = "default"
         case "deepseek":
-            client = OpenAI(
-                api_key=DEEPSEEK_KEY,
-                base_url="https://api.deepseek.com",
+            base_url, api_key = get_openai_compatible_endpoint(server_type)
+            client = get_client(
+                server_type,
+                base_url=base_url,
+                api_key=api_key,
                 timeout=10000000,
                 max_retries=3,
             )
@@ -108,36 +566,34 @@ def query_server(
                 "deepseek-coder",
                 "deepseek-reasoner",
             ], "Only support deepseek-chat or deepseek-coder for now"
-            if not is_safe_to_send_to_deepseek(prompt):
-                raise RuntimeError("Prompt is too long for DeepSeek")
         case "fireworks":
-            client = OpenAI(
-                api_key=FIREWORKS_API_KEY,
-                base_url="https://api.fireworks.ai/inference/v1",
+            base_url, api_key = get_openai_compatible_endpoint(server_type)
+            client = get_client(
+                server_type,
+                base_url=base_url,
+                api_key=api_key,
                 timeout=10000000,
                 max_retries=3,
             )
             model = model_name
 
         case "anthropic":
-            client = anthropic.Anthropic(
-                api_key=ANTHROPIC_KEY,
-            )
+            client = get_client(server_type, api_key=ANTHROPIC_KEY)
             model = model_name
         case "google":
             genai.configure(api_key=GEMINI_KEY)
             model = model_name
         case "together":
-            client = Together(api_key=TOGETHER_KEY)
+            client = get_client(server_type, api_key=TOGETHER_KEY)
             model = model_name
         case "sambanova":
-            client = OpenAI(
-                api_key=SAMBANOVA_API_KEY, base_url="https://api.sambanova.ai/v1"
-            )
+            base_url, api_key = get_openai_compatible_endpoint(server_type)
+            client = get_client(server_type, base_url=base_url, api_key=api_key)
             model = model_name
 
         case "openai":
-            client = OpenAI(api_key=OPENAI_KEY)
+            base_url, api_key = get_openai_compatible_endpoint(server_type)
+            client = get_client(server_type, base_url=base_url, api_key=api_key)
             model = model_name
         case _:
             raise NotImplementedError
@@ -148,6 +604,50 @@ def query_server(
         print(
             f"Querying {server_type} {model} with temp {temperature} max tokens {max_tokens}"
         )
+    user_content = prompt
+    if prompt_prefix is not None:
+        assert isinstance(prompt, str), "prompt_prefix requires a string prompt"
+        if server_type == "anthropic":
+            user_content = [
+                {
+                    "type": "text",
+                    "text": prompt_prefix,
+                    "cache_control": {"type": "ephemeral"},
+                },
+                {"type": "text", "text": prompt},
+            ]
+        else:
+            prompt = user_content = prompt_prefix + prompt
+    # checked on the full prompt, after the cacheable prefix was joined in
+    if server_type == "deepseek" and not is_safe_to_send_to_deepseek(prompt):
+        raise RuntimeError("Prompt is too long for DeepSeek")
+
+    if stream_until_code_block:
+        if (
+            server_type in STREAMING_SERVERS
+            and not is_reasoning_model
+            and num_completions == 1
+        ):
+            return _stream_until_code_block(
+                client,
+                server_type,
+                model,
+                (
+                    [{"role": "user", "content": user_content}]
+                    if user_content is not prompt
+                    else prompt
+                ),
+                system_prompt,
+                temperature,
+                top_p,
+                max_tokens,
+                CodeBlockStreamDetector(),
+            )
+        print(
+            f"[Streaming] Early stop not supported for {server_type} "
+            f"(reasoning={is_reasoning_model}, n={num_completions}), querying without streaming"
+        )
+
     # Logic to query the LLM
     if server_type == "anthropic":
         assert isinstance(
@@ -160,7 +660,7 @@ def query_server(
                 model=model,
                 system=system_prompt,
                 messages=[
-                    {"role": "user", "content": prompt},
+                    {"role": "user", "content": user_content},
                 ],
                 max_tokens=max_tokens,
                 # Claude thinking requires budget_tokens for thinking (reasoning)
@@ -173,7 +673,7 @@ def query_server(
                 model=model,
                 system=system_prompt,
                 messages=[
-                    {"role": "user", "content": prompt},
+                    {"role": "user", "content": user_content},
                 ],
                 temperature=temperature,
                 top_p=top_p,
@@ -340,6 +840,8 @@ def query_server(
             )
             outputs = [choice.message.content for choice in response.choices]
 
+    PROMPT_CACHE_STATS.record(getattr(response, "usage", None))
+
     # output processing
     if len(outputs) == 1:
         return outputs[0]
@@ -386,6 +888,109 @@ SERVER_PRESETS = {
 }
 
 
+########################################################
+# Multi-completion Sampling
+########################################################
+
+# servers that return n completions from a single request,
+# so the prompt is prefilled once per problem rather than once per sample
+MULTI_COMPLETION_SERVERS = ["sglang", "deepseek", "openai"]
+
+
+def query_server_samples(
+    prompt: str | list[dict],
+    sample_ids: list[int],
+    max_workers: int = 4,
+    **query_kwargs,
+) -> list[str]:
+    """
+    One completion per sample id for the same prompt (e.g. pass@k generation)
+
+    Servers in MULTI_COMPLETION_SERVERS are asked for all missing samples in one request
+    with num_completions=n, other servers (and reasoning / streaming queries) fall back
+    to concurrent single-completion calls on up to max_workers threads
+    With a response_cache each sample is cached under its own sample_id,
+    so entries are shared with single-sample query_server calls
+
+    query_kwargs: passed through to query_server
+    Returns:
+        list of completions aligned with sample_ids
+    """
+    assert (
+        "num_completions" not in query_kwargs
+    ), "num_completions is set from sample_ids"
+    response_cache = query_kwargs.pop("response_cache", None)
+    server_type = query_kwargs.get("server_type", "sglang")
+
+    responses = {}
+    cache_keys = {}
+    if response_cache is not None:
+        for sample_id in sample_ids:
+            cache_keys[sample_id] = query_cache_key(
+                prompt=prompt, sample_id=sample_id, **query_kwargs
+            )
+            cached_response = response_cache.get(cache_keys[sample_id])
+            if cached_response is not None:
+                responses[sample_id] = cached_response
+    missing_ids = [sample_id for sample_id in sample_ids if sample_id not in responses]
+
+    if missing_ids:
+        use_multi_completion = (
+            server_type in MULTI_COMPLETION_SERVERS
+            and not query_kwargs.get("is_reasoning_model", False)
+            and not query_kwargs.get("stream_until_code_block", False)
+        )
+        if use_multi_completion:
+            outputs = query_server(
+                prompt, num_completions=len(missing_ids), **query_kwargs
+            )
+            outputs = [outputs] if isinstance(outputs, str) else outputs
+            assert len(outputs) == len(
+                missing_ids
+            ), f"Asked {server_type} for {len(missing_ids)} completions, got {len(outputs)}"
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(missing_ids))
+            ) as executor:
+                outputs = list(
+                    executor.map(
+                        lambda sample_id: query_server(
+                            prompt, sample_id=sample_id, **query_kwargs
+                        ),
+                        missing_ids,
+                    )
+                )
+
+        for sample_id, output in zip(missing_ids, outputs):
+            responses[sample_id] = output
+            if response_cache is not None:
+                response_cache.put(cache_keys[sample_id], output)
+
+    return [responses[sample_id] for sample_id in sample_ids]
+
+
+def query_cache_key(**query_args) -> str:
+    """
+    Response cache key of a query_server call, unspecified arguments take their defaults
+    The location of a hosted API does not change the response, so it is not part of the
+    key; self-hosted servers are queried as model "default", there the address and port
+    are what identify the model
+    """
+    bound = inspect.signature(query_server).bind(**query_args)
+    bound.apply_defaults()
+    location_args = (
+        []
+        if bound.arguments["server_type"] in SELF_HOSTED_SERVERS
+        else ["server_port", "server_address"]
+    )
+    key_args = {
+        k: v
+        for k, v in bound.arguments.items()
+        if k not in ["response_cache"] + location_args
+    }
+    return ResponseCache.make_key(**key_args)
+
+
 def create_inference_server_from_presets(
     server_type: str = None,
     greedy_sample: bool = False,
@@ -397,7 +1002,18 @@ def create_inference_server_from_presets(
     Return a callable function that queries LLM with given settings
     """
 
-    def _query_llm(prompt: str | list[dict]):
+    def _query_llm(
+        prompt: str | list[dict],
+        sample_id: int = 0,
+        sample_ids: list[int] | None = None,
+        prompt_prefix: str | None = None,
+        max_workers: int = 4,
+    ):
+        """
+        Single completion for sample_id, or a list of completions when sample_ids is given
+        prompt_prefix: cacheable static part of the prompt, see query_server
+        max_workers: concurrent requests for sample_ids on servers without n-completions
+        """
         server_args = SERVER_PRESETS[server_type].copy()
 
         if kwargs:
@@ -409,13 +1025,27 @@ def create_inference_server_from_presets(
         if verbose:
             print(f"Querying server {server_type} with args: {server_args}")
 
+        start_time = time.time()
+        if sample_ids is not None:
+            response = query_server_samples(
+                prompt,
+                sample_ids,
+                max_workers=max_workers,
+                server_type=server_type,
+                prompt_prefix=prompt_prefix,
+                **server_args,
+            )
+        else:
+            response = query_server(
+                prompt,
+                server_type=server_type,
+                sample_id=sample_id,
+                prompt_prefix=prompt_prefix,
+                **server_args,
+            )
         if time_generation:
-            start_time = time.time()
-            response = query_server(prompt, server_type=server_type, **server_args)
             end_time = time.time()
             print(f"[Timing] Inference took {end_time - start_time:.2f} seconds")
-            return response
-        else:
-            return query_server(prompt, server_type=server_type, **server_args)
+        return response
 
     return _query_llm
@@ -0,0 +1,102 @@
+########################
+# Profiler Breakdown
+########################
+
+import os
+
+import torch
+from torch.autograd import DeviceType
+from torch.profiler import ProfilerActivity, profile
+
+"""
+torch.profiler breakdown of a model's forward pass, used by the optional profiling
+phase of eval_kernel_against_ref
+
+Instead of a printed table, the top-N entries are returned as plain dicts that can
+be stored in KernelExecResult and compared across reference and custom models:
+- on CUDA devices the GPU kernels (not the aten ops launching them), ranked by self
+  device time
+- on CPU the operators, ranked by self CPU time, so GPU-less runs can profile too
+A Chrome trace (chrome://tracing or https://ui.perfetto.dev) can be exported as well
+"""
+
+
+def get_profiler_activities(device: torch.device | str) -> list:
+    if torch.device(device).type == "cuda":
+        return [ProfilerActivity.CPU, ProfilerActivity.CUDA]
+    return [ProfilerActivity.CPU]
+
+
+def _synchronize(device: torch.device):
+    if device.type == "cuda":
+        torch.cuda.synchronize(device=device)
+
+
+def profile_model(
+    model: torch.nn.Module,
+    inputs: list,
+    device: torch.device | str,
+    num_trials: int = 10,
+    num_warmup: int = 3,
+    top_n: int = 10,
+    trace_path: str | None = None,
+) -> dict:
+    """
+    Profile num_trials forward passes of model on inputs (already on device)
+    trace_path: export a Chrome trace of the profiled passes there
+
+    Returns {"device", "num_trials", "total_self_time_us", "top": [...]}, each top
+    entry is {"name", "calls", "self_time_us", "self_time_pct", "total_time_us"},
+    times summed over the num_trials passes
+    """
+    device = torch.device(device)
+    on_cuda = device.type == "cuda"
+    with torch.no_grad():
+        for _ in range(num_warmup):
+            model(*inputs)
+        _synchronize(device)
+        with profile(activities=get_profiler_activities(device)) as prof:
+            for _ in range(num_trials):
+                model(*inputs)
+            _synchronize(device)
+
+    events = []
+    for event in prof.key_averages():
+        if on_cuda:
+            # GPU kernels (and memcpy / memset) only: kineto also credits the aten ops
+            # that launched them with their device time, which would count it twice
+            if event.device_type != DeviceType.CUDA or getattr(
+                event, "is_user_annotation", False
+            ):
+                continue
+            self_time, total_time = (
+                event.self_device_time_total,
+                event.device_time_total,
+            )
+        else:
+            self_time, total_time = event.self_cpu_time_total, event.cpu_time_total
+        if self_time > 0:
+            events.append((self_time, total_time, event))
+    events.sort(key=lambda entry: entry[0], reverse=True)
+    total_self_time = sum(self_time for self_time, _, _ in events)
+
+    if trace_path:
+        os.makedirs(os.path.dirname(os.path.abspath(trace_path)), exist_ok=True)
+        prof.export_chrome_trace(trace_path)
+
+    return {
+        "device": str(device),
+        "num_trials": num_trials,
+        "total_self_time_us": total_self_time,
+        "top": [
+            {
+                "name": event.key,
+                "calls": event.count,
+                "self_time_us": self_time,
+                "self_time_pct": 100 * self_time / total_self_time,
+                "total_time_us": total_time,
+            }
+            for self_time, total_time, event in events[:top_n]
+        ],
+        "trace_path": trace_path,
+    }
@@ -1,6 +1,8 @@
 import os
-import weave
+from dataclasses import dataclass
 from kernelbench.utils import read_file
+from kernelbench.prompt_templates import get_prompt_templates, parse_gpu_specs
+from kernelbench.tracing import trace_op, configure_tracing
 
 
 """
@@ -44,7 +46,7 @@ Optimize the architecture named Model with custom CUDA operators! Name your opti
 """
 
 
-@weave.op
+@trace_op
 def prompt_generate_custom_cuda(
     arc_src: str, example_arch_src: str, example_new_arch_src: str
 ) -> str:
@@ -79,7 +81,7 @@ Optimize the architecture named Model with custom CUDA operators! Name your opti
 """
 
 
-@weave.op
+@trace_op
 def prompt_generate_custom_cuda_fewshot_and_template(
     ref_arch_src: str, shots: list
 ) -> str:
@@ -96,105 +98,12 @@ def prompt_generate_custom_cuda_fewshot_and_template(
     """
     prompt = PROBLEM_STATEMENT_CLEANED
 
-    # k = 1
-    example_add = read_file(
-        os.path.join(REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_ex_add.py")
-    )
-    example_add_new = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_new_ex_add.py"
-        )
-    )
-    example_add_desc = "This given architecture is for a pointwise addition: "
-
-    # k = 2
-    example_fuse_gelu = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_ex_fuse_gelu.py"
-        )
-    )
-    example_fuse_gelu_new = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_new_ex_fuse_gelu.py"
-        )
-    )
-    example_fuse_gelu_desc = "This given architecture is for a fused gelu: "
-
-    # k = 3 (DEPRECATED)
-    example_mnist2 = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_ex_mnist2.py"
-        )
-    )
-    example_mnist2_new = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_new_ex_mnist2.py"
-        )
-    )
-    exmaple_mnist2_desc = (
-        "This given architecture is for a model with fused convolutions and relus: "
-    )
-
-    # k = 4
-    example_tiled_matmul = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_ex_tiled_matmul.py"
-        )
-    )
-    example_tiled_matmul_new = read_file(
-        os.path.join(
-            REPO_TOP_PATH,
-            "src/kernelbench/prompts/few_shot/model_new_ex_tiled_matmul.py",
-        )
-    )
-    example_tiled_matmul_desc = (
-        "This given architecture is for a model with tiled matrix multiplication: "
-    )
-
-    # k = 5
-    example_flash_attn = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_ex_flash_attn.py"
-        )
-    )
-    example_flash_attn_new = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_new_ex_flash_attn.py"
-        )
-    )
-    example_flash_attn_desc = "This given architecture is for a model with simple io-aware implementation of attention, also known as flash attention: "
-
+    templates = get_prompt_templates()
     examples = []
     for s in shots:
-        if s not in [
-            "ex_add",
-            "ex_fuse_gelu",
-            "ex_mnist2",
-            "ex_tiled_matmul",
-            "ex_flash_attn",
-        ]:
-            raise ValueError(f"Invalid shot: {s}")
-        elif s == "ex_add":
-            examples.append((example_add, example_add_new, example_add_desc))
-        elif s == "ex_fuse_gelu":
-            examples.append(
-                (example_fuse_gelu, example_fuse_gelu_new, example_fuse_gelu_desc)
-            )
-        elif s == "ex_mnist2":  # DEPRECATED
+        if s == "ex_mnist2":  # DEPRECATED
             raise ValueError("ex_mnist2 is deprecated")
-            examples.append((example_mnist2, example_mnist2_new, exmaple_mnist2_desc))
-        elif s == "ex_tiled_matmul":
-            examples.append(
-                (
-                    example_tiled_matmul,
-                    example_tiled_matmul_new,
-                    example_tiled_matmul_desc,
-                )
-            )
-        elif s == "ex_flash_attn":
-            examples.append(
-                (example_flash_attn, example_flash_attn_new, example_flash_attn_desc)
-            )
+        examples.append(templates.few_shot(s))
 
     for i, tup in enumerate(examples):
         base, kernel, desc = tup
@@ -224,7 +133,7 @@ Here is an example architecture:\n\n
     return prompt
 
 
-@weave.op
+@trace_op
 def prompt_generate_ex_with_CoT_template(ref_arch_src: str, cot_example: str) -> str:
     """
     Generate a prompt with a CoT example following a template
@@ -245,83 +154,7 @@ Let's think step by step.\n
 
     assert cot_example in ["ex_fuse_gelu", "ex_mnist2", "ex_tiled_matmul"]
 
-    # k = 2
-    example_fuse_gelu = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_ex_fuse_gelu.py"
-        )
-    )
-    example_fuse_gelu_cot = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/cot/model_cot_fuse_gelu.py"
-        )
-    )
-    example_fuse_gelu_new = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_new_ex_fuse_gelu.py"
-        )
-    )
-    example_fuse_gelu_desc = "This given architecture is for a fused gelu: "
-
-    # k = 3
-    example_mnist2 = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_ex_mnist2.py"
-        )
-    )
-    example_mnist2_cot = read_file(
-        os.path.join(REPO_TOP_PATH, "src/kernelbench/prompts/cot/model_cot_mnist2.py")
-    )
-    example_mnist2_new = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_new_ex_mnist2.py"
-        )
-    )
-    exmaple_mnist2_desc = (
-        "This given architecture is for a model with fused convolutions and relus: "
-    )
-
-    # k = 4
-    example_tiled_matmul = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/few_shot/model_ex_tiled_matmul.py"
-        )
-    )
-    example_tiled_matmul_cot = read_file(
-        os.path.join(
-            REPO_TOP_PATH, "src/kernelbench/prompts/cot/model_cot_tiled_matmul.py"
-        )
-    )
-    example_tiled_matmul_new = read_file(
-        os.path.join(
-            REPO_TOP_PATH,
-            "src/kernelbench/prompts/few_shot/model_new_ex_tiled_matmul.py",
-        )
-    )
-    example_tiled_matmul_desc = (
-        "This given architecture is for a model with tiled matrix multiplication: "
-    )
-
-    match cot_example:
-        case "ex_fuse_gelu":
-            base = example_fuse_gelu
-            cot = example_fuse_gelu_cot
-            kernel = example_fuse_gelu_new
-            desc = example_fuse_gelu_desc
-        case "ex_mnist2":
-            base = example_mnist2
-            cot = example_mnist2_cot
-            kernel = example_mnist2_new
-            desc = exmaple_mnist2_desc
-        case "ex_tiled_matmul":
-            base = example_tiled_matmul
-            cot = example_tiled_matmul_cot
-            kernel = example_tiled_matmul_new
-            desc = example_tiled_matmul_desc
-        case _:
-            raise ValueError(
-                f"Invalid CoT example: {cot_example} not found in CoT examples"
-            )
+    base, cot, kernel, desc = get_prompt_templates().cot(cot_example)
 
     # construct example with
     # NOTE: we only do one example with CoT for now
@@ -361,26 +194,10 @@ def prompt_generate_custom_cuda_from_file_one_example(ref_arch_src, example_ind=
     # arch = get_arch_definition_from_file(arch_path)
     arch = ref_arch_src
     # These are strictly defined for now
-
-    example_arch_path = os.path.join(
-        REPO_TOP_PATH, f"src/kernelbench/prompts/model_ex_{example_ind}.py"
-    )
-    example_new_arch_path = os.path.join(
-        REPO_TOP_PATH, f"src/kernelbench/prompts/model_new_ex_{example_ind}.py"
+    example_arch, example_new_arch = get_prompt_templates().template_example(
+        example_ind
     )
 
-    if not os.path.exists(example_arch_path):
-        raise FileNotFoundError(
-            f"Example architecture file not found: {example_arch_path}"
-        )
-    if not os.path.exists(example_new_arch_path):
-        raise FileNotFoundError(
-            f"Example new architecture file not found: {example_new_arch_path}"
-        )
-
-    example_arch = read_file(example_arch_path)
-    example_new_arch = read_file(example_new_arch_path)
-
     return prompt_generate_custom_cuda(arch, example_arch, example_new_arch)
 
 
@@ -392,25 +209,8 @@ def prompt_generate_custom_cuda_from_prompt_template(ref_arch_src: str) -> str:
     arch = ref_arch_src
     # These are strictly defined for now
 
-    # path to prompt template, show an example of Model (torch specifications) and ModelNew (torch + custom CUDA kernels)
-    example_arch_path = os.path.join(
-        REPO_TOP_PATH, f"src/kernelbench/prompts/model_ex_add.py"
-    )
-    example_new_arch_path = os.path.join(
-        REPO_TOP_PATH, f"src/kernelbench/prompts/model_new_ex_add.py"
-    )
-
-    if not os.path.exists(example_arch_path):
-        raise FileNotFoundError(
-            f"Example architecture file not found: {example_arch_path}"
-        )
-    if not os.path.exists(example_new_arch_path):
-        raise FileNotFoundError(
-            f"Example new architecture file not found: {example_new_arch_path}"
-        )
-
-    example_arch = read_file(example_arch_path)
-    example_new_arch = read_file(example_new_arch_path)
+    # prompt template, show an example of Model (torch specifications) and ModelNew (torch + custom CUDA kernels)
+    example_arch, example_new_arch = get_prompt_templates().template_example("add")
 
     return prompt_generate_custom_cuda(arch, example_arch, example_new_arch)
 
@@ -426,21 +226,10 @@ def prompt_generate_prompt_with_hardware_info_from_template(
     arch = ref_arch_src
     # These are strictly defined for now
 
-    # path to prompt template, show an example of Model (torch specifications) and ModelNew (torch + custom CUDA kernels)
-    example_arch_path = os.path.join(
-        REPO_TOP_PATH, f"src/kernelbench/prompts/model_ex_add.py"
-    )
-    example_new_arch_path = os.path.join(
-        REPO_TOP_PATH, f"src/kernelbench/prompts/model_new_ex_add.py"
-    )
-
-    gpu_spec_file_path = os.path.join(
-        REPO_TOP_PATH, f"src/kernelbench/prompts/hardware/gpu_specs.py"
-    )
-
-    example_arch = read_file(example_arch_path)
-    example_new_arch = read_file(example_new_arch_path)
-    gpu_spec_info = read_file(gpu_spec_file_path)
+    # prompt template, show an example of Model (torch specifications) and ModelNew (torch + custom CUDA kernels)
+    templates = get_prompt_templates()
+    example_arch, example_new_arch = templates.template_example("add")
+    gpu_spec_info = templates.gpu_spec_info_src()
 
     return prompt_generate_prompt_with_hardware_info(
         ref_arch_src=arch,
@@ -451,34 +240,22 @@ def prompt_generate_prompt_with_hardware_info_from_template(
     )
 
 
-@weave.op
-def prompt_generate_prompt_with_hardware_info(
+def _hardware_prompt_sections(
     ref_arch_src: str,
     gpu_name: str,
     example_arch_src: str,
     example_new_arch_src: str,
     gpu_spec_info_src: str,
-) -> str:
+) -> dict[str, str]:
     """
-    Generate a prompt with hardware information for the given GPU
-    gpu_spec_info_src: str of the gpu spec src file
+    Sections of the hardware-aware prompt, assembled in different orders
+    by prompt_generate_prompt_with_hardware_info and prompt_parts_with_hardware_info
     """
-
-    # Create a dictionary to store the local namespace
-    local_dict = {}
-
-    # Execute the GPU spec file in the local namespace
-    exec(gpu_spec_info_src, {}, local_dict)
-
-    # Get the required variables from the local namespace
-    GPU_SPEC_INFO = local_dict.get("GPU_SPEC_INFO")
-    GPU_DEFINITIONS = local_dict.get("GPU_DEFINITIONS")
-    GPU_BEST_PRACTICES = local_dict.get("GPU_BEST_PRACTICES")
-
-    if not GPU_SPEC_INFO or not GPU_DEFINITIONS or not GPU_BEST_PRACTICES:
-        raise ValueError(
-            "GPU_SPEC_INFO or GPU_DEFINITIONS or GPU_BEST_PRACTICES not found in gpu_spec_info_src"
-        )
+    # the spec file is executed once per distinct source, not on every call
+    gpu_specs = parse_gpu_specs(gpu_spec_info_src)
+    GPU_SPEC_INFO = gpu_specs["GPU_SPEC_INFO"]
+    GPU_DEFINITIONS = gpu_specs["GPU_DEFINITIONS"]
+    GPU_BEST_PRACTICES = gpu_specs["GPU_BEST_PRACTICES"]
 
     assert gpu_name in GPU_SPEC_INFO, f"GPU name {gpu_name} not found in GPU_SPEC_INFO"
 
@@ -545,14 +322,45 @@ Your task is to optimize PyTorch models by replacing standard PyTorch operators
 Implement an optimized version called "ModelNew" with custom CUDA operators.
 """
 
+    return {
+        "objective": objective_section,
+        "hardware": hardware_section,
+        "concepts": concepts_section,
+        "practices": practices_section,
+        "examples": examples_section,
+        "task": task_section,
+    }
+
+
+@trace_op
+def prompt_generate_prompt_with_hardware_info(
+    ref_arch_src: str,
+    gpu_name: str,
+    example_arch_src: str,
+    example_new_arch_src: str,
+    gpu_spec_info_src: str,
+) -> str:
+    """
+    Generate a prompt with hardware information for the given GPU
+    gpu_spec_info_src: str of the gpu spec src file
+    """
+
+    sections = _hardware_prompt_sections(
+        ref_arch_src,
+        gpu_name,
+        example_arch_src,
+        example_new_arch_src,
+        gpu_spec_info_src,
+    )
+
     # Combine all sections into the final prompt
     prompt = (
-        objective_section
-        + hardware_section
-        + concepts_section
-        + practices_section
-        + examples_section
-        + task_section
+        sections["objective"]
+        + sections["hardware"]
+        + sections["concepts"]
+        + sections["practices"]
+        + sections["examples"]
+        + sections["task"]
     )
 
     return prompt
@@ -560,6 +368,79 @@ Implement an optimized version called "ModelNew" with custom CUDA operators.
     return Nonoe
 
 
+############################################
+# Prompt-cache-friendly Layout
+############################################
+# Providers cache the longest previously seen prompt prefix (OpenAI, DeepSeek, SGLang
+# radix cache do it automatically, Anthropic when marked with cache_control)
+# so everything shared across problems goes first and the problem goes last
+
+
+@dataclass
+class PromptParts:
+    static_prefix: str  # identical for every problem of a run, cacheable
+    problem_suffix: str  # problem-specific text, always after the prefix
+
+    def join(self) -> str:
+        return self.static_prefix + self.problem_suffix
+
+
+def prompt_parts_custom_cuda_from_prompt_template(ref_arch_src: str) -> PromptParts:
+    """
+    Same content as prompt_generate_custom_cuda_from_prompt_template, with the
+    instruction moved ahead of the problem so the whole prefix is static
+    """
+    example_arch, example_new_arch = get_prompt_templates().template_example("add")
+
+    static_prefix = (
+        PROBLEM_STATEMENT
+        + f"""
+        Here's an example to show you the syntax of inline embedding custom CUDA operators in torch: The example given architecture is: \n
+        ``` \n
+        {example_arch}
+        ``` \n
+        The example new arch with custom CUDA kernels looks like this:
+        ```
+        {example_new_arch}
+        ``` \n
+        """
+        + PROBLEM_INSTRUCTION
+    )
+    problem_suffix = f"""
+    You are given the following architecture: \n
+    ```
+    {ref_arch_src}
+    ```
+    """
+    return PromptParts(static_prefix, problem_suffix)
+
+
+def prompt_parts_with_hardware_info(ref_arch_src: str, gpu_name: str) -> PromptParts:
+    """
+    Same sections as prompt_generate_prompt_with_hardware_info_from_template,
+    ordered static-first: the GPU-specific section only changes across GPUs,
+    so it goes after the examples, right before the problem
+    """
+    templates = get_prompt_templates()
+    example_arch, example_new_arch = templates.template_example("add")
+    sections = _hardware_prompt_sections(
+        ref_arch_src,
+        gpu_name,
+        example_arch,
+        example_new_arch,
+        templates.gpu_spec_info_src(),
+    )
+    static_prefix = (
+        sections["objective"]
+        + sections["concepts"]
+        + sections["practices"]
+        + sections["examples"]
+        + sections["hardware"]
+        + "\n"
+    )
+    return PromptParts(static_prefix, sections["task"])
+
+
 def prompt_fix_compile(ref_arch_src, custom_cuda, metadata):
     prompt = PROBLEM_STATEMENT
     prompt += f"""
@@ -601,7 +482,7 @@ def prompt_fix_correctness(ref_arch_src, custom_cuda, metadata):
     return prompt
 
 
-@weave.op
+@trace_op
 def main():
     gpu_name = "L40S"
 
@@ -619,5 +500,8 @@ def main():
 
 
 if __name__ == "__main__":
+    import weave
+
     weave.init("prompt_constructor")
+    configure_tracing(sample_rate=1.0, backend="weave")
     main()
@@ -0,0 +1,176 @@
+########################
+# Prompt Template Registry
+########################
+
+import os
+import threading
+import time
+from functools import lru_cache
+
+"""
+Load the prompt assets (few-shot examples, CoT examples, GPU specs) once per process
+
+Prompt builders used to read up to ten example files and exec gpu_specs.py on every call.
+The registry keeps every asset in memory, so building prompts for thousands of
+(problem, GPU) pairs is string formatting only. Files are re-read when their mtime
+changes (checked at most every check_interval_s), so editing a template during a long
+session still takes effect.
+"""
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+# name -> (example architecture, optimized example, description), under prompts/few_shot
+FEW_SHOT_EXAMPLES = {
+    "ex_add": (
+        "few_shot/model_ex_add.py",
+        "few_shot/model_new_ex_add.py",
+        "This given architecture is for a pointwise addition: ",
+    ),
+    "ex_fuse_gelu": (
+        "few_shot/model_ex_fuse_gelu.py",
+        "few_shot/model_new_ex_fuse_gelu.py",
+        "This given architecture is for a fused gelu: ",
+    ),
+    "ex_mnist2": (  # DEPRECATED as a few-shot example, still used for CoT
+        "few_shot/model_ex_mnist2.py",
+        "few_shot/model_new_ex_mnist2.py",
+        "This given architecture is for a model with fused convolutions and relus: ",
+    ),
+    "ex_tiled_matmul": (
+        "few_shot/model_ex_tiled_matmul.py",
+        "few_shot/model_new_ex_tiled_matmul.py",
+        "This given architecture is for a model with tiled matrix multiplication: ",
+    ),
+    "ex_flash_attn": (
+        "few_shot/model_ex_flash_attn.py",
+        "few_shot/model_new_ex_flash_attn.py",
+        "This given architecture is for a model with simple io-aware implementation of attention, also known as flash attention: ",
+    ),
+}
+
+# name -> chain of thought walking through the matching few-shot example
+COT_EXAMPLES = {
+    "ex_fuse_gelu": "cot/model_cot_fuse_gelu.py",
+    "ex_mnist2": "cot/model_cot_mnist2.py",
+    "ex_tiled_matmul": "cot/model_cot_tiled_matmul.py",
+}
+
+# one-example prompt templates: prompts/model_ex_{name}.py and prompts/model_new_ex_{name}.py
+TEMPLATE_EXAMPLES = ["add", "0", "1", "2"]
+
+GPU_SPECS_PATH = "hardware/gpu_specs.py"
+GPU_SPECS_VARIABLES = ["GPU_SPEC_INFO", "GPU_DEFINITIONS", "GPU_BEST_PRACTICES"]
+
+
+@lru_cache(maxsize=8)
+def parse_gpu_specs(gpu_spec_info_src: str) -> dict:
+    """
+    Execute the source of a GPU spec file once and return its spec variables
+    """
+    local_dict = {}
+    exec(gpu_spec_info_src, {}, local_dict)
+    gpu_specs = {name: local_dict.get(name) for name in GPU_SPECS_VARIABLES}
+    if not all(gpu_specs.values()):
+        raise ValueError(
+            "GPU_SPEC_INFO or GPU_DEFINITIONS or GPU_BEST_PRACTICES not found in gpu_spec_info_src"
+        )
+    return gpu_specs
+
+
+class PromptTemplateRegistry:
+    """
+    In-memory prompt assets under prompts_dir, re-read when a file's mtime changes
+    """
+
+    def __init__(self, prompts_dir: str = PROMPTS_DIR, check_interval_s: float = 1.0):
+        self.prompts_dir = prompts_dir
+        self.check_interval_s = check_interval_s
+        # relative path -> [mtime, last mtime check, text]
+        self._assets: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, rel_path: str) -> list:
+        path = os.path.join(self.prompts_dir, rel_path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Prompt asset not found: {path}")
+        mtime = os.path.getmtime(path)
+        with open(path, "r") as f:
+            text = f.read()
+        return [mtime, time.monotonic(), text]
+
+    def text(self, rel_path: str) -> str:
+        """
+        Content of prompts_dir/rel_path
+        """
+        asset = self._assets.get(rel_path)
+        now = time.monotonic()
+        if asset is not None and now - asset[1] < self.check_interval_s:
+            return asset[2]
+
+        with self._lock:
+            asset = self._assets.get(rel_path)
+            if asset is None:
+                asset = self._assets[rel_path] = self._load(rel_path)
+            else:
+                path = os.path.join(self.prompts_dir, rel_path)
+                if os.path.getmtime(path) != asset[0]:
+                    asset = self._assets[rel_path] = self._load(rel_path)
+                else:
+                    asset[1] = now
+        return asset[2]
+
+    def few_shot(self, name: str) -> tuple[str, str, str]:
+        """
+        (example architecture, optimized example, description) of a few-shot example
+        """
+        if name not in FEW_SHOT_EXAMPLES:
+            raise ValueError(f"Invalid shot: {name}")
+        base_path, new_path, desc = FEW_SHOT_EXAMPLES[name]
+        return self.text(base_path), self.text(new_path), desc
+
+    def cot(self, name: str) -> tuple[str, str, str, str]:
+        """
+        (example architecture, chain of thought, optimized example, description)
+        """
+        if name not in COT_EXAMPLES:
+            raise ValueError(f"Invalid CoT example: {name} not found in CoT examples")
+        base, kernel, desc = self.few_shot(name)
+        return base, self.text(COT_EXAMPLES[name]), kernel, desc
+
+    def template_example(self, name: str | int) -> tuple[str, str]:
+        """
+        (example architecture, optimized example) of a one-example prompt template
+        """
+        return (
+            self.text(f"model_ex_{name}.py"),
+            self.text(f"model_new_ex_{name}.py"),
+        )
+
+    def gpu_spec_info_src(self) -> str:
+        return self.text(GPU_SPECS_PATH)
+
+    def gpu_specs(self) -> dict:
+        """
+        GPU_SPEC_INFO, GPU_DEFINITIONS and GPU_BEST_PRACTICES, parsed once per file version
+        """
+        return parse_gpu_specs(self.gpu_spec_info_src())
+
+    def preload(self):
+        """
+        Load and validate every asset up front, so missing files fail at startup
+        """
+        for name in FEW_SHOT_EXAMPLES:
+            self.few_shot(name)
+        for name in COT_EXAMPLES:
+            self.cot(name)
+        for name in TEMPLATE_EXAMPLES:
+            self.template_example(name)
+        self.gpu_specs()
+
+
+# process-wide registry used by prompt_constructor
+_REGISTRY = PromptTemplateRegistry()
+
+
+def get_prompt_templates() -> PromptTemplateRegistry:
+    return _REGISTRY
@@ -0,0 +1,185 @@
+########################
+# Roofline Speed-of-Light
+########################
+
+import re
+from functools import lru_cache
+
+import torch
+from torch._subclasses.fake_tensor import FakeTensorMode
+from torch.utils.flop_counter import FlopCounterMode
+
+from kernelbench.eval import load_original_model_and_inputs, set_seed
+from kernelbench.prompt_templates import get_prompt_templates
+
+"""
+Roofline lower bound on the runtime of a KernelBench problem on a given GPU
+
+- FLOPs are counted with FlopCounterMode over one forward pass, run on CPU with fake
+  tensors so even the largest problems allocate nothing (real CPU tensors as fallback)
+- bytes are the compulsory traffic: inputs, parameters / buffers and outputs, each
+  moved once, i.e. a perfectly fused kernel
+- peaks come from GPU_SPEC_INFO in prompts/hardware/gpu_specs.py, dense numbers
+  (specs quoted "with sparsity" only are halved)
+
+speed of light = max(flops / peak flops, bytes / memory bandwidth); a kernel's
+% of speed-of-light is speed of light / its runtime, problems whose baseline is
+already close to 100% leave little room for a custom kernel
+"""
+
+# spec keys to try per dtype, first one present in GPU_SPEC_INFO[gpu] wins
+PEAK_FLOPS_KEYS = {
+    torch.float64: ["FP64 Tensor Core TFLOPS", "FP64 TFLOPS"],
+    torch.float32: ["FP32 TFLOPS", "Single-Precision TFLOPS"],
+    "tf32": ["TF32 Tensor Core TFLOPS", "FP32 TFLOPS", "Single-Precision TFLOPS"],
+    torch.float16: ["FP16 Tensor Core TFLOPS", "Mixed-Precision (FP16/FP32) TFLOPS"],
+    torch.bfloat16: [
+        "BFLOAT16 Tensore Core TFLOPS",
+        "FP16 Tensor Core TFLOPS",
+        "Mixed-Precision (FP16/FP32) TFLOPS",
+    ],
+}
+
+_BANDWIDTH_UNITS = {"TB/s": 1e12, "GB/s": 1e9}
+
+
+def parse_spec_number(value: str) -> float:
+    """
+    Dense number of a GPU spec value, e.g. "183.2 (366 with sparsity)" -> 183.2
+    and "989 with sparsity" -> 494.5
+    """
+    number = float(re.match(r"\s*([\d.]+)", value).group(1))
+    if re.match(r"\s*[\d.]+\s*with sparsity", value):
+        number /= 2
+    return number
+
+
+def get_gpu_spec(gpu_name: str, gpu_spec_info: dict | None = None) -> dict:
+    """
+    GPU_SPEC_INFO entry of a GPU, matching spec names (e.g. "A100") or device names
+    (e.g. "NVIDIA A100-SXM4-80GB", the longest matching spec name wins)
+    """
+    gpu_spec_info = gpu_spec_info or get_prompt_templates().gpu_specs()["GPU_SPEC_INFO"]
+    if gpu_name in gpu_spec_info:
+        return gpu_spec_info[gpu_name]
+    for spec_name in sorted(gpu_spec_info, key=len, reverse=True):
+        if spec_name in gpu_name:
+            return gpu_spec_info[spec_name]
+    raise KeyError(f"No GPU spec for {gpu_name}, known: {list(gpu_spec_info)}")
+
+
+def get_gpu_peaks(
+    gpu_name: str, dtype: torch.dtype | str = torch.float32, gpu_spec_info=None
+) -> tuple[float, float]:
+    """
+    (peak FLOP/s, memory bandwidth in bytes/s) of a GPU for a dtype, or "tf32"
+    """
+    spec = get_gpu_spec(gpu_name, gpu_spec_info)
+    number, unit = re.match(r"\s*([\d.]+)\s*(\S+)", spec["Memory Bandwidth"]).groups()
+    bandwidth = float(number) * _BANDWIDTH_UNITS[unit]
+    for key in PEAK_FLOPS_KEYS.get(dtype, PEAK_FLOPS_KEYS[torch.float32]):
+        if key in spec:
+            return parse_spec_number(spec[key]) * 1e12, bandwidth
+    raise KeyError(f"No {dtype} peak FLOPS for {gpu_name}")
+
+
+def _tensor_bytes(values) -> int:
+    if isinstance(values, torch.Tensor):
+        return values.numel() * values.element_size()
+    if isinstance(values, (list, tuple)):
+        return sum(_tensor_bytes(v) for v in values)
+    if isinstance(values, dict):
+        return sum(_tensor_bytes(v) for v in values.values())
+    return 0
+
+
+def _count(Model, get_init_inputs, get_inputs) -> dict:
+    set_seed(42)
+    init_inputs = get_init_inputs()
+    set_seed(42)
+    inputs = get_inputs()
+    model = Model(*init_inputs)
+    flop_counter = FlopCounterMode(display=False)
+    with torch.no_grad(), flop_counter:
+        output = model(*inputs)
+
+    tensors = [x for x in inputs if isinstance(x, torch.Tensor)]
+    tensors += list(model.parameters()) + list(model.buffers())
+    dtypes = [x.dtype for x in tensors if x.is_floating_point()]
+    conv_flops = sum(
+        count
+        for op, count in flop_counter.get_flop_counts().get("Global", {}).items()
+        if "convolution" in str(op)
+    )
+    return {
+        "flops": flop_counter.get_total_flops(),
+        "conv_flops": conv_flops,
+        "bytes": _tensor_bytes(tensors) + _tensor_bytes(output),
+        # most common floating point dtype, picks the peak FLOPS to compare against
+        "dtype": max(set(dtypes), key=dtypes.count) if dtypes else torch.float32,
+    }
+
+
+@lru_cache(maxsize=1024)
+def count_flops_and_bytes(ref_arch_src: str) -> dict:
+    """
+    FLOPs of one forward pass and the compulsory bytes moved by a KernelBench problem
+    Returns {"flops", "conv_flops", "bytes", "dtype"}
+    """
+    context = {}
+    Model, get_init_inputs, get_inputs = load_original_model_and_inputs(
+        ref_arch_src, context
+    )
+    try:
+        with FakeTensorMode(allow_non_fake_inputs=True):
+            return _count(Model, get_init_inputs, get_inputs)
+    except Exception:
+        # data-dependent ops cannot run on fake tensors
+        return _count(Model, get_init_inputs, get_inputs)
+
+
+def estimate_speed_of_light(
+    ref_arch_src: str,
+    gpu_name: str,
+    allow_tf32: bool | None = None,
+    gpu_spec_info: dict | None = None,
+) -> dict:
+    """
+    Roofline lower bound on the runtime of a problem on a GPU
+    allow_tf32: compare float32 problems against the TF32 tensor core peak, by default
+    per torch's own settings (cuDNN convolutions use TF32 unless disabled, matmuls don't)
+    Returns {"flops", "bytes", "arithmetic_intensity", "sol_time_ms", "bound"}
+    """
+    counts = count_flops_and_bytes(ref_arch_src)
+
+    def peak_flops(tf32: bool) -> float:
+        dtype = counts["dtype"]
+        if tf32 and dtype == torch.float32:
+            dtype = "tf32"
+        return get_gpu_peaks(gpu_name, dtype, gpu_spec_info)[0]
+
+    conv_tf32 = torch.backends.cudnn.allow_tf32 if allow_tf32 is None else allow_tf32
+    matmul_tf32 = (
+        torch.backends.cuda.matmul.allow_tf32 if allow_tf32 is None else allow_tf32
+    )
+    _, bandwidth = get_gpu_peaks(gpu_name, counts["dtype"], gpu_spec_info)
+    compute_s = counts["conv_flops"] / peak_flops(conv_tf32) + (
+        counts["flops"] - counts["conv_flops"]
+    ) / peak_flops(matmul_tf32)
+    memory_s = counts["bytes"] / bandwidth
+    return {
+        "flops": counts["flops"],
+        "bytes": counts["bytes"],
+        "arithmetic_intensity": counts["flops"] / max(counts["bytes"], 1),
+        "sol_time_ms": max(compute_s, memory_s) * 1000,
+        "bound": "compute" if compute_s >= memory_s else "memory",
+    }
+
+
+def percent_of_speed_of_light(sol_time_ms: float, runtime_ms: float) -> float | None:
+    """
+    How close a measured runtime is to the speed of light, 100 means at the roofline
+    """
+    if sol_time_ms is None or not runtime_ms or runtime_ms <= 0:
+        return None
+    return 100 * sol_time_ms / runtime_ms
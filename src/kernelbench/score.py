@@ -1,5 +1,52 @@
 import numpy as np
 
+"""
+Scoring for KernelBench
+
+All metrics are computed on speedup = baseline_speed / actual_speed over the correct samples.
+Geometric means are taken in log space so they neither overflow nor underflow
+for hundreds of problems with extreme speedups.
+
+Inputs broadcast along the last (problem) axis, so a (num_runs x num_problems)
+correctness / runtime matrix can be scored against one baseline row in a single pass.
+"""
+
+
+def speedup_matrix(
+    is_correct: np.ndarray, baseline_speed: np.ndarray, actual_speed: np.ndarray
+) -> np.ndarray:
+    """
+    Speedup of every sample, NaN where the sample is incorrect
+    """
+    is_correct = np.asarray(is_correct, dtype=bool)
+    baseline_speed = np.asarray(baseline_speed, dtype=np.float64)
+    actual_speed = np.asarray(actual_speed, dtype=np.float64)
+
+    # incorrect samples usually carry a runtime of -1.0, never divide by those
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed_up = baseline_speed / actual_speed
+    return np.where(is_correct, speed_up, np.nan)
+
+
+def log_geometric_mean(
+    speed_up: np.ndarray, faster_only: bool = False, axis: int = -1
+) -> np.ndarray:
+    """
+    Geometric mean of the non-NaN speedups along axis, computed as exp(mean(log(x)))
+    Returns 0 where there is nothing to average (matching the scalar metrics)
+
+    faster_only: only average over speedups > 1
+    """
+    speed_up = np.asarray(speed_up, dtype=np.float64)
+    mask = ~np.isnan(speed_up)
+    if faster_only:
+        mask &= np.nan_to_num(speed_up, nan=0.0) > 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_speed_up = np.where(mask, np.log(np.where(mask, speed_up, 1.0)), 0.0)
+    count = mask.sum(axis=axis)
+    log_mean = log_speed_up.sum(axis=axis) / np.maximum(count, 1)
+    return np.where(count > 0, np.exp(log_mean), 0.0)
+
 
 def geometric_mean_speed_ratio_correct_only(
     is_correct: np.ndarray, baseline_speed: np.ndarray, actual_speed: np.ndarray, n: int
@@ -7,17 +54,8 @@ def geometric_mean_speed_ratio_correct_only(
     """
     Geometric mean of the speed ratio for correct samples
     """
-    filtered_baseline_speed = np.array(
-        [x for i, x in enumerate(baseline_speed) if is_correct[i]]
-    )
-    filtered_actual_speed = np.array(
-        [x for i, x in enumerate(actual_speed) if is_correct[i]]
-    )
-    speed_up = filtered_baseline_speed / filtered_actual_speed
-    prod = np.prod(speed_up)
-    n_correct = np.sum(is_correct)  # Count number of correct samples
-
-    return prod ** (1 / n_correct) if n_correct > 0 else 0
+    speed_up = speedup_matrix(is_correct, baseline_speed, actual_speed)
+    return float(log_geometric_mean(speed_up))
 
 
 def geometric_mean_speed_ratio_correct_and_faster_only(
@@ -26,18 +64,33 @@ def geometric_mean_speed_ratio_correct_and_faster_only(
     """
     Geometric mean of the speed ratio for correct samples that have speedup > 1
     """
-    filtered_baseline_speed = np.array(
-        [x for i, x in enumerate(baseline_speed) if is_correct[i]]
-    )
-    filtered_actual_speed = np.array(
-        [x for i, x in enumerate(actual_speed) if is_correct[i]]
-    )
-    speed_up = filtered_baseline_speed / filtered_actual_speed
-    speed_up = np.array([x for x in speed_up if x > 1])
-    prod = np.prod(speed_up)
-    n_correct_and_faster = len(speed_up)
+    speed_up = speedup_matrix(is_correct, baseline_speed, actual_speed)
+    return float(log_geometric_mean(speed_up, faster_only=True))
 
-    return prod ** (1 / n_correct_and_faster) if n_correct_and_faster > 0 else 0
+
+def fastp_grid(
+    is_correct: np.ndarray,
+    baseline_speed: np.ndarray,
+    actual_speed: np.ndarray,
+    p_values: list[float] | np.ndarray,
+    n: int | None = None,
+) -> np.ndarray:
+    """
+    fast_p for a whole grid of thresholds in one broadcasted pass
+
+    n: number of problems to normalize by, defaults to the size of the problem (last) axis
+    Returns array of shape (..., len(p_values)), leading dims follow the inputs (e.g. runs)
+    """
+    speed_up = speedup_matrix(is_correct, baseline_speed, actual_speed)
+    p_values = np.asarray(p_values, dtype=np.float64)
+    n = speed_up.shape[-1] if n is None else n
+    if n <= 0:
+        return np.zeros(speed_up.shape[:-1] + p_values.shape)
+
+    # (..., problems, 1) > (P,) -> (..., problems, P); NaN compares as False
+    with np.errstate(invalid="ignore"):
+        fast = speed_up[..., np.newaxis] > p_values
+    return fast.sum(axis=-2) / n
 
 
 def fastp(
@@ -50,12 +103,56 @@ def fastp(
     """
     Rate of samples within a threshold p
     """
-    filtered_baseline_speed = np.array(
-        [x for i, x in enumerate(baseline_speed) if is_correct[i]]
-    )
-    filtered_actual_speed = np.array(
-        [x for i, x in enumerate(actual_speed) if is_correct[i]]
-    )
-    speed_up = filtered_baseline_speed / filtered_actual_speed
-    fast_p_score = np.sum(speed_up > p)
-    return fast_p_score / n if n > 0 else 0
+    return float(fastp_grid(is_correct, baseline_speed, actual_speed, [p], n=n)[..., 0])
+
+
+def bootstrap_scores(
+    is_correct: np.ndarray,
+    baseline_speed: np.ndarray,
+    actual_speed: np.ndarray,
+    p_values: list[float] | np.ndarray,
+    num_resamples: int = 1000,
+    confidence: float = 0.95,
+    seed: int = 42,
+) -> dict:
+    """
+    Point estimates and bootstrap confidence intervals for the geometric mean speedup
+    (correct only) and fast_p over p_values, resampling problems with replacement
+
+    All resamples are scored at once as a (num_resamples x problems) matrix
+
+    Returns:
+        dict with "geo_mean_speedup" and "fast_p", each holding "estimate", "low", "high"
+        (fast_p entries are arrays aligned with p_values)
+    """
+    speed_up = speedup_matrix(is_correct, baseline_speed, actual_speed)
+    assert speed_up.ndim == 1, "bootstrap expects a single run (1-D inputs)"
+    num_problems = speed_up.shape[0]
+    p_values = np.asarray(p_values, dtype=np.float64)
+
+    rng = np.random.default_rng(seed)
+    resample_idx = rng.integers(0, num_problems, size=(num_resamples, num_problems))
+    resampled = speed_up[resample_idx]  # (num_resamples, problems)
+
+    # score resamples directly on speedups (actual_speed = 1), NaN already marks incorrect
+    boot_geo_mean = log_geometric_mean(resampled)
+    boot_fast_p = fastp_grid(~np.isnan(resampled), resampled, 1.0, p_values)
+
+    alpha = (1.0 - confidence) / 2
+    quantiles = [alpha * 100, (1.0 - alpha) * 100]
+    geo_low, geo_high = np.percentile(boot_geo_mean, quantiles)
+    fast_p_low, fast_p_high = np.percentile(boot_fast_p, quantiles, axis=0)
+
+    return {
+        "geo_mean_speedup": {
+            "estimate": float(log_geometric_mean(speed_up)),
+            "low": float(geo_low),
+            "high": float(geo_high),
+        },
+        "fast_p": {
+            "p_values": p_values,
+            "estimate": fastp_grid(~np.isnan(speed_up), speed_up, 1.0, p_values),
+            "low": fast_p_low,
+            "high": fast_p_high,
+        },
+    }
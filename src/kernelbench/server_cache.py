@@ -0,0 +1,218 @@
+########################
+# Benchmark Server Caches
+########################
+
+import hashlib
+import json
+import platform
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+import torch
+
+from kernelbench.dataset import get_code_hash
+
+"""
+In-memory caches for the benchmark servers
+
+Clients submit the same KernelBench reference thousands of times, so the reference
+timings (eager and torch.compile, the compile alone can take a minute) are measured
+once per (normalized reference, hardware, torch version, compile mode, trial config)
+and then served from memory; only the candidate kernel is timed per request
+
+LLM loops also resubmit byte-identical kernels (e.g. converged greedy retries), so
+complete results are memoized per (normalized reference, kernel, trials, hardware)
+"""
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire ttl_s seconds after insertion
+
+    get_or_compute is single-flight: concurrent misses on the same key compute once,
+    the other callers wait and get the cached value
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float | None = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, count: bool = False) -> Any | None:
+        """
+        count: record a hit when found, for lookups made outside get_or_compute
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            inserted_at, value = entry
+            if self.ttl_s is not None and time.monotonic() - inserted_at > self.ttl_s:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        should_cache: Callable[[Any], bool] = lambda value: value is not None,
+    ) -> tuple[Any, bool]:
+        """
+        Returns (value, whether it came from the cache)
+        should_cache: e.g. skip failed measurements so they are retried next time
+        """
+        value = self.get(key)
+        if value is not None:
+            self._count(hit=True)
+            return value, True
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                # another caller may have computed it while we waited
+                value = self.get(key)
+                if value is not None:
+                    self._count(hit=True)
+                    return value, True
+                self._count(hit=False)
+                value = compute()
+                if should_cache(value):
+                    self.put(key, value)
+        finally:
+            # also when compute raises, failing keys would leak a lock each
+            with self._lock:
+                self._key_locks.pop(key, None)
+        return value, False
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_hardware_name(device: torch.device | str) -> str:
+    device = torch.device(device)
+    if device.type == "cuda":
+        return torch.cuda.get_device_name(device)
+    return platform.processor() or platform.machine() or device.type
+
+
+def baseline_cache_key(
+    ref_arch_src: str,
+    hardware: str,
+    use_torch_compile: bool,
+    torch_compile_backend: str | None,
+    torch_compile_options: str | None,
+    num_trials: int,
+) -> str:
+    """
+    Key of a reference timing: the reference hash ignores comments and whitespace
+    """
+    compile_mode = (
+        f"{torch_compile_backend}:{torch_compile_options}"
+        if use_torch_compile
+        else "eager"
+    )
+    return "|".join(
+        [
+            get_code_hash(ref_arch_src),
+            hardware,
+            torch.__version__,
+            compile_mode,
+            f"trials={num_trials}",
+        ]
+    )
+
+
+class BaselineCache(TTLCache):
+    """
+    Reference timing stats (as returned by measure_program_time) per baseline_cache_key,
+    and the reference's speed-of-light estimate
+    """
+
+    def get_or_measure(
+        self,
+        measure: Callable[[], dict | None],
+        ref_arch_src: str,
+        hardware: str,
+        num_trials: int,
+        use_torch_compile: bool = False,
+        torch_compile_backend: str | None = None,
+        torch_compile_options: str | None = None,
+    ) -> tuple[dict | None, bool]:
+        key = baseline_cache_key(
+            ref_arch_src,
+            hardware,
+            use_torch_compile,
+            torch_compile_backend,
+            torch_compile_options,
+            num_trials,
+        )
+        # only successful measurements are cached
+        return self.get_or_compute(
+            key, measure, should_cache=lambda stats: bool(stats and stats.get("mean"))
+        )
+
+    def get_or_estimate(
+        self, estimate: Callable[[], dict], ref_arch_src: str, hardware: str
+    ) -> tuple[dict, bool]:
+        """
+        Roofline (speed-of-light) estimate of a reference, {} when it has none;
+        it depends on neither the trials nor the compile mode
+        """
+        key = "|".join(
+            [get_code_hash(ref_arch_src), hardware, torch.__version__, "speed_of_light"]
+        )
+        return self.get_or_compute(key, estimate)
+
+
+def result_cache_key(
+    ref_arch_src: str,
+    kernel_src: str,
+    hardware: str,
+    num_correct_trials: int,
+    num_perf_trials: int,
+    gpu_arch: list[str] | None = None,
+) -> str:
+    """
+    Stable digest of a benchmark submission: the reference is normalized like for
+    baseline timings, the kernel is taken byte for byte
+    """
+    fields = [
+        get_code_hash(ref_arch_src),
+        hashlib.sha256(kernel_src.encode("utf-8")).hexdigest(),
+        hardware,
+        torch.__version__,
+        num_correct_trials,
+        num_perf_trials,
+        gpu_arch or [],
+    ]
+    return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
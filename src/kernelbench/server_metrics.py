@@ -0,0 +1,325 @@
+########################
+# Benchmark Server Metrics
+########################
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+import torch
+
+"""
+Prometheus metrics for the benchmark servers, served as text on GET /metrics
+
+Written against the Prometheus text exposition format directly so the servers do not
+need prometheus_client. Tracks:
+- latency histograms per eval phase: queue wait, kernel compile, correctness and perf
+  (from the eval's phase_times_ms), reference eager / torch.compile timing, reference
+  torch.compile latency, whole job
+- outcomes per error class: success, compile_failure, runtime_error,
+  correctness_failure, timeout, server_error
+- queue depth, running jobs, cache hits / misses and GPU utilization / memory,
+  sampled when /metrics is scraped
+"""
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds, from a cached pointwise kernel up to a level 3 torch.compile
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+OUTCOMES = [
+    "success",
+    "compile_failure",
+    "runtime_error",
+    "correctness_failure",
+    "timeout",
+    "server_error",
+]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        assert set(labels) == set(
+            self.labelnames
+        ), f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _sample_lines(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape(self.help_text)}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        with self._lock:
+            lines += self._sample_lines()
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """
+        Mirror a total counted elsewhere (e.g. cache hits), sampled at scrape time
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _sample_lines(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        self.set_total(value, **labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+            return counts[-1]
+
+    def _sample_lines(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            labels = dict(zip(self.labelnames, key))
+            for upper, count in zip(self.buckets, counts):
+                bucket_labels = _format_labels({**labels, "le": _format_value(upper)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {repr(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        assert metric.name not in self._metrics, f"Duplicate metric {metric.name}"
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+def classify_outcome(
+    compiled: bool, correctness: bool, metadata: dict | None, error: str | None = None
+) -> str:
+    """
+    Error class of a benchmark result, one of OUTCOMES
+    """
+    metadata = metadata or {}
+    if error:
+        return "timeout" if "timeout" in error.lower() else "server_error"
+    if "cuda_error" in metadata or "runtime_error" in metadata:
+        return "runtime_error"
+    if not compiled:
+        return "compile_failure"
+    if not correctness:
+        return "correctness_failure"
+    return "success"
+
+
+class BenchmarkServerMetrics:
+    """
+    The metrics of one benchmark server process
+    """
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.counter(
+            "kernelbench_requests_total", "Requests received", ("endpoint",)
+        )
+        self.phase_seconds = self.registry.histogram(
+            "kernelbench_phase_duration_seconds",
+            "Wall-clock time per benchmark phase",
+            ("phase",),
+        )
+        self.outcomes = self.registry.counter(
+            "kernelbench_eval_outcomes_total",
+            "Evaluated kernels per outcome (error class)",
+            ("outcome",),
+        )
+        self.queue_depth = self.registry.gauge(
+            "kernelbench_queue_depth", "Jobs waiting for a worker"
+        )
+        self.running_jobs = self.registry.gauge(
+            "kernelbench_running_jobs", "Jobs being evaluated"
+        )
+        self.cache_hits = self.registry.counter(
+            "kernelbench_cache_hits_total", "Cache hits", ("cache",)
+        )
+        self.cache_misses = self.registry.counter(
+            "kernelbench_cache_misses_total", "Cache misses", ("cache",)
+        )
+        self.cache_entries = self.registry.gauge(
+            "kernelbench_cache_entries", "Entries held per cache", ("cache",)
+        )
+        self.gpu_utilization = self.registry.gauge(
+            "kernelbench_gpu_utilization_percent",
+            "GPU utilization over the last sample period",
+            ("device",),
+        )
+        self.gpu_memory_allocated = self.registry.gauge(
+            "kernelbench_gpu_memory_allocated_bytes",
+            "GPU memory allocated by this process",
+            ("device",),
+        )
+
+    def observe_phase(self, phase: str, seconds: float):
+        self.phase_seconds.observe(seconds, phase=phase)
+
+    @contextmanager
+    def time_phase(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(phase, time.perf_counter() - start)
+
+    def observe_eval(
+        self,
+        compiled: bool,
+        correctness: bool,
+        metadata: dict | None,
+        error: str | None = None,
+    ):
+        """
+        Record the outcome of an evaluated kernel and its eval phase times
+        """
+        self.outcomes.inc(
+            outcome=classify_outcome(compiled, correctness, metadata, error)
+        )
+        for phase, ms in (metadata or {}).get("phase_times_ms", {}).items():
+            self.observe_phase(phase, ms / 1000)
+
+    def observe_job(self, job):
+        """
+        Queue wait and run time of a finished job_queue.Job
+        """
+        if job.started_at is not None:
+            self.observe_phase("queue_wait", job.started_at - job.submitted_at)
+            if job.finished_at is not None:
+                self.observe_phase("job", job.finished_at - job.started_at)
+        if job.status == "failed":
+            self.outcomes.inc(
+                outcome=classify_outcome(False, False, None, job.error or "failed")
+            )
+
+    def render(
+        self,
+        queue_depth: int | None = None,
+        running_jobs: int | None = None,
+        caches: dict | None = None,
+        devices: list[str] | None = None,
+    ) -> str:
+        """
+        Sample the point-in-time values and render every metric
+        caches: name -> server_cache.TTLCache
+        """
+        if queue_depth is not None:
+            self.queue_depth.set(queue_depth)
+        if running_jobs is not None:
+            self.running_jobs.set(running_jobs)
+        for name, cache in (caches or {}).items():
+            self.cache_hits.set_total(cache.hits, cache=name)
+            self.cache_misses.set_total(cache.misses, cache=name)
+            self.cache_entries.set(len(cache), cache=name)
+        for device in devices or []:
+            self._sample_gpu(device)
+        return self.registry.render()
+
+    def _sample_gpu(self, device: str):
+        device = torch.device(device)
+        if device.type != "cuda" or not torch.cuda.is_available():
+            return
+        self.gpu_memory_allocated.set(
+            torch.cuda.memory_allocated(device), device=str(device)
+        )
+        try:
+            # needs pynvml
+            self.gpu_utilization.set(torch.cuda.utilization(device), device=str(device))
+        except Exception:
+            pass
@@ -0,0 +1,217 @@
+################################################################################
+# Token Accounting for Generated Kernels
+################################################################################
+
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+
+from tokenizers import Tokenizer
+
+from kernelbench.analysis import extract_all_cuda_sources
+
+"""
+Count tokens of every kernel in a run, fully offline
+
+- the tokenizer is loaded from a local path (a tokenizer.json file or a saved
+  Hugging Face tokenizer directory), never from the Hub
+- all code blocks are batch-encoded with the Rust fast tokenizer,
+  split into chunks across processes for large runs
+- counts are cached on disk by code hash, so re-running over a run only encodes new kernels
+"""
+
+# Environment variable pointing at a local tokenizer, for air-gapped eval hosts
+TOKENIZER_PATH_ENV = "KERNELBENCH_TOKENIZER_PATH"
+
+
+@cache
+def load_local_tokenizer(tokenizer_path: str) -> Tokenizer:
+    """
+    Load a fast tokenizer from a local path without touching the network
+    tokenizer_path: either a tokenizer.json file or a directory saved with save_pretrained
+    """
+    if not os.path.exists(tokenizer_path):
+        raise FileNotFoundError(f"Tokenizer not found at {tokenizer_path}")
+
+    if os.path.isdir(tokenizer_path):
+        tokenizer_file = os.path.join(tokenizer_path, "tokenizer.json")
+        if not os.path.exists(tokenizer_file):
+            # fall back to transformers for directories without a tokenizer.json
+            from transformers import AutoTokenizer
+
+            hf_tokenizer = AutoTokenizer.from_pretrained(
+                tokenizer_path,
+                local_files_only=True,
+                use_fast=True,
+                trust_remote_code=True,
+            )
+            if not hf_tokenizer.is_fast:
+                raise ValueError(
+                    f"Tokenizer at {tokenizer_path} has no fast (Rust) implementation"
+                )
+            return hf_tokenizer.backend_tokenizer
+    else:
+        tokenizer_file = tokenizer_path
+
+    return Tokenizer.from_file(tokenizer_file)
+
+
+def get_text_hash(text: str) -> str:
+    """
+    Hash of the exact text; unlike dataset.get_code_hash, whitespace and comments
+    change the token count so they are kept
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def count_tokens_batch(texts: list[str], tokenizer_path: str) -> list[int]:
+    """
+    Batch-encode texts with the local fast tokenizer, return token count per text
+    """
+    if not texts:
+        return []
+    tokenizer = load_local_tokenizer(tokenizer_path)
+    encodings = tokenizer.encode_batch(texts, add_special_tokens=False)
+    return [len(encoding.ids) for encoding in encodings]
+
+
+def _count_tokens_worker(texts: list[str], tokenizer_path: str) -> list[int]:
+    # each process already runs in parallel, keep the Rust thread pool to one thread
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    return count_tokens_batch(texts, tokenizer_path)
+
+
+class TokenCountCache:
+    """
+    On-disk cache of token counts keyed by text hash, valid for one tokenizer
+    """
+
+    def __init__(self, cache_path: str | None, tokenizer_path: str):
+        self.cache_path = cache_path
+        self.tokenizer_id = os.path.abspath(tokenizer_path)
+        self.counts: dict[str, int] = {}
+
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r") as f:
+                cached = json.load(f)
+            # counts from another tokenizer are meaningless, start fresh
+            if cached.get("tokenizer") == self.tokenizer_id:
+                self.counts = cached.get("counts", {})
+
+    def get(self, text_hash: str) -> int | None:
+        return self.counts.get(text_hash)
+
+    def update(self, counts: dict[str, int]):
+        self.counts.update(counts)
+
+    def save(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"tokenizer": self.tokenizer_id, "counts": self.counts}, f)
+        os.replace(tmp_path, self.cache_path)
+
+
+def count_tokens(
+    texts: list[str],
+    tokenizer_path: str,
+    num_workers: int = 1,
+    chunk_size: int = 256,
+    cache_path: str | None = None,
+) -> list[int]:
+    """
+    Token count for each text, using the cache and parallelizing misses across processes
+    """
+    token_cache = TokenCountCache(cache_path, tokenizer_path)
+    hashes = [get_text_hash(text) for text in texts]
+
+    # only encode unique texts that are not cached yet
+    missing = {}
+    for text_hash, text in zip(hashes, texts):
+        if token_cache.get(text_hash) is None and text_hash not in missing:
+            missing[text_hash] = text
+
+    if missing:
+        missing_hashes = list(missing.keys())
+        missing_texts = list(missing.values())
+        chunks = [
+            missing_texts[i : i + chunk_size]
+            for i in range(0, len(missing_texts), chunk_size)
+        ]
+
+        if num_workers in [1, None] or len(chunks) == 1:
+            chunk_counts = [
+                count_tokens_batch(chunk, tokenizer_path) for chunk in chunks
+            ]
+        else:
+            # spawn so workers do not inherit an already-used tokenizer thread pool
+            with ProcessPoolExecutor(
+                max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                chunk_counts = list(
+                    executor.map(
+                        _count_tokens_worker, chunks, [tokenizer_path] * len(chunks)
+                    )
+                )
+
+        new_counts = [count for counts in chunk_counts for count in counts]
+        token_cache.update(dict(zip(missing_hashes, new_counts)))
+        token_cache.save()
+
+    return [token_cache.get(text_hash) for text_hash in hashes]
+
+
+def count_run_tokens(
+    run_dir: str,
+    tokenizer_path: str | None = None,
+    cuda_only: bool = True,
+    num_workers: int = 1,
+    chunk_size: int = 256,
+    cache_path: str | None = None,
+) -> dict[str, int]:
+    """
+    Token count of every generated kernel in runs/{run_name}
+
+    cuda_only: count only the CUDA sources embedded in triple quotes (as get_cuda_tokens),
+               otherwise count the whole kernel file
+    cache_path: defaults to {run_dir}/token_counts_cache.json
+    Returns:
+        dict mapping kernel file name to token count
+    """
+    tokenizer_path = tokenizer_path or os.environ.get(TOKENIZER_PATH_ENV)
+    assert (
+        tokenizer_path
+    ), f"Specify tokenizer_path or set {TOKENIZER_PATH_ENV} to a local tokenizer"
+    if cache_path is None:
+        cache_path = os.path.join(run_dir, "token_counts_cache.json")
+
+    kernel_paths = sorted(glob.glob(os.path.join(run_dir, "*_kernel.py")))
+
+    # flatten every code block of every kernel into one batch
+    texts = []
+    owners = []
+    for kernel_path in kernel_paths:
+        with open(kernel_path, "r") as f:
+            kernel_src = f.read()
+        blocks = extract_all_cuda_sources(kernel_src) if cuda_only else [kernel_src]
+        texts.extend(blocks)
+        owners.extend([os.path.basename(kernel_path)] * len(blocks))
+
+    counts = count_tokens(
+        texts,
+        tokenizer_path,
+        num_workers=num_workers,
+        chunk_size=chunk_size,
+        cache_path=cache_path,
+    )
+
+    token_counts = {os.path.basename(path): 0 for path in kernel_paths}
+    for owner, count in zip(owners, counts):
+        token_counts[owner] += count
+    return token_counts
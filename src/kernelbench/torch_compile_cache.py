@@ -0,0 +1,119 @@
+########################
+# Persistent torch.compile Caches
+########################
+
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import torch
+
+from kernelbench.dataset import get_code_hash
+
+"""
+Managed inductor / FX graph / Triton cache directories for torch.compile baselines
+
+torch.compile baselines used to recompile every problem from scratch and hide the
+compile cost in the warm up. Instead:
+- the first call of a compiled model, where compilation happens, is timed on its own
+  and reported as compile_time_ms next to the steady-state stats
+- the inductor, FX graph and Triton caches of each (problem hash, backend, mode) live in
+  their own directory under KERNELBENCH_TORCH_COMPILE_CACHE_DIR
+  (default ~/.cache/kernelbench/torch_compile), so re-running baselines or server
+  comparisons reuses the compiled artifacts
+"""
+
+TORCH_COMPILE_CACHE_DIR_ENV = "KERNELBENCH_TORCH_COMPILE_CACHE_DIR"
+DEFAULT_TORCH_COMPILE_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "kernelbench", "torch_compile"
+)
+
+# the cache locations are process-wide environment variables, so concurrent
+# compilations (e.g. one server worker thread per GPU) take turns
+_CACHE_DIR_LOCK = threading.Lock()
+
+
+def get_torch_compile_cache_root() -> str:
+    return os.environ.get(TORCH_COMPILE_CACHE_DIR_ENV, DEFAULT_TORCH_COMPILE_CACHE_DIR)
+
+
+def torch_compile_cache_dir(
+    ref_arch_src: str,
+    backend: str | None,
+    mode: str | None,
+    root: str | None = None,
+) -> str:
+    """
+    Cache directory of one problem and compile config, compiled artifacts are only
+    valid for one torch version so it is part of the path
+    """
+    return os.path.join(
+        root or get_torch_compile_cache_root(),
+        f"torch-{torch.__version__}",
+        f"{backend or 'inductor'}_{mode or 'default'}",
+        get_code_hash(ref_arch_src),
+    )
+
+
+@contextmanager
+def persistent_compile_cache(
+    ref_arch_src: str,
+    backend: str | None,
+    mode: str | None,
+    root: str | None = None,
+):
+    """
+    Point the inductor, FX graph and Triton caches to the problem's managed directory
+    while compiling, yields that directory
+    """
+    cache_dir = torch_compile_cache_dir(ref_arch_src, backend, mode, root)
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_env = {
+        "TORCHINDUCTOR_CACHE_DIR": cache_dir,
+        "TRITON_CACHE_DIR": os.path.join(cache_dir, "triton"),
+    }
+    with _CACHE_DIR_LOCK:
+        previous_env = {name: os.environ.get(name) for name in cache_env}
+        os.environ.update(cache_env)
+        try:
+            with torch._inductor.config.patch(
+                fx_graph_cache=True, autotune_local_cache=True
+            ):
+                yield cache_dir
+        finally:
+            for name, value in previous_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def time_compilation(
+    compiled_model: torch.nn.Module,
+    inputs: list,
+    ref_arch_src: str,
+    backend: str | None,
+    mode: str | None,
+    device: torch.device,
+    root: str | None = None,
+) -> float:
+    """
+    Run the first call of a torch.compile'd model, which triggers compilation, with the
+    persistent cache and return its wall-clock time in ms
+    """
+    device = torch.device(device)
+    with persistent_compile_cache(ref_arch_src, backend, mode, root):
+        start = time.perf_counter()
+        compiled_model(*inputs)
+        if device.type == "cuda":
+            torch.cuda.synchronize(device=device)
+        return (time.perf_counter() - start) * 1000
+
+
+def clear_torch_compile_cache(root: str | None = None):
+    """
+    Remove every managed torch.compile cache directory
+    """
+    shutil.rmtree(root or get_torch_compile_cache_root(), ignore_errors=True)
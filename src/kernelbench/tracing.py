@@ -0,0 +1,136 @@
+########################
+# Sampling-controlled Tracing
+########################
+
+import contextvars
+import functools
+import inspect
+import os
+import random
+from dataclasses import dataclass
+from typing import Callable
+
+"""
+Pluggable tracing for prompt builders and generation ops
+
+Decorate with @trace_op instead of @weave.op:
+- tracing is off by default, a call then costs one attribute check on top of the function
+  and the tracing backend (e.g. weave) is never imported
+- configure_tracing(sample_rate=...) traces that fraction of top-level calls;
+  calls nested in a traced call are traced too, so sampled traces stay complete
+- backends are registered by name with register_tracer, "weave" ships by default
+
+The sample rate and backend can also be set with
+KERNELBENCH_TRACE_SAMPLE_RATE and KERNELBENCH_TRACE_BACKEND
+"""
+
+TRACE_SAMPLE_RATE_ENV = "KERNELBENCH_TRACE_SAMPLE_RATE"
+TRACE_BACKEND_ENV = "KERNELBENCH_TRACE_BACKEND"
+
+
+@dataclass
+class TracingConfig:
+    sample_rate: float = 0.0  # fraction of top-level calls traced, 0.0 is off
+    backend: str = "weave"
+
+
+_CONFIG = TracingConfig(
+    sample_rate=float(os.environ.get(TRACE_SAMPLE_RATE_ENV, 0.0)),
+    backend=os.environ.get(TRACE_BACKEND_ENV, "weave"),
+)
+
+# whether the enclosing traced-op call was sampled, None outside of any traced op
+_IN_SAMPLED_CALL: contextvars.ContextVar[bool | None] = contextvars.ContextVar(
+    "kernelbench_in_sampled_call", default=None
+)
+
+
+def _weave_tracer(fn: Callable, name: str | None = None) -> Callable:
+    import weave
+
+    return weave.op(fn, name=name) if name else weave.op(fn)
+
+
+# backend name -> factory(fn, name) returning the traced version of fn
+_TRACER_FACTORIES: dict[str, Callable] = {"weave": _weave_tracer}
+
+
+def register_tracer(name: str, factory: Callable):
+    """
+    Register a tracing backend: factory(fn, name) -> callable recording calls of fn
+    """
+    _TRACER_FACTORIES[name] = factory
+
+
+def configure_tracing(sample_rate: float | None = None, backend: str | None = None):
+    """
+    Set the fraction of top-level calls to trace (0.0 off, 1.0 everything)
+    and the backend recording them; unspecified settings are left unchanged
+    """
+    if sample_rate is not None:
+        assert 0.0 <= sample_rate <= 1.0, f"Invalid sample rate: {sample_rate}"
+        _CONFIG.sample_rate = sample_rate
+    if backend is not None:
+        assert backend in _TRACER_FACTORIES, f"Unknown tracing backend: {backend}"
+        _CONFIG.backend = backend
+
+
+def get_tracing_config() -> TracingConfig:
+    return _CONFIG
+
+
+def _should_trace() -> bool:
+    sampled = _IN_SAMPLED_CALL.get()
+    if sampled is None:
+        # top-level call: sample it, nested calls follow the decision
+        sampled = random.random() < _CONFIG.sample_rate
+    return sampled
+
+
+def trace_op(fn: Callable | None = None, *, name: str | None = None) -> Callable:
+    """
+    Decorator tracing a sampled fraction of calls, usable as @trace_op or @trace_op(name=...)
+    """
+    if fn is None:
+        return functools.partial(trace_op, name=name)
+
+    # traced versions of fn, created on first sampled call per backend
+    traced_fns = {}
+
+    def _traced_fn() -> Callable:
+        backend = _CONFIG.backend
+        if backend not in traced_fns:
+            traced_fns[backend] = _TRACER_FACTORIES[backend](fn, name)
+        return traced_fns[backend]
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            if _CONFIG.sample_rate <= 0.0:  # fast path, tracing off
+                return await fn(*args, **kwargs)
+            sampled = _should_trace()
+            token = _IN_SAMPLED_CALL.set(sampled)
+            try:
+                if sampled:
+                    return await _traced_fn()(*args, **kwargs)
+                return await fn(*args, **kwargs)
+            finally:
+                _IN_SAMPLED_CALL.reset(token)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _CONFIG.sample_rate <= 0.0:  # fast path, tracing off
+            return fn(*args, **kwargs)
+        sampled = _should_trace()
+        token = _IN_SAMPLED_CALL.set(sampled)
+        try:
+            if sampled:
+                return _traced_fn()(*args, **kwargs)
+            return fn(*args, **kwargs)
+        finally:
+            _IN_SAMPLED_CALL.reset(token)
+
+    return wrapper
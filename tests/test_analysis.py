@@ -1,6 +1,11 @@
 import pytest
 import numpy as np
-from kernelbench.analysis import pass_at_k, extract_all_cuda_sources
+from kernelbench.analysis import (
+    pass_at_k,
+    pass_at_k_matrix,
+    fast_p_at_k_matrix,
+    extract_all_cuda_sources,
+)
 
 """
 Usage:
@@ -20,6 +25,35 @@ def test_pass_at_k():
     assert pass_at_k(10, 5, 5) > pass_at_k(10, 5, 1)
 
 
+def test_pass_at_k_matrix():
+    """Batched pass@k should match the scalar estimator for every problem and k"""
+    rng = np.random.default_rng(0)
+    num_problems, num_samples = 20, 10
+    is_correct = rng.random((num_problems, num_samples)) > 0.6
+    ks = [1, 2, 5, 10]
+
+    batched = pass_at_k_matrix(is_correct, ks)
+    assert batched.shape == (num_problems, len(ks))
+
+    for problem in range(num_problems):
+        c = int(is_correct[problem].sum())
+        for j, k in enumerate(ks):
+            assert np.isclose(batched[problem, j], pass_at_k(num_samples, c, k))
+
+    # k larger than the number of samples is undefined
+    assert np.isnan(pass_at_k_matrix(is_correct, [num_samples + 1])).all()
+
+
+def test_fast_p_at_k_matrix():
+    """fast_p@k only counts samples that are both correct and faster than p"""
+    is_correct = np.array([[1, 1, 0, 0], [1, 0, 0, 0]], dtype=bool)
+    speedup = np.array([[2.0, 0.5, 3.0, 3.0], [0.9, 5.0, 5.0, 5.0]])
+
+    fast_1 = fast_p_at_k_matrix(is_correct, speedup, 1.0, [1, 4])
+    assert np.allclose(fast_1[0], [pass_at_k(4, 1, 1), 1.0])
+    assert np.allclose(fast_1[1], [0.0, 0.0])
+
+
 def test_extract_all_cuda_sources():
     """Test extraction of CUDA code from triple-quoted strings"""
     # Test with a single CUDA kernel
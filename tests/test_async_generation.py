@@ -0,0 +1,268 @@
+import pytest
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import anthropic
+from kernelbench import llm_utils
+from kernelbench.async_generation import (
+    AsyncGenerationEngine,
+    AIMDLimiter,
+    RateLimitConfig,
+    TokenBucket,
+)
+
+"""
+Usage:
+pytest test_async_generation.py
+"""
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """
+    Minimal OpenAI-compatible /v1/chat/completions and /v1/completions, rate limits
+    the first requests
+    """
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.num_requests += 1
+            server.requests.append((self.path, body))
+            rate_limited = server.num_requests <= server.num_rate_limited
+
+        if rate_limited:
+            payload = {"error": {"message": "Rate limit exceeded", "type": "requests"}}
+            self.send_response(429)
+            self.send_header("retry-after", "0.05")
+        else:
+            if self.path.endswith("/chat/completions"):
+                prompt = body["messages"][-1]["content"]
+                choice = {
+                    "message": {"role": "assistant", "content": f"echo: {prompt}"}
+                }
+                kind = "chat.completion"
+            else:
+                choice = {"text": f"echo: {body['prompt']}"}
+                kind = "text_completion"
+            payload = {
+                "id": "cmpl-mock",
+                "object": kind,
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    dict(choice, index=index, finish_reason="stop")
+                    for index in range(body.get("n", 1))
+                ],
+                "usage": {
+                    "prompt_tokens": 1,
+                    "completion_tokens": 2,
+                    "total_tokens": 3,
+                },
+            }
+            self.send_response(200)
+
+        data = json.dumps(payload).encode()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mock_openai_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOpenAIHandler)
+    server.lock = threading.Lock()
+    server.num_requests = 0
+    server.requests = []
+    server.num_rate_limited = 3
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_engine_against_mock_server(mock_openai_server):
+    """All prompts complete in order, 429s are retried and shrink concurrency"""
+    port = mock_openai_server.server_address[1]
+    engine = AsyncGenerationEngine(
+        "sglang",
+        model_name="llama-3.1-8b",
+        base_url=f"http://127.0.0.1:{port}/v1",
+        api_key="test",
+        rate_limits=RateLimitConfig(
+            requests_per_minute=6000,
+            tokens_per_minute=10_000_000,
+            initial_concurrency=8,
+        ),
+        max_tokens=16,
+    )
+    prompts = [f"prompt {i}" for i in range(20)]
+    responses = engine.generate_batch(prompts)
+
+    assert responses == [f"echo: {p}" for p in prompts]
+    # same request as query_server: completions endpoint, the "default" model
+    assert all(
+        path == "/v1/completions" and body["model"] == "default"
+        for path, body in mock_openai_server.requests
+    )
+    # every prompt succeeded once, plus the rate limited attempts
+    assert mock_openai_server.num_requests == len(prompts) + 3
+    # the limiter backed off at least once
+    assert engine._limiter.last_decrease > float("-inf")
+
+
+def test_token_bucket_throttles():
+    """A bucket of 1 refilled at 10/s lets 3 requests through in ~0.2s"""
+
+    async def _run():
+        bucket = TokenBucket(rate_per_minute=600, capacity=1)
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire(1)
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(_run())
+    assert 0.15 < elapsed < 1.0
+
+
+def test_aimd_limiter():
+    """Additive increase on success, multiplicative decrease on rate limits"""
+    limiter = AIMDLimiter(initial=8, min_limit=1, max_limit=16, cooldown_s=0.0)
+    limiter.on_rate_limited()
+    assert limiter.limit == 4
+    for _ in range(4):
+        limiter.on_success()
+    assert 4.9 < limiter.limit < 5.1
+    for _ in range(10):
+        limiter.on_rate_limited()
+    assert limiter.limit == 1
+
+
+def test_engine_rejects_prompts_too_long_for_deepseek(mock_openai_server, monkeypatch):
+    """Same guard as the sync path, nothing is sent to DeepSeek"""
+    checked = []
+
+    def _is_safe(prompt):
+        checked.append(prompt)
+        return False
+
+    monkeypatch.setattr(llm_utils, "is_safe_to_send_to_deepseek", _is_safe)
+    port = mock_openai_server.server_address[1]
+    engine = AsyncGenerationEngine(
+        "deepseek",
+        model_name="deepseek-chat",
+        base_url=f"http://127.0.0.1:{port}/v1",
+        api_key="test",
+    )
+    responses = engine.generate_batch(["problem"], prompt_prefixes=["static "])
+
+    assert responses == [None]
+    assert checked == ["static problem"]
+    assert mock_openai_server.num_requests == 0
+
+
+def test_engine_prompt_prefix(mock_openai_server, monkeypatch):
+    """Anthropic gets the prefix as a cache_control block, others the joined prompt"""
+    mock_openai_server.num_rate_limited = 0
+    port = mock_openai_server.server_address[1]
+    engine = AsyncGenerationEngine(
+        "openai", base_url=f"http://127.0.0.1:{port}/v1", api_key="test"
+    )
+    assert engine.generate_batch(["problem"], prompt_prefixes=["static "]) == [
+        "echo: static problem"
+    ]
+
+    requests = []
+
+    class FakeAsyncAnthropic:
+        def __init__(self, **kwargs):
+            self.messages = SimpleNamespace(create=self._create)
+
+        async def _create(self, **kwargs):
+            requests.append(kwargs)
+            usage = SimpleNamespace(input_tokens=1, output_tokens=1)
+            return SimpleNamespace(content=[SimpleNamespace(text="ok")], usage=usage)
+
+        async def close(self):
+            pass
+
+    monkeypatch.setattr(anthropic, "AsyncAnthropic", FakeAsyncAnthropic)
+    engine = AsyncGenerationEngine("anthropic", model_name="claude", api_key="test")
+    assert engine.generate_batch(["problem"], prompt_prefixes=["static"]) == ["ok"]
+    assert requests[0]["messages"][0]["content"] == [
+        {"type": "text", "text": "static", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": "problem"},
+    ]
+
+
+def test_reasoning_models_use_query_server(monkeypatch):
+    """Reasoning requests are sent by query_server, keyed like sync queries"""
+    calls = []
+
+    def _query_server(prompt, **kwargs):
+        calls.append(kwargs)
+        return "ok"
+
+    monkeypatch.setattr(llm_utils, "query_server", _query_server)
+    engine = AsyncGenerationEngine(
+        "openai",
+        model_name="o3-mini",
+        is_reasoning_model=True,
+        reasoning_effort="high",
+    )
+    assert not engine.native
+    assert engine.generate_batch(["problem"]) == ["ok"]
+    assert calls[0]["is_reasoning_model"] and calls[0]["reasoning_effort"] == "high"
+
+    monkeypatch.undo()  # query_cache_key binds the real query_server signature
+    assert engine.cache_key("problem") == llm_utils.query_cache_key(
+        prompt="problem",
+        server_type="openai",
+        model_name="o3-mini",
+        max_tokens=4096,
+        is_reasoning_model=True,
+        reasoning_effort="high",
+    )
+
+
+def test_cache_key_tells_sglang_servers_apart():
+    keys = {
+        AsyncGenerationEngine(
+            "sglang", server_address=address, server_port=port
+        ).cache_key("problem")
+        for address, port in [("a", 1), ("a", 2), ("b", 1)]
+    }
+    assert len(keys) == 3
+
+
+def test_engine_multi_completion(mock_openai_server, tmp_path):
+    """Samples of the same prompt are one request with n=..., cached per sample"""
+    mock_openai_server.num_rate_limited = 0
+    port = mock_openai_server.server_address[1]
+    engine = AsyncGenerationEngine(
+        "openai",
+        base_url=f"http://127.0.0.1:{port}/v1",
+        api_key="test",
+        response_cache=llm_utils.ResponseCache(str(tmp_path / "responses.db")),
+    )
+    prompts, sample_ids = ["a", "a", "a", "b"], [0, 1, 2, 0]
+    responses = engine.generate_batch(prompts, sample_ids)
+
+    assert responses == ["echo: a"] * 3 + ["echo: b"]
+    assert sorted(body.get("n", 1) for _, body in mock_openai_server.requests) == [
+        1,
+        3,
+    ]
+    # every sample was cached under its own sample_id
+    assert engine.generate_batch(prompts, sample_ids) == responses
+    assert engine.generate_batch(["a"], [3]) == ["echo: a"]
+    assert mock_openai_server.num_requests == 3
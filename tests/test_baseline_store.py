@@ -0,0 +1,91 @@
+import json
+import os
+import pytest
+from kernelbench.baseline_store import (
+    BaselineStore,
+    load_baseline_file,
+    parse_baseline_path,
+)
+from kernelbench.dataset import get_code_hash
+from kernelbench.eval import fetch_baseline_time
+
+"""
+Usage:
+pytest test_baseline_store.py
+"""
+
+
+def _write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data))
+
+
+@pytest.fixture
+def store(tmp_path):
+    timing_dir = tmp_path / "timing"
+    _write_json(
+        timing_dir / "H100" / "baseline_time_torch.json",
+        {"level1": {"1_Add.py": {"mean": 1.0}, "2_Mul.py": None}},
+    )
+    _write_json(
+        timing_dir / "H100" / "baseline_time_torch_compile_inductor_max-autotune.json",
+        {"level1": {"1_Add.py": {"mean": 0.5}}},
+    )
+    _write_json(
+        timing_dir / "old" / "baseline_time_torch_compile_matx3.json",
+        {"level1": {"1_Add.py": {"mean": 2.0}}},
+    )
+    level_dir = tmp_path / "KernelBench" / "level1"
+    level_dir.mkdir(parents=True)
+    (level_dir / "1_Add.py").write_text("out = a + b  # add\n")
+    (level_dir / "2_Mul.py").write_text("out = a * b\n")
+    return BaselineStore(str(timing_dir), str(tmp_path / "KernelBench"))
+
+
+def test_parse_baseline_path():
+    assert parse_baseline_path("L40S/baseline_time_torch.json") == ("L40S", "eager")
+    assert parse_baseline_path("B200/baseline_time_torch_compile_cudagraphs.json") == (
+        "B200",
+        "cudagraphs",
+    )
+    assert parse_baseline_path("old/baseline_time_matx2.json") == (
+        "old/matx2",
+        "eager",
+    )
+    assert parse_baseline_path("README.md") is None
+
+
+def test_lookup_by_name_and_hash(store):
+    assert store.hardware() == ["H100", "old/matx3"]
+    assert store.modes("H100") == ["eager", "inductor_max-autotune"]
+    # nothing is parsed until a (hardware, mode) is queried
+    assert not store._baselines
+
+    assert store.get("H100", "eager", 1, "1_Add.py") == {"mean": 1.0}
+    assert store.get("H100", "eager", "level1", "2_Mul.py") is None
+    assert store.get("H100", "inductor_max-autotune", 1, "1_Add.py") == {"mean": 0.5}
+    assert store.get("old/matx3", "inductor_default", 1, "1_Add.py") == {"mean": 2.0}
+    assert list(store._baselines) == [
+        ("H100", "eager"),
+        ("H100", "inductor_max-autotune"),
+        ("old/matx3", "inductor_default"),
+    ]
+
+    # the hash ignores comments, like everywhere else problems are hashed
+    assert store.get("H100", "eager", 1, get_code_hash("out = a + b\n")) == {
+        "mean": 1.0
+    }
+    assert store.get("H100", "eager", 1, "unknown-hash") is None
+    with pytest.raises(KeyError):
+        store.get("A100", "eager", 1, "1_Add.py")
+
+
+def test_baseline_file_is_reparsed_only_when_changed(tmp_path):
+    path = tmp_path / "baseline_time_torch.json"
+    _write_json(path, {"level1": {"1_Add.py": {"mean": 1.0}}})
+    assert load_baseline_file(str(path)) is load_baseline_file(str(path))
+    assert fetch_baseline_time("level1", 0, ["a/1_Add.py"], str(path)) == {"mean": 1.0}
+
+    _write_json(path, {"level1": {"1_Add.py": {"mean": 3.0}}})
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert fetch_baseline_time("level1", 0, ["a/1_Add.py"], str(path)) == {"mean": 3.0}
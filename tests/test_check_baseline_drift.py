@@ -0,0 +1,85 @@
+import json
+import pytest
+from scripts import check_baseline_drift
+from scripts.check_baseline_drift import (
+    check_baseline_drift as run_drift_check,
+    detect_drift,
+    parse_baseline_file_name,
+    stratified_sample,
+)
+
+"""
+Usage:
+pytest test_check_baseline_drift.py
+"""
+
+
+def _stats(mean, std=0.01, num_trials=100):
+    return {"mean": mean, "std": std, "num_trials": num_trials, "hardware": "cpu"}
+
+
+def test_parse_baseline_file_name():
+    assert parse_baseline_file_name("baseline_time_torch.json") == (False, None, None)
+    assert parse_baseline_file_name(
+        "H100/baseline_time_torch_compile_inductor_max-autotune-no-cudagraphs.json"
+    ) == (True, "inductor", "max-autotune-no-cudagraphs")
+    assert parse_baseline_file_name("baseline_time_torch_compile_cudagraphs.json") == (
+        True,
+        "cudagraphs",
+        None,
+    )
+
+
+def test_stratified_sample_covers_runtime_range():
+    baseline = {
+        "level1": {f"{i}_P.py": _stats(float(i)) for i in range(1, 10)},
+        "level2": {"1_Q.py": _stats(1.0), "2_Q.py": None},
+    }
+    sample = stratified_sample(baseline, num_per_stratum=1, num_runtime_strata=3)
+    level1 = sorted(
+        int(name.split("_")[0]) for level, name in sample if level == "level1"
+    )
+    # one problem from each runtime tercile
+    assert [(i - 1) // 3 for i in level1] == [0, 1, 2]
+    assert ("level2", "1_Q.py") in sample and ("level2", "2_Q.py") not in sample
+    assert sample == stratified_sample(
+        baseline, num_per_stratum=1, num_runtime_strata=3
+    )
+
+
+def test_detect_drift():
+    assert not detect_drift(_stats(1.0), _stats(1.001))["drifted"]
+    # significant but below the minimum relative change
+    assert not detect_drift(_stats(1.0, 0.001), _stats(1.02, 0.001))["drifted"]
+    drift = detect_drift(_stats(1.0), _stats(1.3))
+    assert drift["drifted"] and drift["relative_change"] == pytest.approx(0.3)
+
+
+def test_refresh_only_drifted_entries(tmp_path, monkeypatch):
+    level_dir = tmp_path / "KernelBench" / "level1"
+    level_dir.mkdir(parents=True)
+    for problem_id in [1, 2]:
+        (level_dir / f"{problem_id}_P.py").write_text(f"# problem {problem_id}")
+    baseline = {"level1": {"1_P.py": _stats(1.0), "2_P.py": _stats(2.0)}}
+    baseline_path = tmp_path / "baseline_time_torch.json"
+    baseline_path.write_text(json.dumps(baseline))
+
+    # problem 2 got 50% slower on the current machine
+    current = {"1_P.py": _stats(1.001), "2_P.py": _stats(3.0)}
+    monkeypatch.setattr(
+        check_baseline_drift,
+        "measure_program_time",
+        lambda ref_arch_name, ref_arch_src, **kwargs: current[ref_arch_name],
+    )
+    report = run_drift_check(
+        str(baseline_path),
+        device="cpu",
+        kernel_bench_path=str(tmp_path / "KernelBench"),
+        num_per_stratum=1,
+        num_runtime_strata=2,
+        refresh=True,
+    )
+    assert report["drifted"] == ["level1/2_P.py"]
+    refreshed = json.loads(baseline_path.read_text())
+    assert refreshed["level1"]["1_P.py"] == baseline["level1"]["1_P.py"]
+    assert refreshed["level1"]["2_P.py"]["mean"] == 3.0
@@ -0,0 +1,30 @@
+import pytest
+from kernelbench.device_pool import JSONLCheckpoint, map_on_devices
+
+"""
+Usage:
+pytest test_device_pool.py
+"""
+
+
+def _square(task: int, device: str, offset: int = 0) -> int:
+    return task * task + offset
+
+
+@pytest.mark.parametrize("devices", [["cpu"], ["cpu", "cpu"]])
+def test_map_on_devices(devices):
+    results = list(map_on_devices(_square, [1, 2, 3], devices, offset=1))
+    assert sorted(results) == [(1, "cpu", 2), (2, "cpu", 5), (3, "cpu", 10)]
+    assert list(map_on_devices(_square, [], devices)) == []
+
+
+def test_checkpoint_ignores_truncated_line(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    checkpoint = JSONLCheckpoint(path)
+    entry = {"problem_hash": "h", "config": "eager|trials=3", "stats": {"mean": 1.0}}
+    checkpoint.record(entry)
+    with open(path, "a") as f:
+        f.write('{"problem_hash": "h2", "con')
+    reloaded = JSONLCheckpoint(path)
+    assert reloaded.is_done("h", "eager|trials=3")
+    assert not reloaded.is_done("h2", "eager|trials=3")
@@ -0,0 +1,45 @@
+import pytest
+from scripts.eval_phase_report import aggregate_phase_times, format_phase_report
+
+"""
+Usage:
+pytest test_eval_phase_report.py
+"""
+
+
+def _entry(sample_id=0, **phase_times_ms):
+    return {"sample_id": sample_id, "metadata": {"phase_times_ms": phase_times_ms}}
+
+
+def test_aggregate_phase_times():
+    eval_results = {
+        "1": _entry(load_ref=10, compile=600, init_custom=5, correctness=50, cleanup=5),
+        # a compile failure stops after cleanup
+        "2": _entry(load_ref=20, compile=300, cleanup=10),
+        "3": [_entry(0, load_ref=10, compile=30, perf=100), _entry(1)],
+        "4": {"sample_id": 0, "metadata": {}},
+    }
+    report = aggregate_phase_times(eval_results, top_k=2)
+
+    assert report["num_evals"] == 3
+    assert report["total_ms"] == 1140
+    phases = report["phases"]
+    assert list(phases) == [
+        "load_ref",
+        "compile",
+        "init_custom",
+        "correctness",
+        "perf",
+        "cleanup",
+    ]
+    assert phases["compile"]["count"] == 3
+    assert phases["compile"]["total_ms"] == 930
+    assert phases["compile"]["share"] == pytest.approx(930 / 1140)
+    assert phases["cleanup"]["max_ms"] == 10
+    assert sum(stats["share"] for stats in phases.values()) == pytest.approx(1)
+
+    assert [slow["problem"] for slow in report["slowest"]] == ["1", "2"]
+    assert report["slowest"][0]["phase"] == "compile"
+
+    text = format_phase_report(report)
+    assert "compile" in text and "81.6%" in text
@@ -0,0 +1,102 @@
+import json
+import os
+import pytest
+from kernelbench.device_pool import JSONLCheckpoint
+from scripts import generate_baseline_time
+from scripts.generate_baseline_time import record_baseline_times
+
+"""
+Usage:
+pytest test_generate_baseline_time.py
+"""
+
+PROBLEM_SRC = """
+import torch
+import torch.nn as nn
+
+class Model(nn.Module):
+    def __init__(self):
+        super().__init__()
+
+    def forward(self, x):
+        return x * {scale}
+
+def get_inputs():
+    return [torch.randn(16, 16)]
+
+def get_init_inputs():
+    return []
+"""
+
+
+@pytest.fixture
+def kernel_bench_dir(tmp_path):
+    level_dir = tmp_path / "KernelBench" / "level1"
+    level_dir.mkdir(parents=True)
+    for problem_id in [1, 2, 3]:
+        path = level_dir / f"{problem_id}_Scale{problem_id}.py"
+        path.write_text(PROBLEM_SRC.format(scale=problem_id))
+    return str(tmp_path / "KernelBench")
+
+
+def test_record_is_checkpointed_and_resumable(kernel_bench_dir, tmp_path, monkeypatch):
+    timing_dir = str(tmp_path / "timing")
+    kwargs = dict(
+        file_name="cpu/baseline_time_torch.json",
+        devices=["cpu"],
+        levels=[1],
+        num_trials=3,
+        kernel_bench_path=kernel_bench_dir,
+        timing_dir=timing_dir,
+    )
+    measure_program_time = generate_baseline_time.measure_program_time
+    measured = []
+
+    def crash_on_third(ref_arch_name, ref_arch_src, **measure_kwargs):
+        if ref_arch_name.startswith("3_"):
+            raise KeyboardInterrupt("crash")
+        measured.append(ref_arch_name)
+        return measure_program_time(ref_arch_name, ref_arch_src, **measure_kwargs)
+
+    monkeypatch.setattr(generate_baseline_time, "measure_program_time", crash_on_third)
+    with pytest.raises(KeyboardInterrupt):
+        record_baseline_times(**kwargs)
+
+    checkpoint_path = (
+        os.path.join(timing_dir, kwargs["file_name"]) + ".checkpoint.jsonl"
+    )
+    assert len(JSONLCheckpoint(checkpoint_path).entries) == 2
+
+    # the restart only measures the problem that was not checkpointed
+    monkeypatch.setattr(
+        generate_baseline_time,
+        "measure_program_time",
+        lambda ref_arch_name, ref_arch_src, **measure_kwargs: measured.append(
+            ref_arch_name
+        )
+        or measure_program_time(ref_arch_name, ref_arch_src, **measure_kwargs),
+    )
+    results = record_baseline_times(**kwargs)
+    assert measured == ["1_Scale1.py", "2_Scale2.py", "3_Scale3.py"]
+    assert list(results["level1"]) == ["1_Scale1.py", "2_Scale2.py", "3_Scale3.py"]
+    assert all(stats["num_trials"] == 3 for stats in results["level1"].values())
+
+    with open(os.path.join(timing_dir, kwargs["file_name"])) as f:
+        assert json.load(f) == results
+
+    # another config is measured separately
+    record_baseline_times(**dict(kwargs, num_trials=2))
+    assert len(measured) == 6
+
+
+def test_record_on_parallel_cpu_workers(kernel_bench_dir, tmp_path):
+    results = record_baseline_times(
+        file_name="baseline_time_torch.json",
+        devices=["cpu", "cpu"],
+        levels=[1],
+        num_trials=2,
+        kernel_bench_path=kernel_bench_dir,
+        timing_dir=str(tmp_path / "timing"),
+    )
+    assert len(results["level1"]) == 3
+    assert all(stats["device"] == "cpu" for stats in results["level1"].values())
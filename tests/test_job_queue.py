@@ -0,0 +1,48 @@
+import threading
+import time
+
+import pytest
+from kernelbench.job_queue import JobQueue, QueueFullError
+
+"""
+Usage:
+pytest test_job_queue.py
+"""
+
+
+def test_shutdown_without_wait_cancels_pending_jobs():
+    """A full backlog does not block shutdown(wait=False), waiting jobs are cancelled"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def run_job(payload, device):
+        started.set()
+        release.wait()
+        return payload
+
+    job_queue = JobQueue(run_job, devices=["cpu"], max_queue_size=2)
+    job_queue.start()
+    running = job_queue.submit("running")
+    assert started.wait(timeout=5)
+    pending = [job_queue.submit(f"pending {i}") for i in range(2)]
+    with pytest.raises(QueueFullError):
+        job_queue.submit("one too many")
+
+    start = time.monotonic()
+    job_queue.shutdown(wait=False)
+    assert time.monotonic() - start < 1.0
+    assert all(job.status == "cancelled" for job in pending)
+    with pytest.raises(QueueFullError):
+        job_queue.submit("after shutdown")
+
+    # the running job is left to finish
+    release.set()
+    assert running.future.result(timeout=5) == "running"
+
+
+def test_shutdown_with_wait_finishes_pending_jobs():
+    job_queue = JobQueue(lambda payload, device: payload * 2, devices=["cpu", "cpu"])
+    job_queue.start()
+    jobs = [job_queue.submit(i) for i in range(8)]
+    job_queue.shutdown(wait=True)
+    assert [job.result for job in jobs] == [i * 2 for i in range(8)]
@@ -0,0 +1,299 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from kernelbench import llm_utils
+from kernelbench.llm_utils import (
+    get_client,
+    clear_client_registry,
+    query_server,
+    ResponseCache,
+    ResponseCacheMiss,
+    find_complete_code_block,
+    query_server_samples,
+    PROMPT_CACHE_STATS,
+)
+
+"""
+Usage:
+pytest test_llm_utils.py
+"""
+
+
+def test_client_registry_reuses_clients():
+    """Clients are pooled per (server_type, base_url, key)"""
+    clear_client_registry()
+    base_url = "http://localhost:30000/v1"
+
+    client = get_client("sglang", base_url=base_url, api_key="key-a", max_retries=0)
+    assert get_client("sglang", base_url=base_url, api_key="key-a") is client
+
+    # a different key or endpoint gets its own client
+    assert get_client("sglang", base_url=base_url, api_key="key-b") is not client
+    assert (
+        get_client("sglang", base_url="http://localhost:30001/v1", api_key="key-a")
+        is not client
+    )
+
+    # concurrent callers all share one instance
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(
+            executor.map(
+                lambda _: get_client("openai", api_key="key-c"),
+                range(32),
+            )
+        )
+    assert all(c is clients[0] for c in clients)
+
+    clear_client_registry()
+    assert get_client("sglang", base_url=base_url, api_key="key-a") is not client
+    clear_client_registry()
+
+
+class FakeOpenAIClient:
+    """Records calls, answers each with a distinct completion"""
+
+    def __init__(self):
+        self.num_calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.num_calls += 1
+        choices = [
+            SimpleNamespace(
+                message=SimpleNamespace(content=f"completion {self.num_calls}.{i}")
+            )
+            for i in range(kwargs.get("n", 1))
+        ]
+        if kwargs.get("n", 1) == 1:
+            choices[0].message.content = f"completion {self.num_calls}"
+        return SimpleNamespace(choices=choices)
+
+
+def test_response_cache_query_server(tmp_path, monkeypatch):
+    """Identical queries hit the cache, sample_id and sampling params are part of the key"""
+    fake_client = FakeOpenAIClient()
+    monkeypatch.setattr(llm_utils, "get_client", lambda *args, **kwargs: fake_client)
+    cache_path = str(tmp_path / "responses.db")
+    cache = ResponseCache(cache_path)
+
+    query = dict(server_type="openai", model_name="gpt-4o", response_cache=cache)
+    assert query_server("prompt", sample_id=0, **query) == "completion 1"
+    assert query_server("prompt", sample_id=0, **query) == "completion 1"
+    assert fake_client.num_calls == 1
+
+    # a different sample or temperature is a different query
+    assert query_server("prompt", sample_id=1, **query) == "completion 2"
+    assert query_server("prompt", temperature=0.7, **query) == "completion 3"
+    assert len(cache) == 3
+    cache.close()
+
+    # replay mode serves from disk only, misses raise instead of querying
+    replay = ResponseCache(cache_path, mode="replay")
+    query["response_cache"] = replay
+    assert query_server("prompt", sample_id=1, **query) == "completion 2"
+    with pytest.raises(ResponseCacheMiss):
+        query_server("unseen prompt", **query)
+    assert fake_client.num_calls == 3
+    replay.close()
+
+
+def test_response_cache_eviction(tmp_path):
+    """Least recently used entries are evicted once the cache exceeds its size"""
+    cache = ResponseCache(str(tmp_path / "responses.db"), max_size_mb=0.001)
+    response = "x" * 400  # ~400 bytes, the cache holds 2
+    cache.put("a", response)
+    cache.put("b", response)
+    assert cache.get("a") == response  # a is now more recently used than b
+    cache.put("c", response)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == response
+    assert cache.get("c") == response
+    cache.close()
+
+
+def test_find_complete_code_block():
+    """Only a closed python block containing ModelNew counts"""
+    prefix = "Here is the kernel:\n```cpp\n__global__ void k() {}\n```\n"
+    partial = prefix + "```python\nclass ModelNew(nn.Module):\n    pass\n"
+    assert find_complete_code_block(partial) is None
+    assert find_complete_code_block(partial + "``") is None
+    assert (
+        find_complete_code_block(partial + "```\nExplanation...")
+        == "class ModelNew(nn.Module):\n    pass"
+    )
+    # a python block without ModelNew is not the kernel
+    assert find_complete_code_block("```python\nimport torch\n```") is None
+
+
+class FakeStream:
+    """Iterable of OpenAI-style streaming chunks that records how far it was consumed"""
+
+    def __init__(self, deltas, chat=True):
+        self.deltas = deltas
+        self.chat = chat
+        self.num_consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for delta in self.deltas:
+            self.num_consumed += 1
+            if self.chat:
+                choice = SimpleNamespace(delta=SimpleNamespace(content=delta))
+            else:
+                choice = SimpleNamespace(text=delta)
+            yield SimpleNamespace(choices=[choice])
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("server_type, chat", [("sglang", False), ("openai", True)])
+def test_stream_until_code_block(monkeypatch, server_type, chat):
+    """
+    The stream is closed right after the code block closes, string prompts are
+    streamed from the same endpoint the non-streaming query uses
+    """
+    deltas = ["Sure!\n```py", "thon\nclass ModelNew:\n", "    pass\n`", "``\n"]
+    deltas += ["This kernel fuses ..."] * 100
+    stream = FakeStream(deltas, chat=chat)
+    requests = {"chat": [], "completions": []}
+
+    def _create(endpoint):
+        def create(**kwargs):
+            requests[endpoint].append(kwargs)
+            return stream
+
+        return create
+
+    fake_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=_create("chat"))),
+        completions=SimpleNamespace(create=_create("completions")),
+    )
+    monkeypatch.setattr(llm_utils, "get_client", lambda *args, **kwargs: fake_client)
+
+    response = query_server(
+        "prompt", server_type=server_type, stream_until_code_block=True
+    )
+    assert stream.num_consumed == 4
+    assert stream.closed
+    assert response == "".join(deltas[:4])
+    if chat:
+        assert not requests["completions"]
+        assert requests["chat"][0]["messages"][-1]["content"] == "prompt"
+    else:
+        assert not requests["chat"]
+        assert requests["completions"][0]["prompt"] == "prompt"
+        assert requests["completions"][0]["stream"]
+
+
+def test_query_server_samples(tmp_path, monkeypatch):
+    """n completions in one request where supported, concurrent calls otherwise"""
+    fake_client = FakeOpenAIClient()
+    monkeypatch.setattr(llm_utils, "get_client", lambda *args, **kwargs: fake_client)
+    cache = ResponseCache(str(tmp_path / "responses.db"))
+
+    # sample 1 is already cached from a single-sample query
+    assert (
+        query_server("prompt", server_type="openai", sample_id=1, response_cache=cache)
+        == "completion 1"
+    )
+    responses = query_server_samples(
+        "prompt", [0, 1, 2], server_type="openai", response_cache=cache
+    )
+    # the missing samples 0 and 2 come from one request with n=2
+    assert responses == ["completion 2.0", "completion 1", "completion 2.1"]
+    assert fake_client.num_calls == 2
+    assert (
+        query_server_samples(
+            "prompt", [0, 1, 2], server_type="openai", response_cache=cache
+        )
+        == responses
+    )
+    assert fake_client.num_calls == 2
+
+    # together does not support n, each sample is its own call
+    responses = query_server_samples("prompt", [0, 1, 2], server_type="together")
+    assert len(responses) == 3
+    assert fake_client.num_calls == 5
+    cache.close()
+
+
+def test_prompt_prefix_cache_control(monkeypatch):
+    """Anthropic gets the static prefix as a cacheable block, cached tokens are tallied"""
+    requests = []
+
+    def _create(**kwargs):
+        requests.append(kwargs)
+        usage = SimpleNamespace(
+            input_tokens=10,
+            cache_read_input_tokens=90,
+            cache_creation_input_tokens=0,
+            output_tokens=5,
+        )
+        return SimpleNamespace(content=[SimpleNamespace(text="ok")], usage=usage)
+
+    fake_client = SimpleNamespace(messages=SimpleNamespace(create=_create))
+    monkeypatch.setattr(llm_utils, "get_client", lambda *args, **kwargs: fake_client)
+    PROMPT_CACHE_STATS.reset()
+
+    response = query_server(
+        "problem", server_type="anthropic", prompt_prefix="static instructions"
+    )
+    assert response == "ok"
+    content = requests[0]["messages"][0]["content"]
+    assert content[0] == {
+        "type": "text",
+        "text": "static instructions",
+        "cache_control": {"type": "ephemeral"},
+    }
+    assert content[1] == {"type": "text", "text": "problem"}
+
+    assert PROMPT_CACHE_STATS.num_requests == 1
+    assert PROMPT_CACHE_STATS.prompt_tokens == 100
+    assert PROMPT_CACHE_STATS.cached_tokens == 90
+    PROMPT_CACHE_STATS.reset()
+
+
+def test_deepseek_guard_sees_prompt_prefix(monkeypatch):
+    """The length check runs on prefix + problem, nothing is sent when it fails"""
+    checked = []
+
+    def _is_safe(prompt):
+        checked.append(prompt)
+        return False
+
+    def _create(**kwargs):
+        raise AssertionError("too long prompts must not be sent")
+
+    fake_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=_create))
+    )
+    monkeypatch.setattr(llm_utils, "get_client", lambda *args, **kwargs: fake_client)
+    monkeypatch.setattr(llm_utils, "is_safe_to_send_to_deepseek", _is_safe)
+
+    with pytest.raises(RuntimeError, match="too long"):
+        query_server(
+            "problem",
+            server_type="deepseek",
+            model_name="deepseek-chat",
+            prompt_prefix="static instructions ",
+        )
+    assert checked == ["static instructions problem"]
+
+
+def test_query_cache_key_server_location():
+    """Self-hosted servers are told apart by location, hosted APIs by model name"""
+
+    def key(**kwargs):
+        return llm_utils.query_cache_key(prompt="p", **kwargs)
+
+    assert key(server_type="sglang", server_port=30000) != key(
+        server_type="sglang", server_port=30001
+    )
+    assert key(server_type="sglang", server_address="a") != key(
+        server_type="sglang", server_address="b"
+    )
+    assert key(server_type="openai", model_name="gpt-4o", server_port=1) == key(
+        server_type="openai", model_name="gpt-4o", server_port=2
+    )
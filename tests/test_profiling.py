@@ -0,0 +1,54 @@
+import json
+import pytest
+import torch
+from kernelbench.eval import KernelExecResult
+from kernelbench.profiling import profile_model
+
+"""
+Usage:
+pytest test_profiling.py
+"""
+
+
+class MatmulRelu(torch.nn.Module):
+    def forward(self, a, b):
+        return torch.relu(a @ b)
+
+
+def test_profile_model_on_cpu(tmp_path):
+    inputs = [torch.randn(64, 64), torch.randn(64, 64)]
+    trace_path = str(tmp_path / "traces" / "custom_trace.json")
+    breakdown = profile_model(
+        MatmulRelu(), inputs, "cpu", num_trials=4, top_n=3, trace_path=trace_path
+    )
+
+    assert breakdown["device"] == "cpu" and breakdown["num_trials"] == 4
+    top = breakdown["top"]
+    assert 0 < len(top) <= 3
+    assert top == sorted(top, key=lambda entry: -entry["self_time_us"])
+    names = {entry["name"]: entry for entry in breakdown["top"]}
+    assert "aten::mm" in names and names["aten::mm"]["calls"] == 4
+    assert sum(entry["self_time_pct"] for entry in top) <= 100 + 1e-6
+
+    with open(trace_path) as f:
+        assert json.load(f)["traceEvents"]
+
+    # the breakdown is stored as is in eval results
+    result = KernelExecResult(profile={"custom": breakdown})
+    assert json.loads(result.model_dump_json())["profile"]["custom"]["top"]
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="requires CUDA")
+def test_profile_model_on_cuda_counts_kernels_once():
+    device = torch.device("cuda:0")
+    inputs = [torch.randn(256, 256, device=device) for _ in range(2)]
+    breakdown = profile_model(MatmulRelu(), inputs, device, num_trials=4, top_n=20)
+
+    top = breakdown["top"]
+    assert top
+    # only GPU kernels, not the aten ops that launched them
+    assert not any(entry["name"].startswith("aten::") for entry in top)
+    assert sum(entry["self_time_pct"] for entry in top) <= 100 + 1e-6
+    assert sum(entry["self_time_us"] for entry in top) <= (
+        breakdown["total_self_time_us"] + 1e-6
+    )
@@ -0,0 +1,38 @@
+from kernelbench.prompt_constructor import (
+    prompt_generate_prompt_with_hardware_info_from_template,
+    prompt_parts_custom_cuda_from_prompt_template,
+    prompt_parts_with_hardware_info,
+)
+
+"""
+Usage:
+pytest test_prompt_constructor.py
+"""
+
+REF_ARCH_A = "class Model(nn.Module):\n    pass  # problem A\n"
+REF_ARCH_B = "class Model(nn.Module):\n    pass  # problem B\n"
+
+
+def test_prompt_parts_static_prefix():
+    """Every problem shares the same prefix, the problem only appears in the suffix"""
+    parts_a = prompt_parts_custom_cuda_from_prompt_template(REF_ARCH_A)
+    parts_b = prompt_parts_custom_cuda_from_prompt_template(REF_ARCH_B)
+    assert parts_a.static_prefix == parts_b.static_prefix
+    assert "ModelNew" in parts_a.static_prefix
+    assert "problem A" not in parts_a.static_prefix
+    assert "problem A" in parts_a.problem_suffix
+
+
+def test_prompt_parts_hardware_info():
+    """Static-first layout keeps all sections of the original hardware prompt"""
+    parts = prompt_parts_with_hardware_info(REF_ARCH_A, "L40S")
+    assert (
+        parts.static_prefix
+        == prompt_parts_with_hardware_info(REF_ARCH_B, "L40S").static_prefix
+    )
+    assert "problem A" in parts.problem_suffix
+
+    original = prompt_generate_prompt_with_hardware_info_from_template(
+        REF_ARCH_A, "L40S"
+    )
+    assert sorted(parts.join().splitlines()) == sorted(original.splitlines() + [""])
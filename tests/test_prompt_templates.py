@@ -0,0 +1,51 @@
+import pytest
+import os
+from kernelbench.prompt_templates import (
+    PromptTemplateRegistry,
+    get_prompt_templates,
+    parse_gpu_specs,
+)
+
+"""
+Usage:
+pytest test_prompt_templates.py
+"""
+
+
+def test_registry_preloads_all_assets():
+    """Every few-shot, CoT, template and hardware asset shipped with the repo loads"""
+    templates = get_prompt_templates()
+    templates.preload()
+    assert "L40S" in templates.gpu_specs()["GPU_SPEC_INFO"]
+    # parsed once, the same object is served afterwards
+    assert templates.gpu_specs() is templates.gpu_specs()
+
+    with pytest.raises(ValueError):
+        templates.few_shot("ex_unknown")
+
+
+def test_registry_mtime_invalidation(tmp_path):
+    """Assets are served from memory until the file changes on disk"""
+    asset = tmp_path / "model_ex_add.py"
+    asset.write_text("v1")
+    (tmp_path / "model_new_ex_add.py").write_text("new v1")
+    templates = PromptTemplateRegistry(str(tmp_path), check_interval_s=0.0)
+
+    assert templates.template_example("add") == ("v1", "new v1")
+
+    # same mtime: not re-read even though the content changed
+    mtime = os.path.getmtime(asset)
+    asset.write_text("v2")
+    os.utime(asset, (mtime, mtime))
+    assert templates.text("model_ex_add.py") == "v1"
+
+    os.utime(asset, (mtime + 10, mtime + 10))
+    assert templates.text("model_ex_add.py") == "v2"
+
+    with pytest.raises(FileNotFoundError):
+        templates.text("missing.py")
+
+
+def test_parse_gpu_specs_validates():
+    with pytest.raises(ValueError):
+        parse_gpu_specs("GPU_SPEC_INFO = {}")
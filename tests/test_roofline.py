@@ -0,0 +1,117 @@
+import pytest
+import torch
+from kernelbench.roofline import (
+    count_flops_and_bytes,
+    estimate_speed_of_light,
+    get_gpu_spec,
+    parse_spec_number,
+    percent_of_speed_of_light,
+)
+
+"""
+Usage:
+pytest test_roofline.py
+"""
+
+MATMUL_SRC = """
+import torch
+import torch.nn as nn
+
+class Model(nn.Module):
+    def __init__(self):
+        super().__init__()
+
+    def forward(self, A, B):
+        return torch.matmul(A, B)
+
+def get_inputs():
+    return [torch.randn(256, 512), torch.randn(512, 128)]
+
+def get_init_inputs():
+    return []
+"""
+
+CONV_SRC = """
+import torch
+import torch.nn as nn
+
+class Model(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.conv = nn.Conv2d(8, 16, 3, bias=False)
+
+    def forward(self, x):
+        return self.conv(x)
+
+def get_inputs():
+    return [torch.randn(2, 8, 34, 34)]
+
+def get_init_inputs():
+    return []
+"""
+
+# 1 TFLOPS fp32, 2 TFLOPS dense tf32
+GPU_SPEC_INFO = {
+    "Fast": {
+        "Memory Bandwidth": "1000 TB/s",
+        "FP32 TFLOPS": "1",
+        "TF32 Tensor Core TFLOPS": "4 with sparsity",
+    },
+    "Toy": {
+        "Memory Bandwidth": "1 GB/s",
+        "FP32 TFLOPS": "1",
+        "TF32 Tensor Core TFLOPS": "4 with sparsity",
+    },
+    "Toy-80GB": {"Memory Bandwidth": "2 GB/s", "FP32 TFLOPS": "1"},
+}
+
+
+def test_parse_gpu_specs():
+    assert parse_spec_number("183.2 (366 with sparsity)") == 183.2
+    assert parse_spec_number("989 with sparsity") == 494.5
+    assert parse_spec_number("67") == 67
+    assert (
+        get_gpu_spec("NVIDIA Toy-80GB-SXM", GPU_SPEC_INFO) is GPU_SPEC_INFO["Toy-80GB"]
+    )
+    assert get_gpu_spec("Toy_cluster", GPU_SPEC_INFO) is GPU_SPEC_INFO["Toy"]
+    # the repo's own specs cover real device names
+    assert get_gpu_spec("NVIDIA H100 80GB HBM3")["GPU Architecture"] == "Hopper"
+    with pytest.raises(KeyError):
+        get_gpu_spec("Unknown GPU", GPU_SPEC_INFO)
+
+
+def test_count_flops_and_bytes():
+    counts = count_flops_and_bytes(MATMUL_SRC)
+    assert counts["flops"] == 2 * 256 * 512 * 128
+    assert counts["conv_flops"] == 0
+    assert counts["bytes"] == 4 * (256 * 512 + 512 * 128 + 256 * 128)
+    assert counts["dtype"] == torch.float32
+
+    conv_counts = count_flops_and_bytes(CONV_SRC)
+    assert conv_counts["flops"] == conv_counts["conv_flops"] > 0
+    # weights count as compulsory traffic
+    assert conv_counts["bytes"] == 4 * (
+        2 * 8 * 34 * 34 + 16 * 8 * 3 * 3 + 2 * 16 * 32 * 32
+    )
+
+
+def test_speed_of_light():
+    counts = count_flops_and_bytes(MATMUL_SRC)
+    sol = estimate_speed_of_light(MATMUL_SRC, "Toy", False, GPU_SPEC_INFO)
+    # 1 GB/s makes the bytes dominate
+    assert sol["bound"] == "memory"
+    assert sol["sol_time_ms"] == pytest.approx(counts["bytes"] / 1e9 * 1000)
+    assert sol["arithmetic_intensity"] == pytest.approx(
+        counts["flops"] / counts["bytes"]
+    )
+
+    conv_flops = count_flops_and_bytes(CONV_SRC)["flops"]
+    fp32 = estimate_speed_of_light(CONV_SRC, "Fast", False, GPU_SPEC_INFO)
+    tf32 = estimate_speed_of_light(CONV_SRC, "Fast", True, GPU_SPEC_INFO)
+    assert fp32["bound"] == tf32["bound"] == "compute"
+    assert fp32["sol_time_ms"] == pytest.approx(conv_flops / 1e12 * 1000)
+    assert tf32["sol_time_ms"] == pytest.approx(fp32["sol_time_ms"] / 2)
+
+    assert percent_of_speed_of_light(1.0, 4.0) == 25.0
+    assert percent_of_speed_of_light(1.0, -1.0) is None
+    assert percent_of_speed_of_light(None, 4.0) is None
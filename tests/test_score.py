@@ -75,3 +75,78 @@ def test_fastp():
     # Edge case: no correct samples
     is_correct_none = [0, 0, 0, 0, 0]
     assert fastp(is_correct_none, baseline_speed, actual_speed, n, 1.0) == 0
+
+
+def test_geometric_mean_log_space_extreme_speedups():
+    """Log-space geometric mean should not overflow / underflow for many problems"""
+
+    n = 500
+    is_correct = np.ones(n, dtype=bool)
+    baseline_speed = np.full(n, 1e3)
+    actual_speed = np.full(n, 1e-3)  # 1e6x speedup on every problem
+
+    # np.prod would overflow to inf here
+    assert math.isclose(
+        geometric_mean_speed_ratio_correct_only(
+            is_correct, baseline_speed, actual_speed, n
+        ),
+        1e6,
+        rel_tol=1e-9,
+    )
+
+    # and underflow to 0 for the slowdown case
+    assert math.isclose(
+        geometric_mean_speed_ratio_correct_only(
+            is_correct, actual_speed, baseline_speed, n
+        ),
+        1e-6,
+        rel_tol=1e-9,
+    )
+
+
+def test_fastp_grid():
+    """fastp_grid should match fastp for every threshold and broadcast over runs"""
+
+    is_correct = [1, 0, 1, 1, 0]
+    baseline_speed = [0.1, 0.15, 0.2, 0.05, 0.3]
+    actual_speed = [0.2, 0.15, 0.3, 0.01, 0.2]
+    n = 5
+    p_values = [0.0, 0.5, 1.0, 2.0]
+
+    grid = fastp_grid(is_correct, baseline_speed, actual_speed, p_values, n=n)
+    assert grid.shape == (len(p_values),)
+    for p, score in zip(p_values, grid):
+        assert math.isclose(
+            score,
+            fastp(is_correct, baseline_speed, actual_speed, n, p),
+            abs_tol=abs_tol,
+        )
+
+    # multiple runs scored against one baseline row
+    runs_correct = np.array([is_correct, [0, 0, 0, 0, 0]])
+    runs_actual = np.array([actual_speed, actual_speed])
+    runs_grid = fastp_grid(runs_correct, baseline_speed, runs_actual, p_values)
+    assert runs_grid.shape == (2, len(p_values))
+    np.testing.assert_allclose(runs_grid[0], grid)
+    np.testing.assert_allclose(runs_grid[1], 0.0)
+
+
+def test_bootstrap_scores():
+    """Bootstrap intervals should contain the point estimates"""
+
+    rng = np.random.default_rng(0)
+    n = 100
+    is_correct = rng.random(n) > 0.3
+    baseline_speed = rng.uniform(0.5, 2.0, n)
+    actual_speed = rng.uniform(0.5, 2.0, n)
+    p_values = [0.0, 1.0]
+
+    ci = bootstrap_scores(
+        is_correct, baseline_speed, actual_speed, p_values, num_resamples=200
+    )
+    geo = ci["geo_mean_speedup"]
+    assert geo["low"] <= geo["estimate"] <= geo["high"]
+    assert np.all(ci["fast_p"]["low"] <= ci["fast_p"]["estimate"])
+    assert np.all(ci["fast_p"]["estimate"] <= ci["fast_p"]["high"])
+    # fast_0 is the correctness rate
+    assert math.isclose(ci["fast_p"]["estimate"][0], is_correct.mean())
@@ -0,0 +1,106 @@
+import pytest
+import threading
+import time
+from kernelbench.server_cache import (
+    BaselineCache,
+    TTLCache,
+    baseline_cache_key,
+    result_cache_key,
+)
+
+"""
+Usage:
+pytest test_server_cache.py
+"""
+
+REF_SRC = "class Model:\n    def forward(self, x):\n        return x\n"
+
+
+def test_ttl_lru_cache():
+    cache = TTLCache(max_entries=2, ttl_s=0.05)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a is now more recently used than b
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert len(cache) == 1  # c expired but is only dropped when read
+
+
+def test_get_or_compute_single_flight():
+    """Concurrent misses on one key compute it once"""
+    cache = TTLCache()
+    num_computes = []
+
+    def compute():
+        num_computes.append(1)
+        time.sleep(0.05)
+        return {"mean": 1.0}
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_compute("k", compute))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(num_computes) == 1
+    assert sorted(cached for _, cached in results) == [False] + [True] * 7
+    assert (cache.hits, cache.misses) == (7, 1)
+
+
+def test_get_or_compute_releases_key_lock_on_error():
+    """A raising compute leaves no per-key lock behind and is retried next time"""
+    cache = TTLCache()
+
+    def compute():
+        raise RuntimeError("broken reference")
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("broken", compute)
+    assert cache._key_locks == {}
+    assert cache.misses == 3
+
+
+def test_baseline_cache_key_and_failures():
+    """Comments and whitespace do not change the key, the compile config does"""
+    commented = "# reference\n" + REF_SRC.replace("return x", "return x  # identity")
+    eager_key = baseline_cache_key(REF_SRC, "L40S", False, None, None, 100)
+    assert baseline_cache_key(commented, "L40S", False, None, None, 100) == eager_key
+    assert (
+        baseline_cache_key(REF_SRC, "L40S", True, "inductor", "default", 100)
+        != eager_key
+    )
+    assert baseline_cache_key(REF_SRC, "H100", False, None, None, 100) != eager_key
+    assert baseline_cache_key(REF_SRC, "L40S", False, None, None, 10) != eager_key
+
+    # failed measurements are not cached
+    cache = BaselineCache()
+    assert cache.get_or_measure(lambda: None, REF_SRC, "L40S", 100) == (None, False)
+    stats, cached = cache.get_or_measure(lambda: {"mean": 2.0}, REF_SRC, "L40S", 100)
+    assert (stats, cached) == ({"mean": 2.0}, False)
+    assert cache.get_or_measure(lambda: None, REF_SRC, "L40S", 100) == (
+        {"mean": 2.0},
+        True,
+    )
+
+
+def test_result_cache_key():
+    """The reference is normalized, the kernel and the trial config are not"""
+    kernel = "class ModelNew:\n    pass\n"
+    key = result_cache_key(REF_SRC, kernel, "L40S", 5, 100, ["Ada"])
+    assert result_cache_key("# ref\n" + REF_SRC, kernel, "L40S", 5, 100, ["Ada"]) == key
+    assert result_cache_key(REF_SRC, kernel + " ", "L40S", 5, 100, ["Ada"]) != key
+    assert result_cache_key(REF_SRC, kernel, "H100", 5, 100, ["Ada"]) != key
+    assert result_cache_key(REF_SRC, kernel, "L40S", 1, 100, ["Ada"]) != key
+    assert result_cache_key(REF_SRC, kernel, "L40S", 5, 10, ["Ada"]) != key
+    assert len(key) == 64
@@ -0,0 +1,83 @@
+import pytest
+from kernelbench.job_queue import Job
+from kernelbench.server_cache import TTLCache
+from kernelbench.server_metrics import (
+    BenchmarkServerMetrics,
+    MetricsRegistry,
+    classify_outcome,
+)
+
+"""
+Usage:
+pytest test_server_metrics.py
+"""
+
+
+def test_text_exposition():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("endpoint",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    requests.inc(endpoint="/benchmark")
+    requests.inc(2, endpoint='/a"b')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{endpoint="/benchmark"} 1.0' in text
+    assert 'requests_total{endpoint="/a\\"b"} 2.0' in text
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_sum 5.55" in text
+    assert "latency_seconds_count 3" in text
+
+    with pytest.raises(AssertionError):
+        requests.inc(device="cuda:0")
+
+
+def test_classify_outcome():
+    assert classify_outcome(True, True, {}) == "success"
+    assert classify_outcome(False, False, {"compilation_error": "nvcc"}) == (
+        "compile_failure"
+    )
+    assert classify_outcome(False, False, {"cuda_error": "illegal"}) == (
+        "runtime_error"
+    )
+    assert classify_outcome(True, False, {"runtime_error": "oob"}) == "runtime_error"
+    assert classify_outcome(True, False, {"correctness_issue": "Output mismatch"}) == (
+        "correctness_failure"
+    )
+    assert classify_outcome(True, True, {}, "TimeoutError: timeout") == "timeout"
+    assert classify_outcome(True, True, {}, "RuntimeError: boom") == "server_error"
+
+
+def test_server_metrics():
+    metrics = BenchmarkServerMetrics()
+    metrics.observe_eval(
+        True, True, {"phase_times_ms": {"compile": 2000.0, "correctness": 50.0}}
+    )
+    metrics.observe_eval(False, False, {"compilation_error": "nvcc"})
+    metrics.observe_job(
+        Job("a", None, status="failed", error="RuntimeError: crash", started_at=0.0)
+    )
+
+    assert metrics.phase_seconds.count(phase="compile") == 1
+    assert metrics.outcomes.value(outcome="success") == 1
+    assert metrics.outcomes.value(outcome="compile_failure") == 1
+    assert metrics.outcomes.value(outcome="server_error") == 1
+
+    cache = TTLCache()
+    cache.get_or_compute("k", lambda: 1)
+    cache.get_or_compute("k", lambda: 1)
+    text = metrics.render(
+        queue_depth=3, running_jobs=1, caches={"result": cache}, devices=["cpu"]
+    )
+    assert "kernelbench_queue_depth 3.0" in text
+    assert 'kernelbench_cache_hits_total{cache="result"} 1.0' in text
+    assert 'kernelbench_cache_misses_total{cache="result"} 1.0' in text
+    assert 'kernelbench_phase_duration_seconds_bucket{phase="compile",le="2.5"} 1' in (
+        text
+    )
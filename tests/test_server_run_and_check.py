@@ -0,0 +1,401 @@
+import json
+import pytest
+import threading
+import time
+from fastapi.testclient import TestClient
+from scripts.server_run_and_check import (
+    BenchmarkBatchRequest,
+    BenchmarkRequest,
+    BenchmarkResult,
+    create_app,
+)
+
+"""
+Usage:
+pytest test_server_run_and_check.py
+"""
+
+FILES = {
+    "ref_file": ("ref.py", b"class Model: pass"),
+    "kernel_file": ("kernel.py", b"class ModelNew: pass"),
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_server_caches():
+    from scripts import server_run_and_check
+
+    server_run_and_check.BASELINE_CACHE.clear()
+    server_run_and_check.RESULT_CACHE.clear()
+    yield
+    server_run_and_check.BASELINE_CACHE.clear()
+    server_run_and_check.RESULT_CACHE.clear()
+
+
+def fake_benchmark(request: BenchmarkRequest, device: str) -> BenchmarkResult:
+    """Stands in for the GPU evaluation on CPU workers"""
+    if "fail" in request.kernel_src:
+        raise RuntimeError("kernel crashed")
+    return BenchmarkResult(
+        compiled=True,
+        correctness=True,
+        kernel_exec_time_ms=1.0,
+        metadata={"device": device, "num_correct_trials": request.num_correct_trials},
+    )
+
+
+def wait_for_job(client: TestClient, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ["succeeded", "failed"]:
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(job_id)
+
+
+def test_submit_and_poll():
+    app = create_app(run_job=fake_benchmark, devices=["cpu", "cpu"])
+    with TestClient(app) as client:
+        response = client.post("/jobs", files=FILES, data={"num_correct_trials": 3})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        assert wait_for_job(client, job_id)["status"] == "succeeded"
+        result = client.get(f"/jobs/{job_id}/result").json()
+        assert result["correctness"]
+        assert result["metadata"] == {"device": "cpu", "num_correct_trials": 3}
+
+        # the synchronous endpoint goes through the same queue
+        result = client.post("/benchmark", files=FILES).json()
+        assert result["kernel_exec_time_ms"] == 1.0
+
+        failing = dict(FILES, kernel_file=("kernel.py", b"fail"))
+        job_id = client.post("/jobs", files=failing).json()["job_id"]
+        assert wait_for_job(client, job_id)["status"] == "failed"
+        assert client.get(f"/jobs/{job_id}/result").status_code == 500
+        assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_queue_full_returns_429():
+    """One busy worker and a queue of one: the third submission is rejected"""
+    release = threading.Event()
+
+    def blocking_benchmark(request, device):
+        release.wait(timeout=5)
+        return fake_benchmark(request, device)
+
+    app = create_app(run_job=blocking_benchmark, devices=["cpu"], max_queue_size=1)
+    with TestClient(app) as client:
+        running = client.post("/jobs", files=FILES).json()["job_id"]
+        # wait until the worker picked up the first job so the queue is empty
+        while client.get(f"/jobs/{running}").json()["status"] != "running":
+            time.sleep(0.01)
+        queued = client.post("/jobs", files=FILES)
+        assert queued.status_code == 202
+        assert client.get(f"/jobs/{queued.json()['job_id']}/result").status_code == 202
+
+        rejected = client.post("/jobs", files=FILES)
+        assert rejected.status_code == 429
+        assert client.get("/status").json()["queue_depth"] == 1
+
+        release.set()
+        assert wait_for_job(client, queued.json()["job_id"])["status"] == "succeeded"
+
+
+def test_reference_timings_are_cached(monkeypatch):
+    """Repeated submissions of one reference only time the candidate kernel"""
+    from scripts import server_run_and_check
+    from kernelbench.eval import KernelExecResult
+
+    measured = []
+
+    def fake_measure_program_time(ref_arch_name, ref_arch_src, num_trials, **kwargs):
+        measured.append(kwargs.get("use_torch_compile"))
+        return {"mean": 4.0 if kwargs.get("use_torch_compile") else 2.0}
+
+    monkeypatch.setattr(
+        server_run_and_check, "measure_program_time", fake_measure_program_time
+    )
+    monkeypatch.setattr(
+        server_run_and_check,
+        "evaluate_single_sample_src",
+        lambda **kwargs: KernelExecResult(
+            compiled=True, correctness=True, runtime=1.0, metadata={}
+        ),
+    )
+    server_run_and_check.BASELINE_CACHE.clear()
+
+    request = BenchmarkRequest("class Model: pass", "class ModelNew: pass", ["Ada"])
+    first = server_run_and_check.run_benchmark_job(request, "cpu")
+    # a different kernel, so the whole result is not memoized
+    request.kernel_src = "class ModelNew: pass  # v2"
+    second = server_run_and_check.run_benchmark_job(request, "cpu")
+
+    assert measured == [False, True]
+    assert not first.baseline_cached and second.baseline_cached
+    assert second.speedup_vs_eager == 2.0 and second.speedup_vs_compile == 4.0
+    server_run_and_check.BASELINE_CACHE.clear()
+
+
+def test_speed_of_light_is_cached(monkeypatch):
+    """The roofline estimate is computed once per reference, failures included"""
+    from scripts import server_run_and_check
+
+    estimated = []
+
+    def fake_estimate(ref_arch_src, gpu_name):
+        estimated.append(ref_arch_src)
+        if "unknown" in ref_arch_src:
+            raise ValueError("no specs")
+        return {"sol_time_ms": 0.5}
+
+    monkeypatch.setattr(server_run_and_check, "estimate_speed_of_light", fake_estimate)
+    monkeypatch.setattr(
+        server_run_and_check, "get_hardware_name", lambda device: "NVIDIA L40S"
+    )
+    server_run_and_check.BASELINE_CACHE.clear()
+
+    for _ in range(2):
+        assert server_run_and_check.estimate_reference_speed_of_light(
+            "class Model: pass", "cuda:0"
+        ) == {"sol_time_ms": 0.5}
+        assert (
+            server_run_and_check.estimate_reference_speed_of_light(
+                "class Model: unknown", "cuda:0"
+            )
+            is None
+        )
+    assert estimated == ["class Model: pass", "class Model: unknown"]
+    assert (
+        server_run_and_check.estimate_reference_speed_of_light(
+            "class Model: pass", "cpu"
+        )
+        is None
+    )
+    server_run_and_check.BASELINE_CACHE.clear()
+
+
+def fake_batch_benchmark(request: BenchmarkBatchRequest, device: str) -> list:
+    if "fail" in request.ref_arch_src:
+        raise RuntimeError("reference crashed")
+    results = []
+    # report in reverse to check the stream follows completion order
+    for index in reversed(range(len(request.kernel_srcs))):
+        result = fake_benchmark(
+            BenchmarkRequest(
+                request.ref_arch_src, request.kernel_srcs[index], request.gpu_arch
+            ),
+            device,
+        )
+        results.append(result)
+        request.on_result(index, result)
+    return results
+
+
+def test_batch_streams_results_as_completed():
+    app = create_app(
+        run_job=fake_benchmark, run_batch_job=fake_batch_benchmark, devices=["cpu"]
+    )
+    files = [
+        ("ref_file", ("ref.py", b"class Model: pass")),
+        ("kernel_files", ("k0.py", b"class ModelNew: pass")),
+        ("kernel_files", ("k1.py", b"class ModelNew: pass  # v2")),
+    ]
+    with TestClient(app) as client:
+        with client.stream("POST", "/benchmark/batch", files=files) as response:
+            assert response.status_code == 200
+            assert response.headers["x-job-id"]
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+        assert [line["index"] for line in lines] == [1, 0]
+        assert all(line["result"]["correctness"] for line in lines)
+
+        # a failure of the shared reference is reported for every kernel
+        files[0] = ("ref_file", ("ref.py", b"fail"))
+        response = client.post("/benchmark/batch", files=files)
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(line["index"] for line in lines) == [0, 1]
+        assert all("reference crashed" in line["error"] for line in lines)
+
+
+def test_batch_job_shares_reference(monkeypatch):
+    """The reference is prepared and timed once for the whole batch"""
+    from scripts import server_run_and_check
+    from kernelbench.eval import KernelExecResult
+
+    prepared, references_seen = [], []
+
+    def fake_evaluate(ref_arch_src, kernel_src, configs, device, reference=None):
+        references_seen.append(reference)
+        if "crash" in kernel_src:
+            raise RuntimeError("segfault")
+        return KernelExecResult(compiled=True, correctness=True, runtime=1.0)
+
+    monkeypatch.setattr(
+        server_run_and_check,
+        "prepare_reference",
+        lambda ref_arch_src, **kwargs: prepared.append(ref_arch_src) or "reference",
+    )
+    monkeypatch.setattr(
+        server_run_and_check, "evaluate_single_sample_src", fake_evaluate
+    )
+    monkeypatch.setattr(
+        server_run_and_check,
+        "measure_program_time",
+        lambda ref_arch_name, ref_arch_src, num_trials, **kwargs: {"mean": 2.0},
+    )
+    server_run_and_check.BASELINE_CACHE.clear()
+
+    streamed = []
+    request = BenchmarkBatchRequest(
+        "class Model: pass",
+        ["class ModelNew: pass", "crash", "class ModelNew: pass  # v2"],
+        ["Ada"],
+        on_result=lambda index, result: streamed.append(index),
+    )
+    results = server_run_and_check.run_benchmark_batch_job(request, "cpu")
+
+    assert prepared == ["class Model: pass"]
+    assert references_seen == ["reference"] * 3
+    assert streamed == [0, 1, 2]
+    assert results[0].speedup_vs_eager == 2.0
+    assert not results[1].compiled and results[1].error == "segfault"
+    server_run_and_check.BASELINE_CACHE.clear()
+
+
+def test_identical_submissions_are_memoized(monkeypatch):
+    """Resubmitting a byte-identical kernel returns the memoized result"""
+    from scripts import server_run_and_check
+    from kernelbench.eval import KernelExecResult
+
+    evaluated = []
+
+    def fake_evaluate(ref_arch_src, kernel_src, configs, device, **kwargs):
+        evaluated.append(kernel_src)
+        return KernelExecResult(compiled=True, correctness=True, runtime=1.0)
+
+    monkeypatch.setattr(
+        server_run_and_check, "evaluate_single_sample_src", fake_evaluate
+    )
+    monkeypatch.setattr(
+        server_run_and_check,
+        "measure_program_time",
+        lambda ref_arch_name, ref_arch_src, num_trials, **kwargs: {"mean": 2.0},
+    )
+
+    num_requests = server_run_and_check.METRICS.requests.value(endpoint="/benchmark")
+    app = create_app(devices=["cpu"])
+    with TestClient(app) as client:
+        first = client.post("/benchmark", files=FILES).json()
+        second = client.post("/benchmark", files=FILES).json()
+        assert not first["cached"] and second["cached"]
+        assert second["speedup_vs_eager"] == first["speedup_vs_eager"] == 2.0
+
+        # the poll API answers memoized jobs without queuing them
+        job = client.post("/jobs", files=FILES).json()
+        assert job["status"] == "succeeded"
+        assert client.get(f"/jobs/{job['job_id']}/result").json()["cached"]
+
+        # other trial counts or kernels are evaluated again
+        client.post("/benchmark", files=FILES, data={"num_perf_trials": 10})
+        edited = dict(FILES, kernel_file=("kernel.py", b"class ModelNew: pass\n"))
+        assert not client.post("/benchmark", files=edited).json()["cached"]
+        assert len(evaluated) == 3
+        assert client.get("/status").json()["result_cache"]["hits"] == 2
+
+        metrics = client.get("/metrics")
+        assert metrics.headers["content-type"].startswith("text/plain")
+        assert 'kernelbench_cache_hits_total{cache="result"} 2.0' in metrics.text
+        assert 'kernelbench_phase_duration_seconds_count{phase="job"}' in metrics.text
+        requests = server_run_and_check.METRICS.requests.value(endpoint="/benchmark")
+        assert requests == num_requests + 4
+
+
+def parse_sse(text: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: ") :], json.loads(data[len("data: ") :])))
+    return events
+
+
+def test_stream_progress_events(monkeypatch):
+    from scripts import server_run_and_check
+    from kernelbench.eval import KernelExecResult
+
+    def fake_evaluate(ref_arch_src, kernel_src, configs, device, **kwargs):
+        progress = kwargs["progress_callback"]
+        progress("phase", {"phase": "compile"})
+        progress("compiled", {"compiled": True})
+        for trial in range(configs["num_correct_trials"]):
+            progress("correctness_trial", {"trial": trial, "passed": True})
+        progress("kernel_timing", {"mean": 1.0, "p50": 1.0, "p99": 1.2})
+        return KernelExecResult(compiled=True, correctness=True, runtime=1.0)
+
+    monkeypatch.setattr(
+        server_run_and_check, "evaluate_single_sample_src", fake_evaluate
+    )
+    monkeypatch.setattr(
+        server_run_and_check,
+        "measure_program_time",
+        lambda ref_arch_name, ref_arch_src, num_trials, **kwargs: {"mean": 2.0},
+    )
+
+    app = create_app(devices=["cpu"])
+    with TestClient(app) as client:
+        response = client.post(
+            "/benchmark/stream", files=FILES, data={"num_correct_trials": 2}
+        )
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert [event for event, _ in events] == [
+            "queued",
+            "phase",
+            "phase",
+            "compiled",
+            "correctness_trial",
+            "correctness_trial",
+            "kernel_timing",
+            "phase",
+            "reference_timing",
+            "result",
+        ]
+        assert events[1][1] == {"phase": "started", "device": "cpu"}
+        assert events[8][1]["eager"] == {"mean": 2.0}
+        assert events[-1][1]["speedup_vs_eager"] == 2.0
+
+        # a memoized result is streamed right away
+        response = client.post(
+            "/benchmark/stream", files=FILES, data={"num_correct_trials": 2}
+        )
+        events = parse_sse(response.text)
+        assert [event for event, _ in events] == ["queued", "result"]
+        assert events[-1][1]["cached"]
+
+
+def test_cancel_queued_job():
+    """Jobs can be cancelled until a worker starts them"""
+    release = threading.Event()
+    ran = []
+
+    def blocking_benchmark(request, device):
+        ran.append(request.kernel_src)
+        release.wait(timeout=5)
+        return fake_benchmark(request, device)
+
+    app = create_app(run_job=blocking_benchmark, devices=["cpu"])
+    job_queue = app.state.job_queue
+    with TestClient(app):
+        running = job_queue.submit(BenchmarkRequest("ref", "first", ["Ada"]))
+        while running.status != "running":
+            time.sleep(0.01)
+        queued = job_queue.submit(BenchmarkRequest("ref", "second", ["Ada"]))
+        assert job_queue.cancel(queued.job_id)
+        assert not job_queue.cancel(running.job_id)
+        assert queued.done and queued.future.cancelled()
+
+        release.set()
+        running.future.result(timeout=5)
+        last = job_queue.submit(BenchmarkRequest("ref", "third", ["Ada"]))
+        last.future.result(timeout=5)
+        assert ran == ["first", "third"]
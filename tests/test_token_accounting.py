@@ -0,0 +1,71 @@
+import pytest
+import os
+import json
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+from kernelbench.token_accounting import count_tokens, count_run_tokens
+
+"""
+Usage:
+pytest test_token_accounting.py
+"""
+
+
+@pytest.fixture
+def local_tokenizer_path(tmp_path):
+    """A tiny whitespace tokenizer saved to disk, so no Hub access is needed"""
+    tokenizer = Tokenizer(WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    path = tmp_path / "tokenizer.json"
+    tokenizer.save(str(path))
+    return str(path)
+
+
+def test_count_tokens_with_cache(local_tokenizer_path, tmp_path):
+    """Counts should be computed in batch and then served from the cache"""
+    cache_path = str(tmp_path / "cache.json")
+    texts = ["a b c", "a b", "a b c"]
+
+    assert count_tokens(texts, local_tokenizer_path, cache_path=cache_path) == [3, 2, 3]
+
+    with open(cache_path, "r") as f:
+        cached = json.load(f)
+    # duplicate texts are only encoded and stored once
+    assert len(cached["counts"]) == 2
+
+    # cached counts are reused without re-encoding
+    cached["counts"] = {k: 100 for k in cached["counts"]}
+    with open(cache_path, "w") as f:
+        json.dump(cached, f)
+    assert count_tokens(texts, local_tokenizer_path, cache_path=cache_path) == [
+        100,
+        100,
+        100,
+    ]
+
+
+def test_count_run_tokens(local_tokenizer_path, tmp_path):
+    """Only CUDA sources in each kernel file are counted, across processes"""
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    for sample_id in range(4):
+        kernel = f'''
+import torch
+source = """
+__global__ void kernel_{sample_id}(float *x) {{ x[0] = 1; }}
+"""
+cpp_source = """
+void launch();
+"""
+'''
+        (run_dir / f"level_1_problem_1_sample_{sample_id}_kernel.py").write_text(kernel)
+
+    token_counts = count_run_tokens(
+        str(run_dir), local_tokenizer_path, num_workers=2, chunk_size=2
+    )
+    assert len(token_counts) == 4
+    # whitespace pre-tokenizer splits words and runs of punctuation
+    # "__global__ void kernel_i ( float * x ) { x [ 0 ] = 1 ; }" + "void launch ();"
+    assert set(token_counts.values()) == {17 + 3}
+    assert os.path.exists(run_dir / "token_counts_cache.json")
@@ -0,0 +1,71 @@
+import os
+import torch
+from kernelbench.torch_compile_cache import (
+    TORCH_COMPILE_CACHE_DIR_ENV,
+    persistent_compile_cache,
+    torch_compile_cache_dir,
+)
+
+"""
+Usage:
+pytest test_torch_compile_cache.py
+"""
+
+REF_SRC = """
+import torch
+import torch.nn as nn
+
+class Model(nn.Module):
+    def __init__(self):
+        super().__init__()
+
+    def forward(self, x):
+        return torch.relu(x) * 2
+
+def get_inputs():
+    return [torch.randn(8, 8)]
+
+def get_init_inputs():
+    return []
+"""
+
+
+def test_cache_dir_per_problem_and_mode(tmp_path):
+    root = str(tmp_path)
+    default_dir = torch_compile_cache_dir(REF_SRC, "inductor", "default", root)
+    assert default_dir.startswith(root)
+    assert torch_compile_cache_dir(
+        "# comment\n" + REF_SRC, "inductor", "default", root
+    ) == (default_dir)
+    assert torch_compile_cache_dir(REF_SRC, "inductor", "max-autotune", root) != (
+        default_dir
+    )
+
+    previous = os.environ.get("TORCHINDUCTOR_CACHE_DIR")
+    with persistent_compile_cache(REF_SRC, "inductor", "default", root) as cache_dir:
+        assert cache_dir == default_dir
+        assert os.environ["TORCHINDUCTOR_CACHE_DIR"] == default_dir
+        assert torch._inductor.config.fx_graph_cache
+    assert os.environ.get("TORCHINDUCTOR_CACHE_DIR") == previous
+
+
+def test_compile_time_is_measured_separately(tmp_path, monkeypatch):
+    from scripts.generate_baseline_time import measure_program_time
+
+    monkeypatch.setenv(TORCH_COMPILE_CACHE_DIR_ENV, str(tmp_path))
+    torch._dynamo.reset()
+    stats = measure_program_time(
+        "relu",
+        REF_SRC,
+        num_trials=3,
+        use_torch_compile=True,
+        torch_compile_backend="inductor",
+        torch_compile_options="default",
+        device="cpu",
+    )
+    assert stats["compile_time_ms"] > 0
+    assert stats["num_trials"] == 3
+
+    # compiled artifacts were written to the problem's managed directory
+    cache_dir = torch_compile_cache_dir(REF_SRC, "inductor", "default")
+    assert os.listdir(cache_dir)
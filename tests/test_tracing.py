@@ -0,0 +1,70 @@
+import pytest
+import asyncio
+from kernelbench import tracing
+from kernelbench.tracing import configure_tracing, register_tracer, trace_op
+
+"""
+Usage:
+pytest test_tracing.py
+"""
+
+
+@pytest.fixture
+def recording_tracer():
+    """Backend recording the names of traced calls"""
+    calls = []
+
+    def _factory(fn, name=None):
+        def traced(*args, **kwargs):
+            calls.append(name or fn.__name__)
+            return fn(*args, **kwargs)
+
+        return traced
+
+    register_tracer("recording", _factory)
+    previous = (tracing._CONFIG.sample_rate, tracing._CONFIG.backend)
+    configure_tracing(backend="recording")
+    yield calls
+    configure_tracing(sample_rate=previous[0], backend=previous[1])
+
+
+@trace_op
+def inner(x):
+    return x + 1
+
+
+@trace_op(name="outer_op")
+def outer(x):
+    return inner(x) * 2
+
+
+def test_tracing_off_is_noop(recording_tracer):
+    configure_tracing(sample_rate=0.0)
+    assert outer(1) == 4
+    assert recording_tracer == []
+
+
+def test_tracing_sampled_calls_are_complete(recording_tracer):
+    configure_tracing(sample_rate=1.0)
+    assert outer(1) == 4
+    # nested calls of a sampled call are traced too
+    assert recording_tracer == ["outer_op", "inner"]
+
+    recording_tracer.clear()
+    configure_tracing(sample_rate=0.3)
+    for _ in range(1000):
+        outer(1)
+    num_traced = recording_tracer.count("outer_op")
+    assert 200 < num_traced < 400
+    # sampling is decided at the top level only
+    assert recording_tracer.count("inner") == num_traced
+
+
+def test_tracing_async(recording_tracer):
+    @trace_op
+    async def generate(x):
+        return x * 3
+
+    configure_tracing(sample_rate=1.0)
+    assert asyncio.run(generate(2)) == 6
+    assert recording_tracer == ["generate"]
@@ -0,0 +1,122 @@
+import pytest
+from kernelbench.device_pool import JSONLCheckpoint
+from scripts import verify_bench as verify_bench_module
+from scripts.verify_bench import check_self_consistency, verify_bench
+
+"""
+Usage:
+pytest test_verify_bench.py
+"""
+
+PROBLEM_SRC = """
+import torch
+import torch.nn as nn
+
+class Model(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = nn.Linear(16, 8)
+
+    def forward(self, x):
+        return {forward}
+
+def get_inputs():
+    return [torch.randn(4, 16)]
+
+def get_init_inputs():
+    return []
+"""
+
+DETERMINISTIC = "self.linear(x)"
+# a fresh random tensor on every call
+NONDETERMINISTIC = "self.linear(x) + torch.rand(4, 8)"
+
+
+def _write_problem(level_dir, name, forward):
+    (level_dir / name).write_text(PROBLEM_SRC.format(forward=forward))
+
+
+def test_check_self_consistency():
+    assert check_self_consistency(PROBLEM_SRC.format(forward=DETERMINISTIC), "cpu") == (
+        True,
+        None,
+    )
+    passed, reason = check_self_consistency(
+        PROBLEM_SRC.format(forward=NONDETERMINISTIC), "cpu"
+    )
+    assert not passed and "disagree" in reason
+    passed, reason = check_self_consistency(
+        PROBLEM_SRC.format(forward="(self.linear(x), x)"), "cpu"
+    )
+    assert passed
+
+
+@pytest.mark.parametrize("devices", [["cpu"], ["cpu", "cpu"]])
+def test_verify_bench_caches_passes(tmp_path, devices):
+    level_dir = tmp_path / "KernelBench" / "level1"
+    level_dir.mkdir(parents=True)
+    _write_problem(level_dir, "1_Linear.py", DETERMINISTIC)
+    _write_problem(level_dir, "2_Noisy.py", NONDETERMINISTIC)
+    (level_dir / "3_Broken.py").write_text("class Model(:\n")
+    kwargs = dict(
+        levels=[1],
+        devices=devices,
+        cache_path=str(tmp_path / "verify.jsonl"),
+        kernel_bench_path=str(tmp_path / "KernelBench"),
+    )
+
+    report = verify_bench(**kwargs)
+    assert report["passed"] == ["level1/1_Linear.py"]
+    assert set(report["failed"]) == {"level1/2_Noisy.py", "level1/3_Broken.py"}
+    assert report["num_cached"] == 0
+
+    # only failures are checked again
+    report = verify_bench(**kwargs)
+    assert report["num_cached"] == 1 and report["passed"] == []
+
+    # an edited problem is re-verified, comment-only edits keep the cached pass
+    _write_problem(level_dir, "2_Noisy.py", "self.linear(x) * 2")
+    (level_dir / "1_Linear.py").write_text(
+        "# comment\n" + PROBLEM_SRC.format(forward=DETERMINISTIC)
+    )
+    report = verify_bench(**kwargs)
+    assert report["num_cached"] == 1
+    assert report["passed"] == ["level1/2_Noisy.py"]
+    assert list(report["failed"]) == ["level1/3_Broken.py"]
+
+
+def test_verify_bench_keys_passes_by_worker_device(tmp_path, monkeypatch):
+    """Passes of a mixed device list are cached under the device type that ran them"""
+    level_dir = tmp_path / "KernelBench" / "level1"
+    level_dir.mkdir(parents=True)
+    _write_problem(level_dir, "1_Linear.py", DETERMINISTIC)
+    _write_problem(level_dir, "2_Double.py", "self.linear(x) * 2")
+
+    def fake_map_on_devices(fn, tasks, devices, **fn_kwargs):
+        # as if the second problem ran on the GPU worker
+        for task, device in zip(tasks, ["cpu", "cuda:0"]):
+            yield task, device, (True, None)
+
+    monkeypatch.setattr(verify_bench_module, "map_on_devices", fake_map_on_devices)
+    cache_path = str(tmp_path / "verify.jsonl")
+    verify_bench(
+        levels=[1],
+        devices=["cuda:0", "cpu"],
+        cache_path=cache_path,
+        kernel_bench_path=str(tmp_path / "KernelBench"),
+    )
+    configs = {
+        entry["problem_name"]: entry["config"]
+        for entry in JSONLCheckpoint(cache_path).entries.values()
+    }
+    assert configs["1_Linear.py"].startswith("cpu|")
+    assert configs["2_Double.py"].startswith("cuda|")
+
+    # a cpu-only run skips the cpu pass and re-checks the problem that passed on cuda
+    report = verify_bench(
+        levels=[1],
+        devices=["cpu"],
+        cache_path=cache_path,
+        kernel_bench_path=str(tmp_path / "KernelBench"),
+    )
+    assert report["num_cached"] == 1 and report["passed"] == ["level1/2_Double.py"]